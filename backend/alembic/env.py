@@ -11,11 +11,54 @@ load_dotenv()
 # this is the Alembic Config object
 config = context.config
 
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
 # Set the database URL in the alembic configuration
-config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+database_url = os.getenv("DATABASE_URL")
+if database_url and database_url.startswith("postgres://"):
+    database_url = database_url.replace("postgres://", "postgresql://", 1)
+config.set_main_option("sqlalchemy.url", database_url)
 
-# add your model's MetaData object here
-from src.server.models.user import Base
+# add your model's MetaData object here; importing the models registers their tables
+from src.server.models.base import Base
+from src.server.models import user, team, document, shard
 target_metadata = Base.metadata
 
-# rest of the file remains the same... 
\ No newline at end of file
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting to a database."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can only alter tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,62 @@
+"""Index hot filters and enforce unique team members and document URLs
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+Databases created before this revision were built by create_all at startup,
+so every index is created with if_not_exists: a fresh database already has
+them from the models.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicate memberships carry no data of their own, keep the earliest one
+    op.execute(sa.text(
+        """
+        DELETE FROM team_members
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM team_members GROUP BY team_id, user_id
+        )
+        """
+    ))
+
+    # Duplicate documents have their own sections and edits, so they are not
+    # merged automatically. Offline (--sql) runs leave this to the unique index.
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            """
+            SELECT team_id, url, COUNT(*) AS copies
+            FROM documents
+            GROUP BY team_id, url
+            HAVING COUNT(*) > 1
+            """
+        )).all()
+        if duplicates:
+            listing = ", ".join(f"team {row.team_id}: {row.url} ({row.copies}x)" for row in duplicates)
+            raise RuntimeError(f"Remove duplicate documents before upgrading: {listing}")
+
+    op.create_index("ix_documents_team_id_url", "documents", ["team_id", "url"], unique=True, if_not_exists=True)
+    op.create_index("ix_team_members_team_id_user_id", "team_members", ["team_id", "user_id"], unique=True, if_not_exists=True)
+    op.create_index("ix_team_members_user_id", "team_members", ["user_id"], if_not_exists=True)
+    op.create_index("ix_document_sections_document_id", "document_sections", ["document_id"], if_not_exists=True)
+    op.create_index("ix_document_sections_parent_section_id", "document_sections", ["parent_section_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_sections_parent_section_id", table_name="document_sections", if_exists=True)
+    op.drop_index("ix_document_sections_document_id", table_name="document_sections", if_exists=True)
+    op.drop_index("ix_team_members_user_id", table_name="team_members", if_exists=True)
+    op.drop_index("ix_team_members_team_id_user_id", table_name="team_members", if_exists=True)
+    op.drop_index("ix_documents_team_id_url", table_name="documents", if_exists=True)
@@ -0,0 +1,36 @@
+"""Add the document change feed table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_changes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("team_id", sa.Integer(), sa.ForeignKey("teams.id"), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_document_changes_team_id_id", "document_changes", ["team_id", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_changes_team_id_id", table_name="document_changes", if_exists=True)
+    op.drop_table("document_changes")
@@ -0,0 +1,38 @@
+"""Add the document editor state table
+
+Revision ID: 0002a
+Revises: 0002
+Create Date: 2026-10-19 13:00:00
+
+Databases built by create_all before editor states existed have no table
+for 0003 to alter. Created with if_not_exists, since newer ones do; the
+cascade on document deletes is added by 0003.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002a"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_editor_states",
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), primary_key=True),
+        sa.Column("schema_version", sa.Integer(), nullable=False),
+        sa.Column("source_updated_at", sa.DateTime(), nullable=False),
+        sa.Column("editor_content", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("document_editor_states")
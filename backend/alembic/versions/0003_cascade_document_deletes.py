@@ -0,0 +1,78 @@
+"""Cascade document deletes to sections and editor state in the database
+
+Revision ID: 0003
+Revises: 0002a
+Create Date: 2026-10-19 14:00:00
+
+SQLite cannot alter a foreign key in place, so there the tables are rebuilt
+with the new definitions; PostgreSQL swaps the constraints. The foreign
+keys were created unnamed by create_all, which PostgreSQL names
+<table>_<column>_fkey.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table)
+FOREIGN_KEYS = [
+    ("document_sections", "document_id", "documents"),
+    ("document_sections", "parent_section_id", "document_sections"),
+    ("document_editor_states", "document_id", "documents"),
+]
+
+
+def _sections_table(ondelete):
+    return sa.Table(
+        "document_sections", sa.MetaData(),
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete=ondelete), nullable=False),
+        sa.Column("parent_section_id", sa.Integer(), sa.ForeignKey("document_sections.id", ondelete=ondelete), nullable=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("order", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Index("ix_document_sections_document_id", "document_id"),
+        sa.Index("ix_document_sections_parent_section_id", "parent_section_id"),
+    )
+
+
+def _editor_states_table(ondelete):
+    return sa.Table(
+        "document_editor_states", sa.MetaData(),
+        sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id", ondelete=ondelete), primary_key=True),
+        sa.Column("schema_version", sa.Integer(), nullable=False),
+        sa.Column("source_updated_at", sa.DateTime(), nullable=False),
+        sa.Column("editor_content", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+
+def _set_ondelete(ondelete):
+    if op.get_bind().dialect.name == "sqlite":
+        for table in (_sections_table(ondelete), _editor_states_table(ondelete)):
+            with op.batch_alter_table(table.name, copy_from=table, recreate="always"):
+                pass
+        return
+
+    for table, column, referenced in FOREIGN_KEYS:
+        name = f"{table}_{column}_fkey"
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referenced, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _set_ondelete("CASCADE")
+
+
+def downgrade() -> None:
+    _set_ondelete(None)
@@ -0,0 +1,42 @@
+"""Add the team shard map and the document id directory
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "team_shards",
+        sa.Column("team_id", sa.Integer(), sa.ForeignKey("teams.id"), primary_key=True),
+        sa.Column("shard", sa.String(), nullable=False),
+        sa.Column("moving_to", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "document_directory",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("team_id", sa.Integer(), sa.ForeignKey("teams.id"), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_document_directory_team_id", "document_directory", ["team_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_document_directory_team_id", table_name="document_directory", if_exists=True)
+    op.drop_table("document_directory")
+    op.drop_table("team_shards")
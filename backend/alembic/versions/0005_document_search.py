@@ -0,0 +1,108 @@
+"""Add the full-text search index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 18:00:00
+
+The same tables SearchService.ensure_index creates at startup: an FTS5
+table over document_search kept in sync by triggers on SQLite, a generated
+tsvector column with a GIN index on PostgreSQL. When the table is new it is
+filled from the stored documents. Other databases get no index; search is
+unavailable there. Shards get theirs from ``python shards.py sync``.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS document_search (
+        id INTEGER PRIMARY KEY,
+        team_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL,
+        section_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_search_team_id ON document_search (team_id)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_document_id ON document_search (document_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts USING fts5(
+        title,
+        content,
+        content = 'document_search',
+        content_rowid = 'id',
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON document_search BEGIN
+        INSERT INTO document_search_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON document_search BEGIN
+        INSERT INTO document_search_fts (document_search_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS document_search (
+        id BIGSERIAL PRIMARY KEY,
+        team_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+        section_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_search_vector ON document_search USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_team_id ON document_search (team_id)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_document_id ON document_search (document_id)",
+]
+
+DDL = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}
+
+# One entry per document title and one per section, as SearchService indexes them
+BACKFILL = """
+    INSERT INTO document_search (title, content, team_id, document_id, section_id)
+    SELECT title, '', team_id, id, NULL FROM documents
+    UNION ALL
+    SELECT sections.title, sections.content, documents.team_id, documents.id, sections.id
+    FROM document_sections AS sections
+    JOIN documents ON documents.id = sections.document_id
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    statements = DDL.get(bind.dialect.name)
+    if statements is None:
+        return
+    existed = sa.inspect(bind).has_table("document_search")
+    for statement in statements:
+        op.execute(sa.text(statement))
+    if not existed:
+        op.execute(sa.text(BACKFILL))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(sa.text("DROP TABLE IF EXISTS document_search_fts"))
+    op.execute(sa.text("DROP TABLE IF EXISTS document_search"))
@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Importing this module points the app at a throwaway SQLite database (unless
+BENCHMARK_DATABASE_URL is set) and fills in the settings the app needs at
+import time, so the benchmarks run offline against a fresh database. Import
+it before anything from ``src``.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+WORKDIR = tempfile.mkdtemp(prefix="benchmarks-")
+
+os.environ["DATABASE_URL"] = os.getenv("BENCHMARK_DATABASE_URL") or f"sqlite:///{WORKDIR}/bench.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+# Minimum cost so signing up benchmark users does not dominate setup
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds of a list of durations in seconds."""
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+async def measure_async(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Like measure, for a callable returning a fresh awaitable on every call."""
+    for _ in range(warmup):
+        await fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "argv": sys.argv,
+    }
+
+
+def write_results(path: str, suite: str, results: Dict[str, Dict[str, Any]]) -> None:
+    """Save results as {"environment": ..., "suite": ..., "results": {name: stats}}.
+
+    Every entry has a ``median_ms`` so benchmarks.compare can line up two runs.
+    """
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "suite": suite, "results": results}, f, indent=2)
+    print(f"\nwrote {len(results)} results to {path}")
+
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    width = max((len(name) for name in results), default=0)
+    print(f"{'benchmark':<{width}} {'median ms':>10} {'p95 ms':>10} {'runs':>6}")
+    for name, stats in results.items():
+        print(f"{name:<{width}} {stats['median_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['runs']:>6}")
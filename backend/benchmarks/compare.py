@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files, or two directories of them.
+
+    python -m benchmarks.compare results/base/ results/head/ --threshold 0.1
+
+Entries are matched by name. An entry regresses when its median grows by
+more than the threshold or, for load results, when its throughput drops by
+more than the threshold. Prints every shared entry with its change and
+exits with status 1 if any regressed. Timings from different machines are
+not comparable; run both sides on the same host.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    paths = sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    results = {}
+    for result_path in paths:
+        with open(result_path) as f:
+            results.update(json.load(f)["results"])
+    return results
+
+
+def compare(
+    base: Dict[str, Dict[str, Any]], head: Dict[str, Dict[str, Any]], threshold: float
+) -> List[Tuple[str, float, float, float, bool]]:
+    """(name, base median, head median, relative change, regressed) per shared entry."""
+    rows = []
+    for name in sorted(base.keys() & head.keys()):
+        old, new = base[name], head[name]
+        change = new["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+        regressed = change > threshold
+        if "requests_per_second" in old and old["requests_per_second"]:
+            regressed = regressed or new["requests_per_second"] / old["requests_per_second"] - 1 < -threshold
+        rows.append((name, old["median_ms"], new["median_ms"], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="result file or directory of the baseline")
+    parser.add_argument("head", help="result file or directory to check")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    base, head = load_results(args.base), load_results(args.head)
+    rows = compare(base, head, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    print(f"{'benchmark':<{width}} {'base ms':>10} {'head ms':>10} {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}} {old:>10.3f} {new:>10.3f} {change:>+7.1%}{flag}")
+
+    for name in sorted(base.keys() - head.keys()):
+        print(f"only in base: {name}")
+    for name in sorted(head.keys() - base.keys()):
+        print(f"only in head: {name}")
+
+    regressions = sum(1 for row in rows if row[4])
+    print(f"\n{len(rows)} compared, {regressions} regressed beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
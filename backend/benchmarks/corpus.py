@@ -0,0 +1,179 @@
+"""
+Deterministic HTML corpus for the scraping benchmarks and the local site server.
+
+    python -m benchmarks.corpus --output /tmp/site --pages 40
+
+The pages follow the markup of generated documentation sites (MkDocs /
+Sphinx style): a header and navigation sidebar, a ``<main>`` article with
+nested headings, paragraphs with inline markup, code blocks, tables and
+lists, and a footer. Every page links to its neighbours so the site can be
+crawled from index.html. The same seed always produces the same bytes, so
+results stay comparable between commits.
+
+Saved copies of real pages can be used instead: every benchmark that takes
+``--corpus DIR`` reads the ``*.html`` files of DIR.
+"""
+import argparse
+import glob
+import os
+import random
+from html import escape
+from typing import Dict
+
+WORDS = (
+    "request response session cache index query team document section parser "
+    "token stream worker pool commit replica cursor batch schema migration "
+    "latency throughput handler router middleware payload header buffer queue "
+    "the a of to and in for with on is by that this from as are be"
+).split()
+
+# label -> (pages in the navigation sidebar, sections, blocks per section)
+SIZES = {
+    "small": (10, 4, 2),
+    "medium": (40, 12, 4),
+    "large": (120, 40, 6),
+}
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(2, 5)):
+        sentence = escape(_sentence(rng, rng.randint(8, 20)))
+        roll = rng.random()
+        if roll < 0.2:
+            sentence = sentence.replace(" ", " <code>" + rng.choice(WORDS) + "()</code> ", 1)
+        elif roll < 0.35:
+            sentence = sentence.replace(" ", ' <a href="#">' + rng.choice(WORDS) + "</a> ", 1)
+        elif roll < 0.45:
+            sentence = sentence.replace(" ", " <strong>" + rng.choice(WORDS) + "</strong> ", 1)
+        parts.append(sentence)
+    return "<p>\n    " + "\n    ".join(parts) + "\n  </p>"
+
+
+def _block(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.15:
+        lines = "\n".join(
+            f"    {rng.choice(WORDS)}_{i} = {rng.choice(WORDS)}({rng.randint(0, 99)})" for i in range(rng.randint(3, 12))
+        )
+        return f'<div class="highlight"><pre><code class="language-python">{lines}</code></pre></div>'
+    if roll < 0.25:
+        rows = "\n".join(
+            f"      <tr><td><code>{rng.choice(WORDS)}</code></td><td>{escape(_sentence(rng, 6))}</td></tr>"
+            for _ in range(rng.randint(3, 8))
+        )
+        return (
+            "<table>\n    <thead><tr><th>Name</th><th>Description</th></tr></thead>\n"
+            f"    <tbody>\n{rows}\n    </tbody>\n  </table>"
+        )
+    if roll < 0.35:
+        items = "\n".join(f"    <li>{escape(_sentence(rng, 7))}</li>" for _ in range(rng.randint(3, 7)))
+        return f"<ul>\n{items}\n  </ul>"
+    return _paragraph(rng)
+
+
+def build_page(index: int, total: int, sections: int, blocks: int, seed: int = 0) -> str:
+    rng = random.Random(seed * 100003 + index)
+    title = f"Guide {index}: {' '.join(rng.choice(WORDS) for _ in range(3)).title()}"
+    nav = "\n".join(
+        f'      <li class="toctree-l1"><a href="page-{i}.html">Guide {i}</a></li>' for i in range(total)
+    )
+    body = []
+    for section in range(sections):
+        level = 2 if section % 3 == 0 else rng.choice((2, 3, 3, 4))
+        heading = escape(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title())
+        body.append(f'  <h{level} id="s{section}">{heading}<a class="headerlink" href="#s{section}">¶</a></h{level}>')
+        body.extend("  " + _block(rng) for _ in range(rng.randint(1, blocks)))
+    neighbours = (
+        f'<a rel="prev" href="page-{(index - 1) % total}.html">Previous</a> '
+        f'<a rel="next" href="page-{(index + 1) % total}.html">Next</a>'
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>{escape(title)} &mdash; Example Docs</title>
+  <link rel="stylesheet" href="/static/theme.css">
+  <script defer src="/static/search.js"></script>
+</head>
+<body class="wy-body-for-nav">
+<header class="site-header">
+  <a class="brand" href="index.html">Example Docs</a>
+  <form class="search" action="search.html"><input type="text" name="q" placeholder="Search docs"></form>
+</header>
+<div class="wy-grid-for-nav">
+  <nav class="wy-nav-side" aria-label="Navigation">
+    <ul>
+{nav}
+    </ul>
+  </nav>
+  <main class="document">
+  <h1>{escape(title)}</h1>
+{chr(10).join(body)}
+  <div class="rst-footer-buttons">{neighbours}</div>
+  </main>
+</div>
+<footer><p>&copy; Example Docs. Built with a static site generator.</p></footer>
+</body>
+</html>
+"""
+
+
+def build_site(pages: int, sections: int = 12, blocks: int = 4, seed: int = 0) -> Dict[str, str]:
+    """{file name: html} of a crawlable site whose entry point is index.html."""
+    site = {f"page-{i}.html": build_page(i, pages, sections, blocks, seed) for i in range(pages)}
+    links = "\n".join(f'    <li><a href="page-{i}.html">Guide {i}</a></li>' for i in range(pages))
+    site["index.html"] = (
+        '<!DOCTYPE html>\n<html lang="en">\n<head><meta charset="utf-8"><title>Example Docs</title></head>\n'
+        f'<body>\n<main>\n  <h1>Example Docs</h1>\n  <ul>\n{links}\n  </ul>\n</main>\n</body>\n</html>\n'
+    )
+    return site
+
+
+def sized_pages(seed: int = 0) -> Dict[str, str]:
+    """One page per entry of SIZES, for the per-page microbenchmarks."""
+    return {
+        label: build_page(0, pages, sections, blocks, seed)
+        for label, (pages, sections, blocks) in SIZES.items()
+    }
+
+
+def load_corpus(directory: str) -> Dict[str, str]:
+    """{file name: html} of the saved pages in a directory."""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            corpus[os.path.basename(path)] = f.read()
+    if not corpus:
+        raise SystemExit(f"no .html files in {directory}")
+    return corpus
+
+
+def write_site(directory: str, site: Dict[str, str]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for name, html in site.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="directory to write the site to")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=12, help="sections per page")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    site = build_site(args.pages, args.sections, seed=args.seed)
+    write_site(args.output, site)
+    print(f"wrote {len(site)} pages ({sum(map(len, site.values())) / 1024:.0f}KB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
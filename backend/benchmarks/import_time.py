@@ -0,0 +1,99 @@
+"""
+Guard the cold-start cost of importing the app.
+
+    python -m benchmarks.import_time --budget-ms 1800 --repeat 5
+
+Imports ``src.server.app`` in fresh interpreters and fails (exit status 1)
+when the median import time exceeds the budget, or when importing has side
+effects: the app is pointed at a SQLite file that must still not exist
+afterwards, i.e. nothing connected to or created the database. Autoscaled
+workers pay this cost on every boot before they can serve a request.
+With --top the slowest modules (``python -X importtime``,
+cumulative, from one extra run) are listed to show where a regression comes from.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from benchmarks.common import write_results
+
+MODULE = "src.server.app"
+
+_PROBE = (
+    "import time; start = time.perf_counter(); "
+    f"import {MODULE}; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_once(database_path: str, importtime: bool = False) -> Tuple[float, List[Tuple[int, str]]]:
+    """Seconds to import the app in a fresh interpreter and, with ``importtime``,
+    the -X importtime cumulative timings in microseconds by module (which
+    slow the import down, so they are collected on a separate run)."""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET_KEY", "import-time"),
+        "JWT_ALGORITHM": os.getenv("JWT_ALGORITHM", "HS256"),
+        "ACCESS_TOKEN_EXPIRE_MINUTES": os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"),
+        "PYTHONDONTWRITEBYTECODE": "",
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+    env.pop("DATABASE_REPLICA_URLS", None)
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", _PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.strip()))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1800")))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest modules")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="import-time-")
+    database_path = os.path.join(workdir, "must-not-exist.db")
+    timings = [import_once(database_path)[0] for _ in range(args.repeat)]
+
+    median_ms = statistics.median(timings) * 1000
+    print(f"import {MODULE}: median {median_ms:.0f} ms, min {min(timings) * 1000:.0f} ms "
+          f"over {args.repeat} runs (budget {args.budget_ms:.0f} ms)")
+    if args.top:
+        _, modules = import_once(database_path, importtime=True)
+        for cumulative, name in sorted(modules, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+    if args.output:
+        results: Dict[str, Dict[str, float]] = {f"import_time[{MODULE}]": {
+            "runs": len(timings), "median_ms": median_ms, "min_ms": min(timings) * 1000,
+            "max_ms": max(timings) * 1000, "p95_ms": max(timings) * 1000,
+        }}
+        write_results(args.output, "import_time", results)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if os.path.exists(database_path):
+        failures.append("importing the app created the database file; something connected at import time")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+HTTP load generator for the API.
+
+    python -m benchmarks.load --concurrency 32 --duration 20 --output results/load.json
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 64
+
+Without --url the app is driven in-process through httpx's ASGI transport
+against a throwaway SQLite database, so the numbers measure the app itself
+(routing, services, database, serialization) with no network in between.
+With --url it drives a running server instead; point that server at a
+scratch database, since the run signs up a user and stores documents.
+
+Setup signs up a user, creates a team and stores ``--documents`` documents
+built from the corpus. Then ``--concurrency`` workers send a weighted mix of
+requests (see SCENARIOS) for ``--duration`` seconds. ``--scrape-weight``
+adds POST /scrape/scrape_site requests crawling benchmarks.site_server.
+Latency statistics are reported per scenario and overall, with throughput.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from contextlib import AsyncExitStack, ExitStack
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import print_results, summarize, write_results
+
+import httpx
+
+from benchmarks.corpus import build_site
+from benchmarks.services import scraped_pages
+from benchmarks.site_server import serve
+
+# name -> (weight, method, path template); templates see team_id, document_id and query
+SCENARIOS = {
+    "get_document": (40, "GET", "/documents/{document_id}"),
+    "list_documents_summary": (20, "GET", "/documents/team/{team_id}?summary=true"),
+    "list_documents": (5, "GET", "/documents/team/{team_id}"),
+    "search": (10, "GET", "/documents/team/{team_id}/search?q={query}"),
+    "my_teams": (10, "POST", "/teams/my-teams"),
+    "team_members": (10, "GET", "/teams/{team_id}/members"),
+    "changes": (5, "GET", "/documents/team/{team_id}/changes?since=0&limit=50"),
+}
+
+QUERIES = ["request", "cache", "replica cursor", "middleware", "schema migration"]
+
+
+async def setup(client: httpx.AsyncClient, documents: int) -> Dict[str, Any]:
+    suffix = f"{time.time_ns()}"
+    email = f"load-{suffix}@example.com"
+    response = await client.post("/auth/signup", json={"email": email, "password": "load-password"})
+    response.raise_for_status()
+    user = response.json()
+    headers = {"Authorization": f"Bearer {user['access_token']}"}
+
+    response = await client.post("/teams/create", json={"name": f"Load {suffix}", "created_by": user["id"]})
+    response.raise_for_status()
+    team_id = response.json()["id"]
+
+    pages = list(scraped_pages().values())
+    document_ids = []
+    for i in range(documents):
+        page = pages[i % len(pages)]
+        response = await client.post("/documents/store-scraped", json={
+            "team_id": team_id,
+            "user_id": user["id"],
+            "document_name": f"Load document {i}",
+            "scraped_data": {**page, "url": f"https://docs.example.com/load/{suffix}/{i}"},
+        })
+        response.raise_for_status()
+        document_ids.append(response.json()["data"]["id"])
+
+    return {"user_id": user["id"], "team_id": team_id, "document_ids": document_ids, "headers": headers}
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    state: Dict[str, Any],
+    scenarios: Dict[str, Tuple[int, str, str]],
+    deadline: float,
+    seed: int,
+    samples: List[Tuple[str, int, float]],
+) -> None:
+    rng = random.Random(seed)
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        _, method, template = scenarios[name]
+        path = template.format(
+            team_id=state["team_id"],
+            document_id=rng.choice(state["document_ids"]),
+            query=rng.choice(QUERIES),
+        )
+        kwargs: Dict[str, Any] = {"headers": state["headers"]}
+        if name == "my_teams":
+            kwargs["json"] = {"user_id": state["user_id"]}
+        elif name == "scrape":
+            kwargs["json"] = {
+                "url": f"{state['site_url']}index.html?run={next(state['scrape_runs'])}",
+                "team_id": state["team_id"],
+                "user_id": state["user_id"],
+                "document_name": "Crawled site",
+                "max_pages": state["scrape_pages"],
+            }
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+            # Several routes report failures in the envelope with a 200 status
+            if status == 200 and response.headers.get("content-type", "").startswith("application/json"):
+                body = response.json()
+                if isinstance(body, dict) and body.get("success") is False:
+                    status = 599
+        except httpx.HTTPError:
+            status = 0
+        samples.append((name, status, time.perf_counter() - start))
+
+
+def report(samples: List[Tuple[str, int, float]], duration: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    by_name: Dict[str, List[Tuple[int, float]]] = {}
+    for name, status, elapsed in samples:
+        by_name.setdefault(name, []).append((status, elapsed))
+    for name, entries in sorted(by_name.items()):
+        results[f"load.{name}"] = {
+            **summarize([elapsed for _, elapsed in entries]),
+            "errors": sum(1 for status, _ in entries if not 200 <= status < 300),
+            "requests_per_second": len(entries) / duration,
+        }
+    if samples:
+        results["load.all"] = {
+            **summarize([elapsed for _, _, elapsed in samples]),
+            "errors": sum(1 for _, status, _ in samples if not 200 <= status < 300),
+            "requests_per_second": len(samples) / duration,
+        }
+    return results
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    scenarios = dict(SCENARIOS)
+    if args.scrape_weight:
+        scenarios["scrape"] = (args.scrape_weight, "POST", "/scrape/scrape_site")
+
+    with ExitStack() as sync_stack:
+        site_url = sync_stack.enter_context(serve(build_site(args.scrape_pages))) if args.scrape_weight else None
+        async with AsyncExitStack() as stack:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            if args.url:
+                client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60)
+            else:
+                from src.server.app import app
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                # Set after startup configured logging; per-request INFO logs
+                # would otherwise dominate the measurement
+                logging.getLogger().setLevel(args.log_level)
+                client = httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app), base_url="http://benchmark", limits=limits, timeout=60
+                )
+            await stack.enter_async_context(client)
+
+            state = await setup(client, args.documents)
+            state.update(site_url=site_url, scrape_pages=args.scrape_pages, scrape_runs=itertools.count())
+
+            samples: List[Tuple[str, int, float]] = []
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*(
+                worker(client, state, scenarios, deadline, args.seed + i, samples)
+                for i in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+    return report(samples, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; default drives the app in-process")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--documents", type=int, default=50, help="documents stored during setup")
+    parser.add_argument("--scrape-weight", type=int, default=0, help="relative weight of scrape requests")
+    parser.add_argument("--scrape-pages", type=int, default=5, help="pages per crawl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", help="app log level for in-process runs")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    total = results.get("load.all")
+    if total:
+        print(f"\n{total['requests_per_second']:.1f} requests/s, {total['errors']} errors")
+    if args.output:
+        write_results(args.output, "load", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Run every benchmark suite and save the results for later comparison.
+
+    python -m benchmarks.run                      # -> benchmarks/results/<commit>/
+    python -m benchmarks.run --quick --output /tmp/bench
+    python -m benchmarks.compare benchmarks/results/<base> benchmarks/results/<head>
+
+Each suite runs in its own process with its own throwaway database and
+writes <suite>.json into the output directory.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.common import environment
+
+SUITES = {
+    "scraping": [],
+    "services": [],
+    "serialization": [],
+    "load": [],
+}
+
+QUICK = {
+    "scraping": ["--repeat", "5", "--crawl-pages", "5", "--crawl-repeat", "1"],
+    "services": ["--sizes", "10", "100", "--repeat", "5"],
+    "serialization": ["--pages", "10", "100", "--repeat", "5"],
+    "load": ["--duration", "5", "--documents", "20"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="directory for the result files")
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES), default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and shorter runs")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join("benchmarks", "results", environment()["commit"] or "unknown")
+    os.makedirs(output, exist_ok=True)
+    failed = []
+    for suite in args.suites:
+        print(f"\n== {suite}", flush=True)
+        extra = QUICK[suite] if args.quick else SUITES[suite]
+        command = [sys.executable, "-m", f"benchmarks.{suite}", "--output", os.path.join(output, f"{suite}.json"), *extra]
+        if subprocess.run(command).returncode != 0:
+            failed.append(suite)
+
+    print(f"\nresults in {output}")
+    if failed:
+        print(f"failed suites: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmarks of the scraper's HTML processing, plus a crawl of a local site.
+
+    python -m benchmarks.scraping --output results/scraping.json
+    python -m benchmarks.scraping --corpus saved-pages/ --repeat 50
+
+For each page of the corpus (by default the small/medium/large pages of
+benchmarks.corpus) this times parsing with BeautifulSoup, extract_title,
+extract_content and clean_text over the page text. ``crawl`` runs
+ScrapingService.scrape_site against benchmarks.site_server on localhost, so
+it covers fetching and link discovery without touching the network.
+"""
+import argparse
+from typing import Any, Dict
+
+from benchmarks.common import measure, print_results, write_results
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import build_site, load_corpus, sized_pages
+from benchmarks.site_server import serve
+from src.server.services.scraping_service import ScrapingService
+
+
+def run_pages(corpus: Dict[str, str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for label, html in corpus.items():
+        soup = BeautifulSoup(html, "html.parser")
+        text = soup.get_text()
+        extra = {"html_bytes": len(html.encode("utf-8"))}
+        results[f"scraping.parse[{label}]"] = {**measure(lambda: BeautifulSoup(html, "html.parser"), repeat), **extra}
+        results[f"scraping.extract_title[{label}]"] = {
+            **measure(lambda: ScrapingService.extract_title(soup, "https://docs.example.com/page"), repeat), **extra
+        }
+        results[f"scraping.extract_content[{label}]"] = {
+            **measure(lambda: ScrapingService.extract_content(soup), repeat), **extra
+        }
+        results[f"scraping.clean_text[{label}]"] = {
+            **measure(lambda: ScrapingService.clean_text(text), repeat), "text_chars": len(text)
+        }
+    return results
+
+
+def run_crawl(pages: int, repeat: int, delay: float) -> Dict[str, Dict[str, Any]]:
+    with serve(build_site(pages), delay=delay) as url:
+        start_url = url + "index.html"
+        scraped = ScrapingService.scrape_site(start_url, max_pages=pages + 1)
+        stats = measure(lambda: ScrapingService.scrape_site(start_url, max_pages=pages + 1), repeat, warmup=0)
+    return {f"scraping.crawl[{pages} pages]": {**stats, "pages_scraped": len(scraped)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of saved .html pages to use instead of the generated ones")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--crawl-pages", type=int, default=20, help="0 skips the crawl benchmark")
+    parser.add_argument("--crawl-repeat", type=int, default=3)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="site server delay per response")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else sized_pages()
+    results = run_pages(corpus, args.repeat)
+    if args.crawl_pages:
+        results.update(run_crawl(args.crawl_pages, args.crawl_repeat, args.delay_ms / 1000))
+
+    print_results(results)
+    if args.output:
+        write_results(args.output, "scraping", results)
+
+
+if __name__ == "__main__":
+    main()
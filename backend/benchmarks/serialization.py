@@ -0,0 +1,127 @@
+"""
+Compare response serialization of large documents before and after the
+ORJSON fast path.
+
+    python -m benchmarks.serialization --pages 50 200 500
+
+"before" replays what FastAPI does for a route returning an APIResponse with
+a response_model: dump the returned model, validate it again against the
+response model, dump it in JSON mode and encode with the standard json module.
+"after" is APIResponse.to_response(): one dump, encoded with orjson.
+"""
+import argparse
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from benchmarks.common import measure, write_results
+
+from fastapi.responses import JSONResponse
+
+from src.server.schemas.base import APIResponse
+from src.server.schemas.document import DocumentResponse
+
+
+def build_document(pages: int, sections_per_page: int = 12, words_per_section: int = 120) -> SimpleNamespace:
+    """An ORM-like document shaped like the output of ScrapingService.scrape_site."""
+    body = " ".join(f"word{i % 97}" for i in range(words_per_section))
+    now = datetime.utcnow()
+    content = {
+        "pages": [
+            {
+                "title": f"Page {page}",
+                "url": f"https://docs.example.com/page-{page}",
+                "content": {
+                    "sections": [
+                        {
+                            "title": f"Section {page}.{section}",
+                            "level": 2,
+                            "content": body,
+                            "subsections": [
+                                {"title": f"Detail {page}.{section}", "level": 3, "content": body, "subsections": []}
+                            ],
+                        }
+                        for section in range(sections_per_page)
+                    ],
+                    "metadata": {},
+                },
+            }
+            for page in range(pages)
+        ],
+        "total_pages": pages,
+        "base_url": "https://docs.example.com",
+    }
+    return SimpleNamespace(
+        id=1, team_id=1, title="Benchmark document", url="https://docs.example.com",
+        content=content, created_at=now, updated_at=now, sections=[],
+    )
+
+
+def serialize_before(document: SimpleNamespace) -> bytes:
+    response = APIResponse(
+        success=True,
+        message="Document retrieved successfully",
+        data=DocumentResponse.model_validate(document),
+        metadata={"document_id": document.id},
+    )
+    # FastAPI's serialize_response: validate against response_model, then jsonable output
+    validated = APIResponse[DocumentResponse].model_validate(response.model_dump())
+    return JSONResponse(validated.model_dump(mode="json")).body
+
+
+def serialize_after(document: SimpleNamespace) -> bytes:
+    return APIResponse(
+        success=True,
+        message="Document retrieved successfully",
+        data=DocumentResponse.model_validate(document),
+        metadata={"document_id": document.id},
+    ).to_response().body
+
+
+def run(pages: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for page_count in pages:
+        document = build_document(page_count)
+        size = len(serialize_after(document))
+        before = measure(lambda: serialize_before(document), repeat)
+        after = measure(lambda: serialize_after(document), repeat)
+        results.append({
+            "pages": page_count,
+            "body_bytes": size,
+            "before": before,
+            "after": after,
+            "speedup": before["median_ms"] / after["median_ms"],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("--output", help="write results as JSON to this file, for benchmarks.compare")
+    args = parser.parse_args()
+
+    results = run(args.pages, args.repeat)
+    if args.output:
+        write_results(args.output, "serialization", {
+            f"serialization.{side}[{result['pages']} pages]": {**result[side], "body_bytes": result["body_bytes"]}
+            for result in results for side in ("before", "after")
+        })
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'pages':>6} {'body':>10} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for result in results:
+        print(
+            f"{result['pages']:>6} {result['body_bytes'] / 1024:>8.0f}KB "
+            f"{result['before']['median_ms']:>10.1f} {result['after']['median_ms']:>10.1f} "
+            f"{result['speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
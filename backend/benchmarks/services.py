@@ -0,0 +1,209 @@
+"""
+Service-level benchmarks against a seeded database at several data sizes.
+
+    python -m benchmarks.services --sizes 10 100 1000 --output results/services.json
+
+For every size N the seed adds a team with N documents (each with
+``--sections`` sections) and a user who belongs to N teams of ten members.
+The benchmarks then time, per size:
+
+* documents.get_team_documents / get_team_document_summaries for that team
+* documents.get_document and get_documents_data for a batch of up to 100
+  of its documents, with the response cache cleared before every run
+* teams.get_user_teams for that user
+
+and, independent of N, store_scraped_data and _create_sections for the
+small/medium/large pages of benchmarks.corpus. Writes go to a separate
+team; _create_sections is rolled back after each run.
+
+Uses a throwaway SQLite database unless BENCHMARK_DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import measure_async, print_results, summarize, write_results
+
+from bs4 import BeautifulSoup
+from sqlalchemy import text
+
+from benchmarks.corpus import sized_pages
+from src.server.database.config import AsyncSessionLocal, get_engine
+from src.server.models.base import Base
+from src.server.models import user, team, document  # noqa: F401  (register tables)
+from src.server.models.document import Document, DocumentSection
+from src.server.models.team import Team, TeamMember
+from src.server.models.user import User
+from src.server.services.cache_service import get_cache
+from src.server.services.document_service import DocumentService
+from src.server.services.scraping_service import ScrapingService
+from src.server.services.search_service import SearchService
+from src.server.services.team_service import TeamService
+
+MEMBERS_PER_TEAM = 10
+WRITE_TEAM_ID = 1
+WRITE_USER_ID = 1
+
+
+def scraped_pages() -> Dict[str, Dict[str, Any]]:
+    """scrape_url-shaped results for the corpus pages."""
+    pages = {}
+    for label, html in sized_pages().items():
+        soup = BeautifulSoup(html, "html.parser")
+        pages[label] = {
+            "title": ScrapingService.extract_title(soup, "https://docs.example.com/"),
+            "url": "https://docs.example.com/",
+            "content": ScrapingService.extract_content(soup),
+            "raw_html": html,
+        }
+    return pages
+
+
+def seed(sizes: List[int], sections: int) -> Dict[int, Dict[str, Any]]:
+    """Create the data for every size; returns the ids each size's benchmarks use."""
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    SearchService.ensure_index(engine)
+
+    ids = itertools.count(1)
+    users = [{"id": next(ids), "email": f"member{i}@example.com", "hashed_password": "x"} for i in range(MEMBERS_PER_TEAM)]
+    teams = [{"id": WRITE_TEAM_ID, "name": "Writes", "created_by": WRITE_USER_ID}]
+    members = [{"team_id": WRITE_TEAM_ID, "user_id": WRITE_USER_ID}]
+    documents, section_rows = [], []
+    team_ids, doc_ids, section_ids = itertools.count(2), itertools.count(1), itertools.count(1)
+    body = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8
+    targets = {}
+
+    for size in sizes:
+        # A user in N teams
+        owner = {"id": next(ids), "email": f"owner{size}@example.com", "hashed_password": "x"}
+        users.append(owner)
+        for _ in range(size):
+            team_id = next(team_ids)
+            teams.append({"id": team_id, "name": f"Team {team_id}", "created_by": owner["id"]})
+            members.append({"team_id": team_id, "user_id": owner["id"]})
+            members.extend({"team_id": team_id, "user_id": member["id"]} for member in users[:MEMBERS_PER_TEAM - 1])
+
+        # A team with N documents
+        team_id = next(team_ids)
+        teams.append({"id": team_id, "name": f"Documents {size}", "created_by": owner["id"]})
+        members.append({"team_id": team_id, "user_id": owner["id"]})
+        team_documents = []
+        for d in range(size):
+            document_id = next(doc_ids)
+            team_documents.append(document_id)
+            content = {"sections": [
+                {"title": f"Section {s}", "level": 2, "content": body, "subsections": []} for s in range(sections)
+            ], "metadata": {}}
+            documents.append({
+                "id": document_id, "team_id": team_id, "user_id": owner["id"],
+                "document_name": f"Doc {d}", "title": f"Doc {d}", "url": f"https://example.com/{size}/{d}",
+                "content": content, "raw_html": "",
+            })
+            section_rows.extend(
+                {"id": next(section_ids), "document_id": document_id, "title": f"Section {s}", "content": body, "order": s}
+                for s in range(sections)
+            )
+        targets[size] = {"user_id": owner["id"], "team_id": team_id, "document_ids": team_documents}
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), users)
+        conn.execute(Team.__table__.insert(), teams)
+        conn.execute(TeamMember.__table__.insert(), members)
+        if documents:
+            conn.execute(Document.__table__.insert(), documents)
+            conn.execute(DocumentSection.__table__.insert(), section_rows)
+        conn.execute(text("ANALYZE"))
+    return targets
+
+
+async def run_reads(targets: Dict[int, Dict[str, Any]], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    cache = get_cache()
+
+    async def in_session(call):
+        async with AsyncSessionLocal() as db:
+            return await call(db)
+
+    for size, target in targets.items():
+        team_id, user_id = target["team_id"], target["user_id"]
+        batch = target["document_ids"][:100]
+
+        async def get_document(db):
+            return await DocumentService.get_document(db, batch[0])
+
+        async def get_documents_data(db):
+            cache.clear()
+            return await DocumentService.get_documents_data(db, batch)
+
+        benchmarks = {
+            "documents.get_team_documents": lambda db: DocumentService.get_team_documents(db, team_id),
+            "documents.get_team_document_summaries": lambda db: DocumentService.get_team_document_summaries(db, team_id),
+            "documents.get_document": get_document,
+            f"documents.get_documents_data({len(batch)} ids, cold)": get_documents_data,
+            "teams.get_user_teams": lambda db: TeamService(db).get_user_teams(user_id, 5),
+        }
+        for name, call in benchmarks.items():
+            stats = await measure_async(lambda: in_session(call), repeat)
+            results[f"{name}[{size}]"] = stats
+    return results
+
+
+async def run_writes(pages: Dict[str, Dict[str, Any]], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    urls = itertools.count()
+
+    for label, page in pages.items():
+        async def store():
+            async with AsyncSessionLocal() as db:
+                data = {**page, "url": f"{page['url']}{label}/{next(urls)}"}
+                await DocumentService.store_scraped_data(db, WRITE_TEAM_ID, WRITE_USER_ID, f"Bench {label}", data)
+
+        results[f"documents.store_scraped_data[{label}]"] = await measure_async(store, repeat)
+
+        # Only _create_sections is timed; the parent row is set up before and rolled back after
+        timings = []
+        for _ in range(repeat + 1):
+            async with AsyncSessionLocal() as db:
+                parent = Document(
+                    team_id=WRITE_TEAM_ID, user_id=WRITE_USER_ID, document_name="Sections",
+                    title="Sections", url=f"https://sections.example.com/{next(urls)}",
+                    content=page["content"], raw_html="",
+                )
+                db.add(parent)
+                await db.flush()
+                start = time.perf_counter()
+                await DocumentService._create_sections(db, parent, page["content"]["sections"])
+                timings.append(time.perf_counter() - start)
+                await db.rollback()
+        results[f"documents._create_sections[{label}]"] = {
+            **summarize(timings[1:]), "sections": len(page["content"]["sections"])
+        }
+    return results
+
+
+async def run(sizes: List[int], sections: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    targets = seed(sizes, sections)
+    results = await run_reads(targets, repeat)
+    results.update(await run_writes(scraped_pages(), repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sections", type=int, default=10, help="sections per seeded document")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.sections, args.repeat))
+    print_results(results)
+    if args.output:
+        write_results(args.output, "services", results)
+
+
+if __name__ == "__main__":
+    main()
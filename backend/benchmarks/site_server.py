@@ -0,0 +1,78 @@
+"""
+Local static-site server standing in for crawl targets.
+
+    python -m benchmarks.site_server --port 8900 --pages 40
+    python -m benchmarks.site_server --port 8900 --corpus saved-pages/
+
+Serves the generated corpus (or a directory of saved pages) over HTTP on
+localhost, optionally with an artificial per-request delay to mimic a remote
+site, so the scraper can be benchmarked without network access.
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+from benchmarks.corpus import build_site, load_corpus
+
+
+def _handler(site: Dict[str, bytes], delay: float):
+    class SiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            name = self.path.split("?", 1)[0].split("#", 1)[0].lstrip("/") or "index.html"
+            body = site.get(name)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SiteHandler
+
+
+@contextmanager
+def serve(site: Dict[str, str], port: int = 0, delay: float = 0.0) -> Iterator[str]:
+    """Serve ``site`` ({path: html}) in a background thread and yield its base URL."""
+    encoded = {name: html.encode("utf-8") for name, html in site.items()}
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(encoded, delay))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--pages", type=int, default=40, help="pages of the generated site")
+    parser.add_argument("--corpus", help="serve the .html files of this directory instead")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="added to every response")
+    args = parser.parse_args()
+
+    site = load_corpus(args.corpus) if args.corpus else build_site(args.pages)
+    with serve(site, args.port, args.delay_ms / 1000) as url:
+        print(f"serving {len(site)} pages at {url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Gunicorn settings for running the API in production.
+
+    python serve.py
+    gunicorn -c gunicorn.conf.py src.server.app:app
+
+Runs WEB_CONCURRENCY uvicorn worker processes (default: one per CPU) so
+requests, scraping and password hashing spread over every core. The app is
+imported once in the master and forked (preload_app), so workers share its
+code pages and boot fast; database engines are created per worker. Workers
+are recycled after WORKER_MAX_REQUESTS requests (with jitter, so they do
+not all restart together) or above WORKER_MAX_MEMORY_MB, and get
+WORKER_GRACEFUL_TIMEOUT seconds to drain in-flight requests on restart,
+reload (SIGHUP) and shutdown (SIGTERM).
+
+With preload_app, SIGHUP restarts workers but does not reload code; deploy
+new code with a full restart, or by starting a new master with SIGUSR2 and
+then stopping the old one with SIGQUIT.
+
+Database pools are per worker: the server can open up to
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+
+Caches are per worker too; a worker's invalidations reach the others through
+CACHE_INVALIDATION_FILE, but not servers on other hosts (see cache_service).
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "src.server.workers.RecyclingUvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+max_requests = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+# A worker that stops heartbeating this long is killed and replaced
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+
+# Heartbeat files on tmpfs, so a slow disk cannot make workers look hung
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# bcrypt threads per worker; the default of one pool per process sized for the
+# whole machine would oversubscribe the CPUs once there are several workers.
+# Based on WEB_CONCURRENCY, since the app is imported before --workers applies.
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Create tables once in the master instead of racing to do it in every worker;
+# workers look up the search index themselves when search is first used.
+# Must be decided before the app is imported, since it reads the setting then.
+schema_check = os.getenv("STARTUP_SCHEMA_CHECK", "true").lower() == "true"
+os.environ["STARTUP_SCHEMA_CHECK"] = "false"
+
+# Metrics are collected per process; /metrics sums them from this directory,
+# including the counts of workers that have been recycled. Set here, before
+# the app (and prometheus_client) is imported.
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+# Cache invalidations of one worker reach the others through this shared file.
+# Also set before the app is imported, since the caches map it on import.
+if not os.getenv("CACHE_INVALIDATION_FILE"):
+    fd, path = tempfile.mkstemp(prefix="cache-invalidations-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    os.close(fd)
+    os.environ["CACHE_INVALIDATION_FILE"] = path
+
+
+def on_starting(server):
+    from src.utils.logging_config import setup_logging
+
+    # The master's own records (worker starts, exits, timeouts) in the app's format
+    setup_logging()
+
+    # Metric files of a previous run would be summed into this one
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Runs in the master before the first worker is forked
+    if schema_check:
+        from src.server.app import ensure_schema
+        from src.server.database.config import get_engine
+
+        ensure_schema()
+        # Workers must not inherit the master's open connections
+        get_engine().dispose()
+
+
+def post_fork(server, worker):
+    from src.server.database.config import reset_engines_after_fork
+    from src.server.services.search_service import SearchService
+    from src.utils.logging_config import setup_logging
+
+    reset_engines_after_fork()
+    # Whatever the master found out about the search index, each worker checks for itself
+    SearchService.reset()
+    # The master's log writer thread does not survive the fork; start one per worker
+    setup_logging()
+
+
+def on_exit(server):
+    path = os.getenv("CACHE_INVALIDATION_FILE")
+    if path and os.path.basename(path).startswith("cache-invalidations-") and os.path.exists(path):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
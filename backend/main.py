@@ -1,7 +1,13 @@
+import os
 import uvicorn
-from src.utils.logging_config import setup_logging
 import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+# Readable lines for the development server; deployments default to JSON
+os.environ.setdefault("LOG_FORMAT", "text")
 
+from src.utils.logging_config import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -9,4 +15,5 @@ logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
     logger.info("Server is running!")
-    uvicorn.run("src.server.app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # log_config=None keeps uvicorn from installing its own handlers over setup_logging's
+    uvicorn.run("src.server.app:app", host="0.0.0.0", port=8000, reload=True, log_config=None)
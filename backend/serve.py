@@ -0,0 +1,21 @@
+"""
+Production entry point: gunicorn with uvicorn workers, configured by
+gunicorn.conf.py (see there for the environment variables).
+
+    python serve.py
+    python serve.py --bind 0.0.0.0:9000 --workers 8
+
+Any gunicorn option may be passed. main.py remains the single-process
+development server with auto-reload.
+"""
+import os
+import sys
+
+from gunicorn.app.wsgiapp import run
+
+APP = "src.server.app:app"
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+
+if __name__ == "__main__":
+    sys.argv = [sys.argv[0], "--config", CONFIG, *sys.argv[1:], APP]
+    run()
@@ -0,0 +1,65 @@
+"""
+Document shard maintenance, see ShardService.
+
+    python shards.py status
+    python shards.py sync
+    python shards.py move TEAM_ID SHARD
+
+status   shows the configured shards (DATABASE_SHARDS) and the teams mapped to each
+sync     creates the tables of every shard and the directory entries of documents
+         stored before sharding was turned on; run once when enabling sharding
+         with STARTUP_SCHEMA_CHECK=false
+move     moves a team's documents to another shard ("primary" for the primary
+         database) while the API keeps serving; the team's writes get 503 until
+         the copy is done. Safe to run again after a failure.
+"""
+import argparse
+import asyncio
+import json
+
+from src.utils.logging_config import setup_logging
+from src.server.database.config import dispose_engines, get_engine
+from src.server.models import user, team, document, shard  # noqa: F401  (register tables)
+from src.server.services.search_service import SearchService
+from src.server.services.shard_service import SHARD_MAP_TTL_SECONDS, SHARDING_ENABLED, ShardService
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "status":
+            print(json.dumps(await ShardService.stats(), indent=2))
+        elif args.command == "sync":
+            ShardService.ensure_schema()
+        elif args.command == "move":
+            moved = await ShardService.move_team(args.team_id, args.shard, args.wait)
+            print(f"Moved {moved} documents of team {args.team_id} to {args.shard}")
+    finally:
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    commands.add_parser("sync")
+    move = commands.add_parser("move")
+    move.add_argument("team_id", type=int)
+    move.add_argument("shard")
+    move.add_argument(
+        "--wait", type=float, default=SHARD_MAP_TTL_SECONDS,
+        help="seconds to let every API process pick up a shard map change (default SHARD_MAP_TTL_SECONDS)"
+    )
+    args = parser.parse_args()
+
+    setup_logging(fmt="text")
+    if args.command != "status":
+        if not SHARDING_ENABLED:
+            parser.error("sharding is off, set DATABASE_SHARDS")
+        # Sets up the search index the move maintains on the target
+        SearchService.ensure_index(get_engine())
+        ShardService.ensure_schema()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
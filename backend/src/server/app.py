@@ -1,29 +1,100 @@
-from fastapi import FastAPI, logger
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import logging, sys
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+import asyncio
+import logging, os
 from src.utils.utils import read_markdown_file
+from src.utils.logging_config import setup_logging
 from src.server.routes.home import router as home_router
 from src.server.routes.auth import router as auth_router
 from src.server.routes.team_routes import router as team_router
 from src.server.routes.document_routes import router as document_router
-from src.server.database.config import engine
+from src.server.database.config import (
+    dispose_engines, get_async_engine, get_engine, get_replica_engines, get_shard_engines, on_engine_created
+)
 from src.server.models.base import Base
-from src.server.models import user, team, document
+from src.server.models import user, team, document, shard
 from src.server.routes.scrape import router as scrape_router
-readme_content = read_markdown_file("README.md")
+from src.server.routes.system import router as system_router
+from src.server.routes.metrics import router as metrics_router
+from src.server.services.search_service import SearchService
+from src.server.services.change_feed_service import (
+    CHANGE_FEED_PRUNE_INTERVAL_SECONDS, CHANGE_FEED_RETENTION_DAYS, ChangeFeedService
+)
+from src.server.services.shard_service import SHARDING_ENABLED, ShardService
+from src.server.database.routing import ReadYourWritesMiddleware
+from src.server.services.metrics_service import MetricsMiddleware, instrument_engine
+from src.server.services.compression_service import CompressionMiddleware
+from src.server.services.query_profiler_service import SQL_PROFILING, QueryProfilerMiddleware, profile_engine
 
-logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Creating tables and the search index on startup suits development and tests;
+# deployments that migrate with Alembic can turn it off to boot faster.
+STARTUP_SCHEMA_CHECK = os.getenv("STARTUP_SCHEMA_CHECK", "true").lower() == "true"
+# Open a connection per engine before serving, so the first requests do not pay for it
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
+# Query counts and timings for /metrics, statement shapes for the SQL profiler
+# and assert_max_queries; applied as each engine is created
+on_engine_created(instrument_engine)
+on_engine_created(lambda engine, name: profile_engine(engine))
+
+
+def ensure_schema() -> None:
+    """Create missing tables and the search index, on the primary and every shard.
+    Blocking; runs in a thread."""
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    SearchService.ensure_index(engine)
+    if SHARDING_ENABLED:
+        ShardService.ensure_schema()
+
+
+async def warm_up() -> None:
+    for engine in [get_async_engine(), *get_replica_engines(), *get_shard_engines().values()]:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Whatever server runs the app, its records and ours share one configuration
+    setup_logging()
+    if STARTUP_SCHEMA_CHECK:
+        await asyncio.to_thread(ensure_schema)
+    if STARTUP_WARMUP:
+        await warm_up()
+    pruning = None
+    if CHANGE_FEED_RETENTION_DAYS > 0 and CHANGE_FEED_PRUNE_INTERVAL_SECONDS > 0:
+        pruning = asyncio.create_task(ChangeFeedService.prune_periodically())
+    logger.info("Startup complete")
+    yield
+    if pruning is not None:
+        pruning.cancel()
+    await dispose_engines()
+
 
 app = FastAPI(
     title="CollabTree",
-    description=(lambda: readme_content if isinstance(readme_content, str) else "")(),
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+
+def openapi():
+    # The README becomes the API description; read when the schema is first built, not at import
+    if app.openapi_schema is None:
+        readme_content = read_markdown_file("README.md")
+        app.description = readme_content if isinstance(readme_content, str) else ""
+    return FastAPI.openapi(app)
+
+
+app.openapi = openapi
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,14 +104,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Keeps clients on the primary database right after they write
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-request SQL reports, see GET /system/queries
+if SQL_PROFILING:
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Brotli/gzip for JSON and text responses, see compression_service
+app.add_middleware(CompressionMiddleware)
+
+# Added last so it wraps everything else and measures the full request
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(home_router, prefix="", tags=["home"])
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(team_router, prefix="/teams", tags=["teams"])
 app.include_router(scrape_router, prefix="/scrape", tags=["scrape"])
 app.include_router(document_router, prefix="/documents", tags=["documents"])
-
-@app.on_event("startup")
-async def sync_database():
-    logger.debug("starting up...")
+app.include_router(system_router, prefix="/system", tags=["system"])
+app.include_router(metrics_router, prefix="", tags=["system"])
 
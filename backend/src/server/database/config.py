@@ -1,8 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+from src.server.database.pool import InstrumentedAsyncPool
+from src.server.database.routing import RoutingSession, configure_replicas, configure_shards
 import os
+import threading
 
 
 load_dotenv()
@@ -11,19 +17,238 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Comma-separated read replicas, same URL format as DATABASE_URL
+DATABASE_REPLICA_URLS = [
+    url.strip().replace("postgres://", "postgresql://", 1)
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# Databases a team's documents can be placed on, besides the primary:
+# comma-separated name=url pairs, same URL format as DATABASE_URL. Empty
+# keeps every team on the primary. See shard_service.
+DATABASE_SHARDS = {
+    name.strip(): url.strip().replace("postgres://", "postgresql://", 1)
+    for name, _, url in (entry.partition("=") for entry in os.getenv("DATABASE_SHARDS", "").split(","))
+    if name.strip() and url.strip()
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Async driver for each supported sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _pool_options(url: str) -> Dict[str, Any]:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # In-memory SQLite runs on a single static connection, there is nothing to size
+    if ":memory:" not in url:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def create_request_engine(url: str, name: str) -> AsyncEngine:
+    """Async engine with the configured pool, reporting stats under ``name``."""
+    options = _pool_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = InstrumentedAsyncPool
+    return create_async_engine(url, pool_logging_name=name, **options)
+
+
+def enable_sqlite_foreign_keys(engine: Engine) -> None:
+    """SQLite ignores foreign keys, including ON DELETE CASCADE, unless enabled per connection."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(DATABASE_URL) if DATABASE_URL else None)
+
+# Engines are created on first use rather than at import, so importing the app
+# (workers, CLI tools, scripts) neither loads database drivers nor connects.
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_replica_engines: List[AsyncEngine] = []
+_shard_engines: Dict[str, AsyncEngine] = {}
+_sync_shard_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+# Called with (sync engine, name) for every engine as it is created
+_engine_hooks: List[Callable[[Engine, str], None]] = []
+
+
+def on_engine_created(hook: Callable[[Engine, str], None]) -> None:
+    """Run ``hook`` for every engine, including those already created."""
+    _engine_hooks.append(hook)
+    for sync_engine, name in _created_engines():
+        hook(sync_engine, name)
+
+
+def _created_engines() -> List[Tuple[Engine, str]]:
+    engines = []
+    if _engine is not None:
+        engines.append((_engine, "sync"))
+    engines.extend((engine, f"shard-{name}-sync") for name, engine in _sync_shard_engines.items())
+    if _async_engine is not None:
+        engines.append((_async_engine.sync_engine, "primary"))
+        engines.extend((replica.sync_engine, f"replica-{index}") for index, replica in enumerate(_replica_engines))
+        engines.extend((shard.sync_engine, f"shard-{name}") for name, shard in _shard_engines.items())
+    return engines
+
+
+def _engine_created(sync_engine: Engine, name: str) -> None:
+    enable_sqlite_foreign_keys(sync_engine)
+    for hook in _engine_hooks:
+        hook(sync_engine, name)
+
+
+def get_engine() -> Engine:
+    """The sync engine, kept for DDL at startup, Alembic and maintenance scripts;
+    request handling goes through the async engines."""
+    global _engine
+    with _engines_lock:
+        if _engine is None:
+            _engine = create_engine(DATABASE_URL, pool_pre_ping=DB_POOL_PRE_PING, pool_recycle=DB_POOL_RECYCLE)
+            _engine_created(_engine, "sync")
+        return _engine
+
+
+def get_sync_shard_engines() -> Dict[str, Engine]:
+    """Sync engines of the shards, for DDL at startup and maintenance scripts."""
+    with _engines_lock:
+        for name, url in DATABASE_SHARDS.items():
+            if name not in _sync_shard_engines:
+                engine = create_engine(url, pool_pre_ping=DB_POOL_PRE_PING, pool_recycle=DB_POOL_RECYCLE)
+                _sync_shard_engines[name] = engine
+                _engine_created(engine, f"shard-{name}-sync")
+        return dict(_sync_shard_engines)
+
+
+def get_async_engine() -> AsyncEngine:
+    """The primary async engine; creates it and the replica and shard engines on first use."""
+    global _async_engine
+    with _engines_lock:
+        if _async_engine is None:
+            primary = create_request_engine(ASYNC_DATABASE_URL, "primary")
+            replicas = [
+                create_request_engine(to_async_url(url), f"replica-{index}")
+                for index, url in enumerate(DATABASE_REPLICA_URLS)
+            ]
+            shards = {
+                name: create_request_engine(to_async_url(url), f"shard-{name}")
+                for name, url in DATABASE_SHARDS.items()
+            }
+            _replica_engines[:] = replicas
+            _shard_engines.update(shards)
+            configure_replicas([replica.sync_engine for replica in replicas])
+            configure_shards({name: shard.sync_engine for name, shard in shards.items()})
+            _session_factory.configure(bind=primary)
+            _async_engine = primary
+            _engine_created(primary.sync_engine, "primary")
+            for index, replica in enumerate(replicas):
+                _engine_created(replica.sync_engine, f"replica-{index}")
+            for name, shard in shards.items():
+                _engine_created(shard.sync_engine, f"shard-{name}")
+        return _async_engine
+
+
+def get_replica_engines() -> List[AsyncEngine]:
+    get_async_engine()
+    return list(_replica_engines)
+
+
+def get_shard_engines() -> Dict[str, AsyncEngine]:
+    get_async_engine()
+    return dict(_shard_engines)
+
+
+def reset_engines_after_fork() -> None:
+    """Give a freshly forked worker its own connection pools.
+
+    Connections inherited from the parent are dropped without being closed,
+    since closing them would also close the parent's sockets.
+    """
+    for sync_engine, _ in _created_engines():
+        sync_engine.dispose(close=False)
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection; engines are recreated on next use."""
+    global _engine, _async_engine
+    with _engines_lock:
+        async_engines = [_async_engine, *_replica_engines, *_shard_engines.values()] if _async_engine else []
+        sync_engines = [_engine, *_sync_shard_engines.values()] if _engine else list(_sync_shard_engines.values())
+        _engine, _async_engine = None, None
+        _replica_engines.clear()
+        _shard_engines.clear()
+        _sync_shard_engines.clear()
+        configure_replicas([])
+        configure_shards({})
+        _session_factory.configure(bind=None)
+    for async_engine in async_engines:
+        await async_engine.dispose()
+    for engine in sync_engines:
+        engine.dispose()
+
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+_session_factory = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def AsyncSessionLocal(**kwargs) -> AsyncSession:
+    """New async session on the primary engine (see RoutingSession for replicas).
+
+    Named and called like the sessionmaker it wraps; it makes sure the
+    engines exist before the first session is bound.
+    """
+    get_async_engine()
+    return _session_factory(**kwargs)
+
+
+def SessionLocal(**kwargs) -> Session:
+    """New sync session on the sync engine."""
+    return Session(bind=get_engine(), autoflush=False, **kwargs)
+
 
-engine = create_engine(DATABASE_URL)
-print(engine)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
+
+async def get_async_db():
+    """Session bound to the primary, for handlers that write."""
+    async with AsyncSessionLocal() as db:
+        yield db
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_read_db():
+    """Session that may serve reads from a replica, for read-only handlers."""
+    async with AsyncSessionLocal(info={"read_only": True}) as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -0,0 +1,77 @@
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from dataclasses import dataclass
+from typing import Any, Dict
+import threading
+import time
+
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        self.checkouts += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        if timed_out:
+            self.timeouts += 1
+
+
+# Keyed by pool logging name; kept outside the pool because dispose() recreates it
+_wait_stats: Dict[str, PoolWaitStats] = {}
+_pools: Dict[str, "InstrumentedAsyncPool"] = {}
+_lock = threading.Lock()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        name = self.logging_name or "default"
+        with _lock:
+            _wait_stats.setdefault(name, PoolWaitStats())
+            _pools[name] = self
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with _lock:
+                _wait_stats[self.logging_name or "default"].record(waited, timed_out)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Utilization and checkout wait statistics for every instrumented pool."""
+    with _lock:
+        pools = dict(_pools)
+        waits = {name: PoolWaitStats(**vars(stats)) for name, stats in _wait_stats.items()}
+
+    stats = {}
+    for name, pool in pools.items():
+        wait = waits[name]
+        checked_out = pool.checkedout()
+        capacity = pool.size() + pool._max_overflow
+        stats[name] = {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "utilization": round(checked_out / capacity, 4) if capacity > 0 else 0.0,
+            "checkouts": wait.checkouts,
+            "timeouts": wait.timeouts,
+            "avg_wait_ms": round(wait.total_wait_seconds / wait.checkouts * 1000, 3) if wait.checkouts else 0.0,
+            "max_wait_ms": round(wait.max_wait_seconds * 1000, 3),
+        }
+    return stats
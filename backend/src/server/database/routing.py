@@ -0,0 +1,147 @@
+from sqlalchemy import event, inspect, Insert, Update, Delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import List, Optional, Dict, Any
+from dotenv import load_dotenv
+import os
+import random
+import time
+
+load_dotenv()
+
+# How long a client keeps reading from the primary after one of its writes
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+
+_replicas: List[Engine] = []
+
+# Tables that live on a team's shard (see shard_service); everything else stays on the primary
+SHARDED_TABLES = frozenset({"documents", "document_sections", "document_editor_states", "document_search"})
+
+# Shard name -> engine, for every shard other than the primary
+_shards: Dict[str, Engine] = {}
+
+# Per-request consistency state, installed by ReadYourWritesMiddleware
+_request_state: ContextVar[Optional[Dict[str, Any]]] = ContextVar("db_request_state", default=None)
+
+
+def configure_replicas(engines: List[Engine]) -> None:
+    _replicas[:] = engines
+
+
+def configure_shards(engines: Dict[str, Engine]) -> None:
+    _shards.clear()
+    _shards.update(engines)
+
+
+def _pinned_to_primary() -> bool:
+    state = _request_state.get()
+    return bool(state and (state["wrote"] or state["primary_until"] > time.time()))
+
+
+def use_primary(session) -> None:
+    """Send the session's further reads to the primary.
+
+    For reads that fill a shared cache: a lagging replica can still return
+    the row from before a write whose invalidation already ran, and the
+    cache would keep serving it to every client until the entry expires.
+    """
+    session.info["primary"] = True
+
+
+def _mark_write(session: Session) -> None:
+    session.info["wrote"] = True
+    state = _request_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+class RoutingSession(Session):
+    """Sends reads of read-only sessions to a replica, everything else to the primary.
+
+    A session is read-only when created with ``info={"read_only": True}``.
+    It falls back to the primary once it has written, after use_primary(),
+    when the current request has written, or while the client is inside its
+    read-your-writes window after an earlier write.
+
+    Statements on the SHARDED_TABLES go to the shard named by
+    ``info["shard"]`` instead, when that is not the primary. Raw SQL has no
+    mapper to tell its tables by; pass ``bind_arguments={"mapper": Document}``.
+    Shards have no replicas.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        shard = self.info.get("shard")
+        if shard in _shards and mapper is not None and inspect(mapper).local_table.name in SHARDED_TABLES:
+            return _shards[shard]
+
+        if (
+            not _replicas
+            or not self.info.get("read_only")
+            or self._flushing
+            or self.info.get("wrote")
+            or self.info.get("primary")
+            or isinstance(clause, (Insert, Update, Delete))
+            or _pinned_to_primary()
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+        # Stay on one replica for the whole session so reads are consistent
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(_replicas)
+        return self.info["replica"]
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    _mark_write(session)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write(orm_execute_state.session)
+
+
+class ReadYourWritesMiddleware:
+    """Keeps a client on the primary for a short window after it writes.
+
+    The window travels in a cookie, so it holds across workers and requests.
+    """
+
+    def __init__(self, app, window: float = DB_READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window = window
+
+    def _primary_until(self, scope) -> float:
+        for name, value in scope.get("headers", []):
+            if name == b"cookie":
+                morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+                if morsel:
+                    try:
+                        return float(morsel.value)
+                    except ValueError:
+                        return 0.0
+        return 0.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _replicas:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"wrote": False, "primary_until": self._primary_until(scope)}
+        token = _request_state.set(state)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state["wrote"]:
+                until = time.time() + self.window
+                cookie = f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message.setdefault("headers", []).append((b"set-cookie", cookie.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_state.reset(token)
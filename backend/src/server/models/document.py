@@ -1,10 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, JSON, Index
+from sqlalchemy.orm import relationship, backref
 from src.server.models.base import Base
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # A team stores each URL once; also serves lookups by team_id alone
+        Index("ix_documents_team_id_url", "team_id", "url", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
@@ -24,14 +28,16 @@ class Document(Base):
     # Relationships
     team = relationship("Team", backref="documents")
     user = relationship("User", backref="documents")
-    sections = relationship("DocumentSection", back_populates="document", cascade="all, delete-orphan")
+    # passive_deletes: the database cascades deletes, the ORM does not load the rows first
+    sections = relationship("DocumentSection", back_populates="document", cascade="all, delete-orphan", passive_deletes=True)
+    editor_state = relationship("DocumentEditorState", back_populates="document", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 class DocumentSection(Base):
     __tablename__ = "document_sections"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    parent_section_id = Column(Integer, ForeignKey("document_sections.id"), nullable=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    parent_section_id = Column(Integer, ForeignKey("document_sections.id", ondelete="CASCADE"), nullable=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     order = Column(Integer, nullable=False)
@@ -40,4 +46,36 @@ class DocumentSection(Base):
     
     # Relationships
     document = relationship("Document", back_populates="sections")
-    parent_section = relationship("DocumentSection", remote_side=[id], backref="subsections") 
\ No newline at end of file
+    parent_section = relationship("DocumentSection", remote_side=[id], backref=backref("subsections", passive_deletes=True))
+
+class DocumentEditorState(Base):
+    __tablename__ = "document_editor_states"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    # Version of the converter that produced editor_content
+    schema_version = Column(Integer, nullable=False)
+    # Document.updated_at the editor content was generated from
+    source_updated_at = Column(DateTime, nullable=False)
+    # Tiptap/ProseMirror JSON document built from Document.content
+    editor_content = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    document = relationship("Document", back_populates="editor_state")
+
+class DocumentChange(Base):
+    __tablename__ = "document_changes"
+    __table_args__ = (
+        # Change feed reads: a team's changes after a cursor, in order
+        Index("ix_document_changes_team_id_id", "team_id", "id"),
+    )
+
+    # Monotonic id, used as the feed cursor
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
+    # No foreign key: delete events outlive the document
+    document_id = Column(Integer, nullable=False)
+    # created, updated or deleted
+    action = Column(String, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Index
+from src.server.models.base import Base
+
+class TeamShard(Base):
+    __tablename__ = "team_shards"
+
+    # Teams without a row keep their documents on the primary
+    team_id = Column(Integer, ForeignKey("teams.id"), primary_key=True)
+    shard = Column(String, nullable=False)
+    # Set while the team's documents are being copied to another shard; writes wait until cleared
+    moving_to = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DocumentDirectory(Base):
+    __tablename__ = "document_directory"
+    __table_args__ = (
+        Index("ix_document_directory_team_id", "team_id"),
+    )
+
+    # Allocates document ids while sharding is on, so they stay unique across
+    # shards and survive moves. Rows are never deleted, so ids are not reused.
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
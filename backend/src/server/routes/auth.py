@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from src.server.database.config import get_db
+from src.server.database.config import get_async_db
 from src.server.schemas.user import UserCreate, UserResponse, Token, UserLogin
 from src.server.services.user_service import UserService
 from src.server.services.auth_service import AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -12,8 +12,8 @@ router = APIRouter()
  
 
 @router.post("/signup", response_model=UserResponse)
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
-    user_data = UserService.create_user(db, user)
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    user_data = await UserService.create_user(db, user)
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = AuthService.create_access_token(
@@ -28,8 +28,8 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=UserResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = UserService.authenticate_user(db, user_data.email, user_data.password)
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await UserService.authenticate_user(db, user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,43 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from src.server.database.config import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from src.server.database.config import get_async_db, get_async_read_db
 from src.server.schemas.document import (
     DocumentScrapeRequest,
     DocumentResponse,
     DocumentUpdateRequest,
     DocumentScrapeResponse,
+    DocumentSearchResult,
+    DocumentEditorResponse,
+    DocumentSummary,
+    DocumentChangeEvent,
+    DocumentBatchRequest,
+    DocumentBulkDeleteRequest,
     StoreScrapedDataRequest
 )
 from src.server.schemas.base import APIResponse
 from src.server.services.document_service import DocumentService
+from src.server.services.document_stream_service import DocumentStreamService
+from src.server.services.change_feed_service import ChangeFeedService
+from src.server.services.admission_service import admission, read_admission, write_admission
+from src.server.services.cache_service import DocumentCacheKeys
+from src.server.services.compression_service import choose_encoding, compressed_response
+from src.server.services.single_flight_service import document_flight, team_listing_flight
 import logging
 from datetime import datetime
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/team/{team_id}", response_model=APIResponse[List[DocumentResponse]])
-async def get_team_documents(team_id: int, db: Session = Depends(get_db)):
+@router.get("/team/{team_id}", response_model=APIResponse[Union[List[DocumentResponse], List[DocumentSummary]]], dependencies=[admission(read_admission)])
+async def get_team_documents(
+    team_id: int,
+    summary: bool = Query(False, description="Return metadata and section counts only"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
     Get all documents for a team.
     """
     try:
-        documents = DocumentService.get_team_documents(db, team_id)
-        # Convert SQLAlchemy models to Pydantic models
-        document_responses = [DocumentResponse.model_validate(doc) for doc in documents]
+        if summary:
+            documents = await team_listing_flight.do(
+                ("document_summaries", team_id),
+                lambda: DocumentService.get_team_document_summaries(db, team_id)
+            )
+        else:
+            documents = await team_listing_flight.do(
+                ("documents", team_id),
+                lambda: DocumentService.get_team_documents_data(db, team_id)
+            )
         return APIResponse(
             success=True,
             message="Team documents retrieved successfully",
-            data=document_responses,
+            data=documents,
             metadata={
                 "team_id": team_id,
                 "document_count": len(documents),
                 "retrieved_at": datetime.utcnow()
             }
-        )
+        ).to_response()
     except Exception as e:
-        logger.error(f"Error in get_team_documents: {str(e)}")
+        logger.error("Error in get_team_documents: %s", e)
         return APIResponse(
             success=False,
             message="Failed to fetch team documents",
@@ -45,26 +68,195 @@ async def get_team_documents(team_id: int, db: Session = Depends(get_db)):
                 "type": "internal_error",
                 "detail": str(e)
             }
-        )
+        ).to_response()
 
-@router.get("/{document_id}", response_model=APIResponse[DocumentResponse])
-async def get_document(document_id: int, db: Session = Depends(get_db)):
+@router.get("/team/{team_id}/changes", response_model=APIResponse[List[DocumentChangeEvent]], dependencies=[admission(read_admission)])
+async def get_team_document_changes(
+    team_id: int,
+    since: int = Query(0, ge=0, description="Cursor returned by the previous call; 0 for the full retained history"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """
-    Get a specific document by ID.
+    Document changes of a team after a cursor, oldest first.
+
+    Changes are kept for CHANGE_FEED_RETENTION_DAYS. For an older cursor the
+    error type is ``cursor_expired``: reload the team's documents, then
+    continue from ``metadata.cursor``.
     """
     try:
-        document = DocumentService.get_document(db, document_id)
-        # Convert SQLAlchemy model to Pydantic model
-        document_response = DocumentResponse.model_validate(document)
+        changes, cursor, has_more = await ChangeFeedService.get_changes(db, team_id, since, limit)
         return APIResponse(
             success=True,
-            message="Document retrieved successfully",
-            data=document_response,
+            message="Document changes retrieved successfully",
+            data=changes,
             metadata={
-                "document_id": document_id,
-                "team_id": document.team_id,
-                "sections_count": len(document.sections)
+                "team_id": team_id,
+                "cursor": cursor,
+                "has_more": has_more,
+                "change_count": len(changes)
+            }
+        ).to_response()
+    except HTTPException as e:
+        if e.status_code != status.HTTP_410_GONE:
+            raise
+        return APIResponse(
+            success=False,
+            message=str(e.detail),
+            metadata={
+                "team_id": team_id,
+                "cursor": await ChangeFeedService.restart_cursor(db)
+            },
+            error={
+                "type": "cursor_expired",
+                "detail": str(e.detail)
+            }
+        ).to_response()
+    except Exception as e:
+        logger.error("Error in get_team_document_changes: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to fetch document changes",
+            error={
+                "type": "internal_error",
+                "detail": str(e)
+            }
+        ).to_response()
+
+@router.get("/team/{team_id}/changes/stream")
+async def stream_team_document_changes(
+    team_id: int,
+    since: Optional[int] = Query(None, ge=0, description="Start after this cursor; defaults to live changes only"),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Server-sent events stream of a team's document changes. Reconnecting
+    clients resume from the Last-Event-ID header.
+    """
+    return ChangeFeedService.stream_changes(team_id, last_event_id if last_event_id is not None else since)
+
+@router.get("/team/{team_id}/search", response_model=APIResponse[List[DocumentSearchResult]], dependencies=[admission(read_admission)])
+async def search_team_documents(
+    team_id: int,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Full-text search over a team's document and section titles and content.
+    """
+    try:
+        results = await DocumentService.search_team_documents(db, team_id, q, limit)
+        return APIResponse(
+            success=True,
+            message="Search completed successfully",
+            data=[DocumentSearchResult(**result) for result in results],
+            metadata={
+                "team_id": team_id,
+                "query": q,
+                "result_count": len(results)
+            }
+        ).to_response()
+    except HTTPException as e:
+        return APIResponse(
+            success=False,
+            message=str(e.detail),
+            error={
+                "type": "unavailable" if e.status_code == 503 else "internal_error",
+                "detail": str(e.detail)
+            }
+        ).to_response()
+    except Exception as e:
+        logger.error("Error in search_team_documents: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to search team documents",
+            error={
+                "type": "internal_error",
+                "detail": str(e)
+            }
+        ).to_response()
+
+@router.post("/batch", response_model=APIResponse[Union[List[DocumentResponse], List[DocumentSummary]]], dependencies=[admission(read_admission)])
+async def get_documents_batch(request: DocumentBatchRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get several documents in one request, in the order of the requested ids.
+    Documents above the streaming threshold are left out and listed in
+    metadata.streamed_ids to be fetched individually.
+    """
+    try:
+        document_ids = list(dict.fromkeys(request.ids))
+        streamed_ids = []
+        if request.summary:
+            documents = {doc["id"]: doc for doc in await DocumentService.get_document_summaries(db, document_ids)}
+        else:
+            documents, streamed_ids = await DocumentService.get_documents_data(db, document_ids)
+
+        return APIResponse(
+            success=True,
+            message="Documents retrieved successfully",
+            data=[documents[document_id] for document_id in document_ids if document_id in documents],
+            metadata={
+                "requested_count": len(document_ids),
+                "document_count": len(documents),
+                "missing_ids": [
+                    document_id for document_id in document_ids
+                    if document_id not in documents and document_id not in streamed_ids
+                ],
+                "streamed_ids": streamed_ids
+            }
+        ).to_response()
+    except Exception as e:
+        logger.error("Error in get_documents_batch: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to fetch documents",
+            error={
+                "type": "internal_error",
+                "detail": str(e)
             }
+        ).to_response()
+
+@router.get("/{document_id}", response_model=APIResponse[DocumentResponse], dependencies=[admission(read_admission)])
+async def get_document(document_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get a specific document by ID. Documents above the streaming threshold
+    are sent incrementally instead of being serialized in one piece.
+
+    The compressed response is cached per document version and encoding, so
+    a hot document is serialized and compressed once; its ``timestamp`` is
+    the time that response was built.
+    """
+    try:
+        document = DocumentService.get_cached_document_data(document_id)
+        if document is None:
+            async def load():
+                # None for documents to stream, which every caller then streams itself
+                if await DocumentStreamService.should_stream(db, document_id):
+                    return None
+                return await DocumentService.load_document_data(db, document_id)
+
+            # Concurrent misses for the same document share one load
+            document = await document_flight.do(document_id, load)
+            if document is None:
+                return DocumentStreamService.stream_document(document_id)
+
+        def render() -> bytes:
+            return APIResponse(
+                success=True,
+                message="Document retrieved successfully",
+                data=document,
+                metadata={
+                    "document_id": document_id,
+                    "team_id": document["team_id"],
+                    "sections_count": len(document["sections"])
+                }
+            ).to_response().body
+
+        return compressed_response(
+            DocumentCacheKeys.document_body(document_id, document["updated_at"]),
+            choose_encoding(request.headers.get("accept-encoding")),
+            render,
         )
     except HTTPException as e:
         return APIResponse(
@@ -74,9 +266,9 @@ async def get_document(document_id: int, db: Session = Depends(get_db)):
                 "type": "not_found" if e.status_code == 404 else "internal_error",
                 "detail": str(e.detail)
             }
-        )
+        ).to_response()
     except Exception as e:
-        logger.error(f"Error in get_document: {str(e)}")
+        logger.error("Error in get_document: %s", e)
         return APIResponse(
             success=False,
             message="Failed to fetch document",
@@ -84,15 +276,52 @@ async def get_document(document_id: int, db: Session = Depends(get_db)):
                 "type": "internal_error",
                 "detail": str(e)
             }
-        )
+        ).to_response()
 
-@router.put("/{document_id}", response_model=APIResponse[DocumentResponse])
-async def update_document(document_id: int, updates: DocumentUpdateRequest, db: Session = Depends(get_db)):
+@router.get("/{document_id}/editor", response_model=APIResponse[DocumentEditorResponse], dependencies=[admission(read_admission)])
+async def get_editor_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the precomputed Tiptap/ProseMirror JSON of a document.
+    """
+    try:
+        editor_document = await DocumentService.get_editor_document(db, document_id)
+        return APIResponse(
+            success=True,
+            message="Editor document retrieved successfully",
+            data=editor_document,
+            metadata={
+                "document_id": document_id,
+                "schema_version": editor_document["schema_version"]
+            }
+        ).to_response()
+    except HTTPException as e:
+        return APIResponse(
+            success=False,
+            message=str(e.detail),
+            error={
+                "type": "not_found" if e.status_code == 404 else "internal_error",
+                "detail": str(e.detail)
+            }
+        ).to_response()
+    except Exception as e:
+        logger.error("Error in get_editor_document: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to fetch editor document",
+            error={
+                "type": "internal_error",
+                "detail": str(e)
+            }
+        ).to_response()
+
+@router.put("/{document_id}", response_model=APIResponse[DocumentResponse], dependencies=[admission(write_admission)])
+async def update_document(document_id: int, updates: DocumentUpdateRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Update a document's content.
     """
     try:
-        updated_document = DocumentService.update_document(db, document_id, updates.dict(exclude_unset=True))
+        changes = updates.model_dump(exclude_unset=True)
+        updated_document = await DocumentService.update_document(db, document_id, changes)
         # Convert SQLAlchemy model to Pydantic model
         document_response = DocumentResponse.model_validate(updated_document)
         return APIResponse(
@@ -101,10 +330,10 @@ async def update_document(document_id: int, updates: DocumentUpdateRequest, db:
             data=document_response,
             metadata={
                 "document_id": document_id,
-                "updated_fields": [k for k, v in updates.dict(exclude_unset=True).items()],
+                "updated_fields": list(changes),
                 "updated_at": datetime.utcnow()
             }
-        )
+        ).to_response()
     except HTTPException as e:
         return APIResponse(
             success=False,
@@ -113,9 +342,9 @@ async def update_document(document_id: int, updates: DocumentUpdateRequest, db:
                 "type": "not_found" if e.status_code == 404 else "internal_error",
                 "detail": str(e.detail)
             }
-        )
+        ).to_response()
     except Exception as e:
-        logger.error(f"Error in update_document: {str(e)}")
+        logger.error("Error in update_document: %s", e)
         return APIResponse(
             success=False,
             message="Failed to update document",
@@ -123,15 +352,15 @@ async def update_document(document_id: int, updates: DocumentUpdateRequest, db:
                 "type": "internal_error",
                 "detail": str(e)
             }
-        )
+        ).to_response()
 
-@router.delete("/{document_id}", response_model=APIResponse[None])
-async def delete_document(document_id: int, db: Session = Depends(get_db)):
+@router.delete("/{document_id}", response_model=APIResponse[None], dependencies=[admission(write_admission)])
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Delete a document.
     """
     try:
-        DocumentService.delete_document(db, document_id)
+        await DocumentService.delete_document(db, document_id)
         return APIResponse(
             success=True,
             message="Document deleted successfully",
@@ -139,7 +368,7 @@ async def delete_document(document_id: int, db: Session = Depends(get_db)):
                 "deleted_document_id": document_id,
                 "deleted_at": datetime.utcnow()
             }
-        )
+        ).to_response()
     except HTTPException as e:
         return APIResponse(
             success=False,
@@ -148,9 +377,9 @@ async def delete_document(document_id: int, db: Session = Depends(get_db)):
                 "type": "not_found" if e.status_code == 404 else "internal_error",
                 "detail": str(e.detail)
             }
-        )
+        ).to_response()
     except Exception as e:
-        logger.error(f"Error in delete_document: {str(e)}")
+        logger.error("Error in delete_document: %s", e)
         return APIResponse(
             success=False,
             message="Failed to delete document",
@@ -158,15 +387,49 @@ async def delete_document(document_id: int, db: Session = Depends(get_db)):
                 "type": "internal_error",
                 "detail": str(e)
             }
-        )
+        ).to_response()
 
-@router.post("/store-scraped", response_model=APIResponse[DocumentResponse])
-async def store_scraped_data(request: StoreScrapedDataRequest, db: Session = Depends(get_db)):
+@router.post("/bulk-delete", response_model=APIResponse[None], dependencies=[admission(write_admission)])
+async def bulk_delete_documents(request: DocumentBulkDeleteRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Delete many documents of a team, or all of them with all_documents=true.
+    Ids that do not belong to the team are reported in metadata.not_found_ids.
+    """
+    try:
+        deleted_ids = await DocumentService.delete_documents(db, request.team_id, request.document_ids)
+        deleted = set(deleted_ids)
+        return APIResponse(
+            success=True,
+            message="Documents deleted successfully",
+            metadata={
+                "team_id": request.team_id,
+                "deleted_count": len(deleted_ids),
+                "deleted_document_ids": deleted_ids,
+                "not_found_ids": [
+                    document_id for document_id in (request.document_ids or [])
+                    if document_id not in deleted
+                ],
+                "deleted_at": datetime.utcnow()
+            }
+        ).to_response()
+    except Exception as e:
+        logger.error("Error in bulk_delete_documents: %s", e)
+        return APIResponse(
+            success=False,
+            message="Failed to delete documents",
+            error={
+                "type": "internal_error",
+                "detail": str(e)
+            }
+        ).to_response()
+
+@router.post("/store-scraped", response_model=APIResponse[DocumentResponse], dependencies=[admission(write_admission)])
+async def store_scraped_data(request: StoreScrapedDataRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Store already scraped data as a new document.
     """
     try:
-        document = DocumentService.store_scraped_data(
+        document = await DocumentService.store_scraped_data(
             db=db,
             team_id=request.team_id,
             user_id=request.user_id,
@@ -185,7 +448,7 @@ async def store_scraped_data(request: StoreScrapedDataRequest, db: Session = Dep
                 "document_name": request.document_name,
                 "created_at": datetime.utcnow()
             }
-        )
+        ).to_response()
     except HTTPException as e:
         return APIResponse(
             success=False,
@@ -194,9 +457,9 @@ async def store_scraped_data(request: StoreScrapedDataRequest, db: Session = Dep
                 "type": "validation_error" if e.status_code == 400 else "internal_error",
                 "detail": str(e.detail)
             }
-        )
+        ).to_response()
     except Exception as e:
-        logger.error(f"Error in store_scraped_data: {str(e)}")
+        logger.error("Error in store_scraped_data: %s", e)
         return APIResponse(
             success=False,
             message="Failed to store scraped data",
@@ -204,4 +467,4 @@ async def store_scraped_data(request: StoreScrapedDataRequest, db: Session = Dep
                 "type": "internal_error",
                 "detail": str(e)
             }
-        ) 
\ No newline at end of file
+        ).to_response() 
\ No newline at end of file
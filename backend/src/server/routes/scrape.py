@@ -1,7 +1,8 @@
 import logging
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any
-from src.server.database.config import get_db
+from src.server.database.config import get_async_db
 from src.server.services.document_service import DocumentService
 from src.server.schemas.document import (
     DocumentScrapeRequest,
@@ -10,8 +11,10 @@ from src.server.schemas.document import (
     DocumentBase
 )
 from src.server.services.scraping_service import ScrapingService
+from src.server.services.admission_service import admitted, scrape_admission
+from src.server.services.single_flight_service import scrape_flight
 from src.server.schemas.base import APIResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 router = APIRouter()
@@ -20,16 +23,54 @@ logger = logging.getLogger(__name__)
 @router.post("/scrape_site", response_model=APIResponse[DocumentResponse])
 async def scrape_site_endpoint(
     request: DocumentScrapeRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Scrapes the site and stores all content in a single document.
+
+    Concurrent requests to scrape the same URL for the same team share one
+    crawl and all receive the document it stored.
     """
-    logger.debug(f"Received scrape request: {request.dict()}")
+    logger.debug("Received scrape request: %r", request)
+
+    async def crawl_and_store():
+        # Only the request doing the crawl takes a scrape slot; those sharing it wait for free
+        async with admitted(scrape_admission, str(request.team_id)):
+            # Crawling is blocking network + parsing work; keep it off the event loop
+            results = await run_in_threadpool(ScrapingService.scrape_site, request.url, request.max_pages)
+            if not results:
+                return None, 0
+
+            # Format all pages into a single document
+            formatted_data = {
+                "url": str(request.url),
+                "title": request.document_name,
+                "content": {
+                    "pages": results,
+                    "total_pages": len(results),
+                    "base_url": str(request.url)
+                },
+                "raw_html": ""  # Optional, can be empty
+            }
+
+            # Store everything in a single document
+            document = await DocumentService.store_scraped_data(
+                db=db,
+                team_id=request.team_id,
+                user_id=request.user_id,
+                document_name=request.document_name,
+                scraped_data=formatted_data
+            )
+
+            # Convert SQLAlchemy model to Pydantic model
+            return DocumentResponse.model_validate(document), len(results)
+
     try:
-        results = ScrapingService.scrape_site(request.url, request.max_pages)
-        
-        if not results or len(results) == 0:
+        document_response, pages_found = await scrape_flight.do(
+            (request.team_id, str(request.url)), crawl_and_store
+        )
+
+        if document_response is None:
             return APIResponse(
                 success=False,
                 message="No content was scraped from the URL",
@@ -37,35 +78,11 @@ async def scrape_site_endpoint(
                     "type": "scraping_error",
                     "detail": "No content could be extracted from the provided URL"
                 }
-            )
-
-        # Format all pages into a single document
-        formatted_data = {
-            "url": str(request.url),
-            "title": request.document_name,
-            "content": {
-                "pages": results,
-                "total_pages": len(results),
-                "base_url": str(request.url)
-            },
-            "raw_html": ""  # Optional, can be empty
-        }
-        
-        # Store everything in a single document
-        document = DocumentService.store_scraped_data(
-            db=db,
-            team_id=request.team_id,
-            user_id=request.user_id,
-            document_name=request.document_name,
-            scraped_data=formatted_data
-        )
-
-        # Convert SQLAlchemy model to Pydantic model
-        document_response = DocumentResponse.model_validate(document)
+            ).to_response()
 
         return APIResponse(
             success=True,
-            message=f"Successfully scraped {len(results)} pages and stored as a single document",
+            message=f"Successfully scraped {pages_found} pages and stored as a single document",
             data=document_response,
             metadata={
                 "team_id": request.team_id,
@@ -73,12 +90,15 @@ async def scrape_site_endpoint(
                 "document_name": request.document_name,
                 "url": str(request.url),
                 "scraped_at": datetime.utcnow(),
-                "pages_found": len(results)
+                "pages_found": pages_found
             }
-        )
+        ).to_response()
             
     except Exception as e:
-        logger.error(f"Error in scrape_site_endpoint: {str(e)}")
+        if isinstance(e, HTTPException) and e.status_code == 503:
+            # Shed by admission control; keep the status and Retry-After
+            raise
+        logger.error("Error in scrape_site_endpoint: %s", e)
         return APIResponse(
             success=False,
             message="Failed to scrape site",
@@ -86,4 +106,4 @@ async def scrape_site_endpoint(
                 "type": "scraping_error",
                 "detail": str(e)
             }
-        )
\ No newline at end of file
+        ).to_response()
\ No newline at end of file
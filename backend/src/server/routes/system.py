@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Query
+from src.server.database.pool import pool_stats
+from src.server.services.admission_service import admission_stats
+from src.server.services.auth_service import principal_cache
+from src.server.services.cache_service import get_cache
+from src.server.services.query_profiler_service import SQL_PROFILING, recent_profiles
+from src.server.services.shard_service import ShardService
+from src.server.services.single_flight_service import single_flight_stats
+
+router = APIRouter()
+
+@router.get("/cache")
+async def cache_stats():
+    """Hit rate, eviction and size counters of the document response cache."""
+    return get_cache().stats()
+
+@router.get("/database")
+async def database_stats():
+    """Utilization and checkout wait times of the primary, replica and shard connection pools."""
+    return pool_stats()
+
+@router.get("/auth")
+async def auth_cache_stats():
+    """Hit rate and size of the verified token cache used by get_current_user."""
+    return principal_cache.stats()
+
+
+@router.get("/admission")
+async def admission_control_stats():
+    """Slots in use, queue depth and shed requests of every admission class."""
+    return admission_stats()
+
+
+@router.get("/single-flight")
+async def single_flight_call_stats():
+    """Calls that ran the work (leaders) and calls that shared an in-flight result (followers)."""
+    return single_flight_stats()
+
+
+@router.get("/shards")
+async def shard_stats():
+    """Configured document shards and how many teams are mapped to each."""
+    return await ShardService.stats()
+
+
+@router.get("/queries")
+async def query_profiles(n_plus_one: bool = Query(False)):
+    """SQL reports of the latest requests, newest first; needs SQL_PROFILING=true."""
+    return {"enabled": SQL_PROFILING, "requests": recent_profiles(n_plus_one)}
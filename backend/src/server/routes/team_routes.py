@@ -1,33 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from src.server.database.config import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.server.database.config import get_async_db, get_async_read_db
 from src.server.services.team_service import TeamService
 from src.server.schemas.team import (
-    TeamCreate, TeamInvite, TeamResponse, TeamMemberList, 
+    TeamCreate, TeamInvite, TeamBulkInvite, TeamBulkInviteResponse, TeamResponse, TeamMemberList, 
     TeamMemberResponse, UserTeamResponse, UserTeamsListResponse,
     MyTeamRequest, JoinTeamRequest, TeamExistsResponse
 )
 from typing import List
-from src.server.services.auth_service import get_current_user
-from src.server.models.user import User
+from src.server.services.auth_service import get_current_user, UserPrincipal
+from src.server.services.admission_service import admission, read_admission, write_admission
+from src.server.services.single_flight_service import team_listing_flight
+from src.utils.logging_config import RateLimitedLogger
 import logging
 
 logger = logging.getLogger(__name__)
+# my-teams, members and exists are called on most page loads
+hot_path_logger = RateLimitedLogger(logger)
 
 router = APIRouter()
 
-@router.post("/create", response_model=TeamResponse)
+@router.post("/create", response_model=TeamResponse, dependencies=[admission(write_admission)])
 async def create_team(
     team_data: TeamCreate,
-    db: Session = Depends(get_db),
-    # current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    # current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Create a new team with the current user as the creator and first member"""
-    logger.info(f"Attempting to create team '{team_data.name}' for user {team_data.created_by}")
+    logger.info("Attempting to create team '%s' for user %s", team_data.name, team_data.created_by)
     team_service = TeamService(db)
     try:
-        team = team_service.create_team(team_data, team_data.created_by)
-        logger.info(f"Team '{team.name}' created successfully with ID {team.id}")
+        team = await team_service.create_team(team_data, team_data.created_by)
+        logger.info("Team '%s' created successfully with ID %s", team.name, team.id)
         return TeamResponse(
             id=team.id,
             name=team.name,
@@ -41,134 +45,169 @@ async def create_team(
             ]
         )
     except HTTPException as he:
-        logger.error(f"HTTP error while creating team: {str(he.detail)}")
+        logger.error("HTTP error while creating team: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while creating team: {str(e)}")
+        logger.error("Unexpected error while creating team: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/invite", response_model=TeamMemberResponse)
+@router.post("/invite", response_model=TeamMemberResponse, dependencies=[admission(write_admission)])
 async def invite_team_member(
     invite_data: TeamInvite,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Invite a user to join a team"""
-    logger.info(f"Attempting to invite user {invite_data.email} to team {invite_data.team_id}")
+    logger.info("Attempting to invite user %s to team %s", invite_data.email, invite_data.team_id)
     team_service = TeamService(db)
     try:
-        team_member = team_service.invite_member(invite_data)
-        logger.info(f"Successfully invited user {invite_data.email} to team {invite_data.team_id}")
+        team_member = await team_service.invite_member(invite_data)
+        logger.info("Successfully invited user %s to team %s", invite_data.email, invite_data.team_id)
         return TeamMemberResponse(
             email=team_member.user.email,
             joined_at=team_member.joined_at
         )
     except HTTPException as he:
-        logger.error(f"HTTP error while inviting member: {str(he.detail)}")
+        logger.error("HTTP error while inviting member: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while inviting member: {str(e)}")
+        logger.error("Unexpected error while inviting member: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/my-teams", response_model=UserTeamsListResponse)
+@router.post("/invite/bulk", response_model=TeamBulkInviteResponse, dependencies=[admission(write_admission)])
+async def bulk_invite_team_members(
+    invite_data: TeamBulkInvite,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Invite many users to a team at once, reporting the outcome for each email"""
+    logger.info("Attempting to invite %s users to team %s", len(invite_data.emails), invite_data.team_id)
+    team_service = TeamService(db)
+    try:
+        results = await team_service.bulk_invite_members(invite_data)
+        return TeamBulkInviteResponse(
+            team_id=invite_data.team_id,
+            added=sum(1 for result in results if result["status"] == "added"),
+            results=results
+        )
+    except HTTPException as he:
+        logger.error("HTTP error while inviting members: %s", he.detail)
+        raise he
+    except Exception as e:
+        logger.error("Unexpected error while inviting members: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/my-teams", response_model=UserTeamsListResponse, dependencies=[admission(read_admission)])
 async def get_user_teams(
     form_data: MyTeamRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all teams created by the current user with their members"""
-    logger.info(f"Fetching teams for user {form_data.user_id}")
+    """Get all teams of the user with member counts and the first members of each"""
+    hot_path_logger.info("Fetching teams for user %s", form_data.user_id)
     team_service = TeamService(db)
     try:
-        teams = team_service.get_user_teams(form_data.user_id)
-        response = UserTeamsListResponse(
-            teams=[
-                UserTeamResponse(
-                    id=team.id,
-                    name=team.name,
-                    created_at=team.created_at,
-                    member_count=len(team.members),
-                    members=[
-                        TeamMemberResponse(
-                            email=member.user.email,
-                            joined_at=member.joined_at
-                        ) for member in team.members
-                    ]
-                ) for team in teams
-            ]
+        async def load() -> UserTeamsListResponse:
+            teams = await team_service.get_user_teams(form_data.user_id, form_data.member_limit)
+            return UserTeamsListResponse(
+                teams=[
+                    UserTeamResponse(
+                        id=entry["team"].id,
+                        name=entry["team"].name,
+                        created_at=entry["team"].created_at,
+                        member_count=entry["member_count"],
+                        members=[
+                            TeamMemberResponse(**member) for member in entry["members"]
+                        ]
+                    ) for entry in teams
+                ]
+            )
+
+        # Identical concurrent requests share one load of the finished response
+        response = await team_listing_flight.do(
+            ("user_teams", form_data.user_id, form_data.member_limit), load
         )
-        logger.info(f"Successfully retrieved {len(teams)} teams for user {form_data.user_id}")
+        hot_path_logger.info("Successfully retrieved %s teams for user %s", len(response.teams), form_data.user_id)
         return response
     except HTTPException as he:
-        logger.error(f"HTTP error while fetching user teams: {str(he.detail)}")
+        logger.error("HTTP error while fetching user teams: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while fetching user teams: {str(e)}")
+        logger.error("Unexpected error while fetching user teams: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{team_id}/members", response_model=TeamMemberList)
+@router.get("/{team_id}/members", response_model=TeamMemberList, dependencies=[admission(read_admission)])
 async def get_team_members(
     team_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    """Get all members of a team"""
-    logger.info(f"Fetching members for team {team_id}")
+    """Get one page of the members of a team, in join order"""
+    hot_path_logger.info("Fetching members for team %s", team_id)
     team_service = TeamService(db)
     try:
-        members = team_service.get_team_members(team_id)
-        response = TeamMemberList(
-            members=[
-                TeamMemberResponse(
-                    email=member.user.email,
-                    joined_at=member.joined_at
-                ) for member in members
-            ]
-        )
-        logger.info(f"Successfully retrieved {len(members)} members for team {team_id}")
+        async def load() -> TeamMemberList:
+            members, total = await team_service.get_team_members(team_id, limit, offset)
+            return TeamMemberList(
+                members=[
+                    TeamMemberResponse(
+                        email=member.user.email,
+                        joined_at=member.joined_at
+                    ) for member in members
+                ],
+                total=total,
+                limit=limit,
+                offset=offset
+            )
+
+        # Shared after each caller's own authentication; the page does not depend on the caller
+        response = await team_listing_flight.do(("team_members", team_id, limit, offset), load)
+        hot_path_logger.info("Successfully retrieved %s members for team %s", len(response.members), team_id)
         return response
     except HTTPException as he:
-        logger.error(f"HTTP error while fetching team members: {str(he.detail)}")
+        logger.error("HTTP error while fetching team members: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while fetching team members: {str(e)}")
+        logger.error("Unexpected error while fetching team members: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/join", response_model=TeamMemberResponse)
+@router.post("/join", response_model=TeamMemberResponse, dependencies=[admission(write_admission)])
 async def join_team(
     join_data: JoinTeamRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Join a team with the given team_id and user_id"""
-    logger.info(f"Attempting to add user {join_data.user_id} to team {join_data.team_id}")
+    logger.info("Attempting to add user %s to team %s", join_data.user_id, join_data.team_id)
     team_service = TeamService(db)
     try:
-        team_member = team_service.join_team(join_data)
-        logger.info(f"Successfully added user to team {join_data.team_id}")
+        team_member = await team_service.join_team(join_data)
+        logger.info("Successfully added user to team %s", join_data.team_id)
         return TeamMemberResponse(
             email=team_member.user.email,
             joined_at=team_member.joined_at
         )
     except HTTPException as he:
-        logger.error(f"HTTP error while joining team: {str(he.detail)}")
+        logger.error("HTTP error while joining team: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while joining team: {str(e)}")
+        logger.error("Unexpected error while joining team: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/exists/{team_id}", response_model=TeamExistsResponse)
+@router.get("/exists/{team_id}", response_model=TeamExistsResponse, dependencies=[admission(read_admission)])
 async def check_team_exists(
     team_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Check if a team exists by team_id"""
-    logger.info(f"Checking if team {team_id} exists")
+    hot_path_logger.info("Checking if team %s exists", team_id)
     team_service = TeamService(db)
     try:
-        result = team_service.check_team_exists(team_id)
+        result = await team_service.check_team_exists(team_id)
         return TeamExistsResponse(**result)
     except HTTPException as he:
-        logger.error(f"HTTP error while checking team: {str(he.detail)}")
+        logger.error("HTTP error while checking team: %s", he.detail)
         raise he
     except Exception as e:
-        logger.error(f"Unexpected error while checking team: {str(e)}")
+        logger.error("Unexpected error while checking team: %s", e)
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
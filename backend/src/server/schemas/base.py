@@ -1,5 +1,6 @@
 from typing import TypeVar, Generic, Dict, Any, Optional, List, Union
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
 
 DataT = TypeVar('DataT')
@@ -10,9 +11,17 @@ class APIResponse(Generic[DataT], BaseModel):
     message: str
     data: Optional[DataT] = None
     metadata: Dict[str, Any] = {}
-    timestamp: datetime = datetime.utcnow()
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
     error: Optional[Dict[str, Any]] = None
 
+    def to_response(self, status_code: int = 200) -> ORJSONResponse:
+        """Serialize with orjson, skipping FastAPI's second response_model validation pass.
+
+        ``data`` is expected to be validated already (a response model or a
+        cached, serialized payload), so it is dumped as-is.
+        """
+        return ORJSONResponse(self.model_dump(), status_code=status_code)
+
 class PaginatedAPIResponse(APIResponse[List[DataT]], BaseModel):
     """Response model for paginated results"""
     total: int
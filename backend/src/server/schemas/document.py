@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, ConfigDict
+from pydantic import BaseModel, HttpUrl, ConfigDict, Field, model_validator
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
@@ -43,6 +43,39 @@ class DocumentResponse(DocumentBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class DocumentSummary(BaseModel):
+    """Document metadata without content or sections."""
+    id: int
+    team_id: int
+    document_name: str
+    title: str
+    url: str
+    created_at: datetime
+    updated_at: datetime
+    sections_count: int
+
+class DocumentChangeEvent(BaseModel):
+    cursor: int
+    document_id: int
+    action: str
+    changed_at: datetime
+
+class DocumentBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=100)
+    summary: bool = False
+
+class DocumentBulkDeleteRequest(BaseModel):
+    team_id: int
+    document_ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    # Must be set explicitly to delete every document of the team
+    all_documents: bool = False
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.document_ids is None) == (not self.all_documents):
+            raise ValueError("Provide either document_ids or all_documents=true")
+        return self
+
 class DocumentUpdateRequest(BaseModel):
     title: Optional[str] = None
     content: Optional[Dict[str, Any]] = None
@@ -73,4 +106,17 @@ class StoreScrapedDataRequest(BaseModel):
     team_id: int
     user_id: int
     document_name: str
-    scraped_data: Dict[str, Any]
\ No newline at end of file
+    scraped_data: Dict[str, Any]
+
+class DocumentSearchResult(BaseModel):
+    document_id: int
+    section_id: Optional[int] = None
+    title: str
+    snippet: str
+    score: float
+
+class DocumentEditorResponse(BaseModel):
+    document_id: int
+    schema_version: int
+    source_updated_at: datetime
+    content: Dict[str, Any]
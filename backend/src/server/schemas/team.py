@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class TeamCreate(BaseModel):
     name: str
@@ -20,6 +20,20 @@ class TeamInvite(BaseModel):
     email: EmailStr
     team_id: int
 
+class TeamBulkInvite(BaseModel):
+    team_id: int
+    emails: List[EmailStr] = Field(..., min_length=1, max_length=1000)
+
+class TeamInviteResult(BaseModel):
+    email: str
+    status: Literal["added", "already_member", "user_not_found"]
+    joined_at: Optional[datetime] = None
+
+class TeamBulkInviteResponse(BaseModel):
+    team_id: int
+    added: int
+    results: List[TeamInviteResult]
+
 class JoinTeamRequest(BaseModel):
     team_id: int
     user_id: int
@@ -43,6 +57,9 @@ class TeamResponse(BaseModel):
 
 class TeamMemberList(BaseModel):
     members: List[TeamMemberResponse]
+    total: Optional[int] = None
+    limit: Optional[int] = None
+    offset: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -65,6 +82,8 @@ class UserTeamsListResponse(BaseModel):
 
 class MyTeamRequest(BaseModel):
     user_id: int
+    # Members listed per team; the rest are paged through /teams/{team_id}/members
+    member_limit: int = Field(5, ge=0, le=100)
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,256 @@
+from fastapi import Depends, HTTPException, Request, status
+from contextlib import asynccontextmanager
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from dotenv import load_dotenv
+import asyncio
+import logging
+import math
+import os
+import time
+from src.utils.logging_config import RateLimitedLogger
+
+load_dotenv()
+
+# Off switch for the route admission classes; password hashing stays bounded either way
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+# Requests of a class running at once, and how many more may wait for a slot.
+# Keep reads plus writes within DB_POOL_SIZE + DB_MAX_OVERFLOW, so admitted
+# requests do not queue again for a connection.
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "20"))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "200"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "10"))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "100"))
+# Crawls hold a thread for seconds to minutes; few run at once so they cannot crowd out the rest
+ADMISSION_SCRAPE_LIMIT = int(os.getenv("ADMISSION_SCRAPE_LIMIT", "2"))
+ADMISSION_SCRAPE_QUEUE = int(os.getenv("ADMISSION_SCRAPE_QUEUE", "8"))
+# Longest wait for a slot before the request is shed
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+ADMISSION_SCRAPE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_SCRAPE_QUEUE_TIMEOUT_SECONDS", "30"))
+# Largest share of a class's slots, and of its queue, one team may hold
+ADMISSION_TEAM_SHARE = float(os.getenv("ADMISSION_TEAM_SHARE", "0.5"))
+
+logger = logging.getLogger(__name__)
+# Shedding happens under overload, when a line per request would make things worse
+shed_logger = RateLimitedLogger(logger)
+
+_controllers: Dict[str, "AdmissionController"] = {}
+
+
+class AdmissionController:
+    """Bounds the concurrent requests of one class and shares the slots fairly between teams.
+
+    Up to ``limit`` requests run at once and up to ``queue_limit`` more wait.
+    A request is shed with 503 and ``Retry-After`` when the queue is full or
+    when it has waited ``queue_timeout`` seconds, so overload turns into fast
+    rejections instead of a growing backlog and timeouts everywhere.
+
+    Waiting requests queue per team, and freed slots go to the teams in turn
+    (round-robin), so one busy team delays its own requests rather than
+    everyone's. A team holds at most ``team_share`` of the slots and of the
+    queue. Requests without a team share one queue and are not capped.
+
+    Runs on the event loop; not thread-safe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_limit: int,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        team_share: float = ADMISSION_TEAM_SHARE,
+        retry_after: int = 1,
+        detail: str = "Server is busy, try again shortly",
+    ):
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.team_limit = max(1, math.ceil(limit * team_share))
+        self.team_queue_limit = max(1, math.ceil(queue_limit * team_share))
+        self.retry_after = retry_after
+        self.detail = detail
+
+        self.active = 0
+        self.queued = 0
+        self._active_by_team: Dict[Any, int] = {}
+        # team -> its waiters in arrival order; dict order is the round-robin order
+        self._queues: Dict[Any, Deque[asyncio.Future]] = {}
+
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait_seconds = 0.0
+        _controllers[name] = self
+
+    def _has_room(self, team: Any) -> bool:
+        if self.active >= self.limit:
+            return False
+        return team is None or self._active_by_team.get(team, 0) < self.team_limit
+
+    def _start(self, team: Any) -> None:
+        self.active += 1
+        self.admitted += 1
+        if team is not None:
+            self._active_by_team[team] = self._active_by_team.get(team, 0) + 1
+
+    def _release(self, team: Any) -> None:
+        self.active -= 1
+        if team is not None:
+            remaining = self._active_by_team[team] - 1
+            if remaining:
+                self._active_by_team[team] = remaining
+            else:
+                del self._active_by_team[team]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting teams, one per team per round."""
+        progress = True
+        while progress and self._queues and self.active < self.limit:
+            progress = False
+            for team in list(self._queues):
+                if not self._has_room(team):
+                    continue
+                waiters = self._queues.pop(team)
+                waiter = waiters.popleft()
+                self.queued -= 1
+                if waiters:
+                    # Back of the line: the other teams go first next round
+                    self._queues[team] = waiters
+                progress = True
+                if waiter.done():
+                    # Cancelled by a timeout whose acquire() has not run its cleanup yet
+                    continue
+                self._start(team)
+                waiter.set_result(None)
+
+    def _remove(self, team: Any, waiter: asyncio.Future) -> None:
+        waiters = self._queues.get(team)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self.queued -= 1
+        if not waiters:
+            del self._queues[team]
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=self.detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def acquire(self, team: Any = None) -> None:
+        if team not in self._queues and self._has_room(team):
+            self._start(team)
+            return
+
+        if self.queued >= self.queue_limit or (
+            team is not None and len(self._queues.get(team, ())) >= self.team_queue_limit
+        ):
+            self.rejected += 1
+            raise self._overloaded()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(team, deque()).append(waiter)
+        self.queued += 1
+        self.waited += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the wait ended
+                self._release(team)
+            else:
+                self._remove(team, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                shed_logger.warning("Shed %s request of team %s after waiting %.1fs", self.name, team, self.queue_timeout)
+                raise self._overloaded()
+            raise
+        finally:
+            self.max_wait_seconds = max(self.max_wait_seconds, time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot(self, team: Any = None) -> AsyncIterator[None]:
+        await self.acquire(team)
+        try:
+            yield
+        finally:
+            self._release(team)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_limit": self.queue_limit,
+            "team_limit": self.team_limit,
+            "active": self.active,
+            "queued": self.queued,
+            "teams_waiting": len(self._queues),
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+read_admission = AdmissionController("read", ADMISSION_READ_LIMIT, ADMISSION_READ_QUEUE)
+write_admission = AdmissionController("write", ADMISSION_WRITE_LIMIT, ADMISSION_WRITE_QUEUE)
+scrape_admission = AdmissionController(
+    "scrape", ADMISSION_SCRAPE_LIMIT, ADMISSION_SCRAPE_QUEUE,
+    queue_timeout=ADMISSION_SCRAPE_QUEUE_TIMEOUT_SECONDS, retry_after=10,
+    detail="Too many scrape requests, try again later",
+)
+
+
+async def _request_team(request: Request) -> Optional[str]:
+    """Team of the request from its path or JSON body, if it names one."""
+    team = request.path_params.get("team_id")
+    if team is None and request.method in ("POST", "PUT", "PATCH"):
+        try:
+            # Already parsed and cached by FastAPI for the body parameter
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            team = body.get("team_id")
+    return None if team is None else str(team)
+
+
+def admission(controller: AdmissionController):
+    """Route dependency holding a slot of ``controller`` while the handler runs.
+
+        @router.post("/scrape_site", dependencies=[admission(scrape_admission)])
+
+    The slot is released when the handler returns; the body of a streamed
+    response is sent after that.
+    """
+
+    async def admit(request: Request) -> AsyncIterator[None]:
+        async with admitted(controller, await _request_team(request) if ADMISSION_CONTROL else None):
+            yield
+
+    return Depends(admit)
+
+
+@asynccontextmanager
+async def admitted(controller: AdmissionController, team: Optional[str] = None) -> AsyncIterator[None]:
+    """Holds a slot of ``controller`` for the block, unless ADMISSION_CONTROL is off.
+
+    For handlers that admit only part of their work, where the admission()
+    dependency would hold the slot for the whole request.
+    """
+    if not ADMISSION_CONTROL:
+        yield
+        return
+    async with controller.slot(team):
+        yield
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: controller.stats() for name, controller in _controllers.items()}
@@ -1,15 +1,26 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.server.models.user import User
-from src.server.database.config import get_db
+from src.server.database.config import get_async_db
+from src.server.services.cache_service import InMemoryCache, InvalidationTable, shared_invalidations
+from src.server.services.admission_service import AdmissionController
+import asyncio
+import functools
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
 # Load environment variables
 load_dotenv()
 
@@ -17,18 +28,71 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified tokens are remembered for at most this long, and never past their exp.
+# Changes to a user reach the caches of every worker on the host at once (see
+# CACHE_INVALIDATION_FILE); other hosts only see them after this long.
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+
+# bcrypt cost factor; hashes with a different cost are rehashed at the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads that run bcrypt (it releases the GIL) and how many more calls may wait for one
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+
+@functools.lru_cache(maxsize=None)
+def pwd_context() -> "CryptContext":
+    """Built on first use: passlib and its bcrypt handler are only needed by
+    signup and login, and would otherwise add to every worker's boot."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool instead of the event loop.
+
+    At most ``workers`` hashes run at once and ``queue_limit`` more may wait;
+    beyond that calls fail fast with 503 so a login storm cannot build an
+    unbounded backlog or starve the default executor used by other handlers.
+    The bound is the "auth" class of the admission controller.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._admission = AdmissionController(
+            "auth", workers, queue_limit,
+            detail="Too many authentication requests, try again shortly",
+        )
+
+    async def run(self, fn, *args):
+        async with self._admission.slot():
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+
+password_hasher = PasswordHasher()
+
+
 class AuthService:
+    @staticmethod
+    async def hash_password(password: str) -> str:
+        return await password_hasher.run(pwd_context().hash, password)
+
+    @staticmethod
+    async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password off the event loop; also returns a new hash if the stored one is outdated."""
+        return await password_hasher.run(pwd_context().verify_and_update, plain_password, hashed_password)
+
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return pwd_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return pwd_context().hash(password)
 
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -42,17 +106,17 @@ class AuthService:
         return encoded_jwt
 
     @staticmethod
-    def verify_token(token: str) -> str:
+    def decode_token(token: str) -> Dict[str, Any]:
+        """Verified claims of a token; the subject is guaranteed to be present."""
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            email: str = payload.get("sub")
-            if email is None:
+            if payload.get("sub") is None:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Could not validate credentials",
                     headers={"WWW-Authenticate": "Bearer"},
                 )
-            return email
+            return payload
         except JWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,16 +124,109 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+    @staticmethod
+    def verify_token(token: str) -> str:
+        return AuthService.decode_token(token)["sub"]
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The authenticated user of a request, detached from any session."""
+    id: int
+    email: str
+    created_at: Optional[datetime]
+
+
+class PrincipalCache:
+    """Maps bearer tokens to verified principals.
+
+    Entries live in a bounded InMemoryCache keyed by a digest of the token and
+    expire no later than the token itself. Each entry carries the
+    invalidation generation of its user, keyed by the token subject (the
+    email), as read before the user was loaded; invalidate_user() moves it
+    in the shared table, which drops every cached token of the user in every
+    worker process at once.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+        ttl: float = AUTH_CACHE_TTL_SECONDS,
+        invalidations: InvalidationTable = shared_invalidations,
+    ):
+        self.ttl = ttl
+        self.invalidations = invalidations
+        self._cache = InMemoryCache(max_entries=max_entries, ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return "principal:" + hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _user_key(email: str) -> str:
+        return "principal-user:" + email
+
+    def generation(self, email: str) -> int:
+        """Read before loading the user, and passed to set()."""
+        return self.invalidations.generation(self._user_key(email))
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        key = self._key(token)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        principal, generation = entry
+        if generation != self.generation(principal.email):
+            self._cache.delete(key)
+            return None
+        return principal
+
+    def set(self, token: str, principal: UserPrincipal, expires_at: float, generation: int) -> None:
+        ttl = min(self.ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._cache.set(self._key(token), (principal, generation), ttl=ttl)
+
+    def invalidate_user(self, email: str) -> None:
+        self.invalidations.invalidate(self._user_key(email))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_principal(mapper, connection, user):
+    # Tokens name the user by email, including the one it had before this change
+    for email in {user.email, *inspect(user).attrs.email.history.deleted}:
+        if email:
+            principal_cache.invalidate_user(email)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    email = AuthService.verify_token(token)
-    user = db.query(User).filter(User.email == email).first()
+    db: AsyncSession = Depends(get_async_db)
+) -> UserPrincipal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = AuthService.decode_token(token)
+    generation = principal_cache.generation(payload["sub"])
+    user = (await db.execute(select(User).where(User.email == payload["sub"]))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
\ No newline at end of file
+
+    principal = UserPrincipal(id=user.id, email=user.email, created_at=user.created_at)
+    # Tokens from create_access_token always carry exp; others are capped by the TTL alone
+    principal_cache.set(token, principal, payload.get("exp", float("inf")), generation)
+    return principal
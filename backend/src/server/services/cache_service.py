@@ -0,0 +1,249 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+load_dotenv()
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+# File shared by the worker processes of a server, through which one worker's
+# invalidations reach the others; gunicorn.conf.py sets it. Empty: this process only.
+CACHE_INVALIDATION_FILE = os.getenv("CACHE_INVALIDATION_FILE", "")
+CACHE_INVALIDATION_SLOTS = 65536
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class CacheBackend(ABC):
+    """Interface for response caches.
+
+    Values are JSON-compatible structures (dicts, lists, scalars) so that
+    an out-of-process cache only has to (de)serialize them.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after ``ttl`` seconds (backend default when None)."""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Invalidate the given keys."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and size information."""
+
+
+class InvalidationTable:
+    """Invalidation counters shared by the worker processes of one server.
+
+    Invalidating a key increments the counter of its slot (a CRC of the key
+    picks one of ``slots``). A cache entry remembers its slot's counter from
+    before the value was loaded and counts as a miss once the counter has
+    moved, whichever process moved it. Keys sharing a slot invalidate each
+    other, which only costs a miss.
+
+    Backed by a file mapped into every process (CACHE_INVALIDATION_FILE,
+    on /dev/shm under gunicorn); without one, by memory of this process.
+    Workers on other hosts are not reached: run several hosts with an
+    external backend (set_cache_backend) or a short CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = CACHE_INVALIDATION_SLOTS):
+        self.path = path
+        self.slots = slots
+        size = slots * 8
+        self._fd = None
+        if path:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+        else:
+            self._map = mmap.mmap(-1, size)
+        self._lock = threading.Lock()
+
+    def _offset(self, key: str) -> int:
+        return (zlib.crc32(key.encode()) % self.slots) * 8
+
+    def generation(self, key: str) -> int:
+        return struct.unpack_from("Q", self._map, self._offset(key))[0]
+
+    def invalidate(self, key: str) -> None:
+        offset = self._offset(key)
+        # Read-modify-write under a lock on the slot, so concurrent increments from
+        # several processes are not lost (the file lock does not exclude threads)
+        with self._lock:
+            if self._fd is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 8, offset)
+            try:
+                generation = struct.unpack_from("Q", self._map, offset)[0]
+                struct.pack_into("Q", self._map, offset, (generation + 1) % 2 ** 64)
+            finally:
+                if self._fd is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, 8, offset)
+
+
+shared_invalidations = InvalidationTable(CACHE_INVALIDATION_FILE or None)
+
+
+class InMemoryCache(CacheBackend):
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL.
+
+    With ``invalidations``, delete() also reaches the copies of other worker
+    processes sharing the table (see InvalidationTable). An entry is then
+    tagged with its key's generation as of the miss that preceded the load,
+    so a value read before a concurrent invalidation is never served after it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL_SECONDS,
+        invalidations: Optional[InvalidationTable] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidations = invalidations
+        # key -> (expires_at, generation, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        # key -> generation at the first miss since the key was last set
+        self._miss_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def _generation(self, key: str) -> int:
+        return self.invalidations.generation(key) if self.invalidations is not None else 0
+
+    def _miss(self, key: str) -> None:
+        self._stats.misses += 1
+        if self.invalidations is not None:
+            if len(self._miss_generations) >= self.max_entries:
+                # Misses that were never followed by a set; their loads are long over
+                self._miss_generations.clear()
+            self._miss_generations.setdefault(key, self._generation(key))
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._miss(key)
+                return None
+
+            expires_at, generation, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats.expirations += 1
+                self._miss(key)
+                return None
+            if generation != self._generation(key):
+                # Invalidated by another worker
+                del self._entries[key]
+                self._stats.invalidations += 1
+                self._miss(key)
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            generation = self._miss_generations.pop(key, None)
+            if generation is None:
+                generation = self._generation(key)
+            self._entries[key] = (expires_at, generation, value)
+            self._entries.move_to_end(key)
+            self._stats.sets += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                if self.invalidations is not None:
+                    self.invalidations.invalidate(key)
+                if self._entries.pop(key, None) is not None:
+                    self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._miss_generations.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "shared_invalidation": self.invalidations is not None and bool(self.invalidations.path),
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                **self._stats.to_dict(),
+            }
+
+
+_backend: CacheBackend = InMemoryCache(invalidations=shared_invalidations)
+
+
+def get_cache() -> CacheBackend:
+    return _backend
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
+    """Swap the process-wide cache, e.g. for an external cache implementation."""
+    global _backend
+    logger.info("Using cache backend %s", type(backend).__name__)
+    _backend = backend
+
+
+class DocumentCacheKeys:
+    @staticmethod
+    def document(document_id: int) -> str:
+        return f"document:{document_id}"
+
+    @staticmethod
+    def document_body(document_id: int, version: str) -> str:
+        return f"document_body:{document_id}:{version}"
+
+    @staticmethod
+    def team_documents(team_id: int) -> str:
+        return f"team_documents:{team_id}"
@@ -0,0 +1,240 @@
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterable, Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from src.server.database.config import AsyncSessionLocal
+from src.server.models.document import DocumentChange
+import asyncio
+import logging
+import orjson
+import os
+
+load_dotenv()
+
+# Live streams re-check the database at least this often, which also picks up
+# changes made by other worker processes
+CHANGE_FEED_POLL_SECONDS = float(os.getenv("CHANGE_FEED_POLL_SECONDS", "2"))
+CHANGE_FEED_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_FEED_KEEPALIVE_SECONDS", "15"))
+CHANGE_FEED_BATCH_SIZE = 500
+# Changes are kept this long (0: forever); cursors older than what is left get
+# a cursor_expired error and must reload the team's documents
+CHANGE_FEED_RETENTION_DAYS = float(os.getenv("CHANGE_FEED_RETENTION_DAYS", "7"))
+CHANGE_FEED_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHANGE_FEED_PRUNE_INTERVAL_SECONDS", "3600"))
+
+# Namespace of the PostgreSQL advisory locks that order a team's changes
+_TEAM_LOCK_CLASS = 0x63686E67
+
+logger = logging.getLogger(__name__)
+
+# Wakes this process's live streams of a team as soon as it commits a change
+_team_events: Dict[int, asyncio.Event] = {}
+
+
+class ChangeFeedService:
+    """Per-team log of document create/update/delete events.
+
+    Every change gets a monotonically increasing id that clients keep as a
+    cursor; asking for the changes after it returns only what happened since,
+    so staying in sync costs O(changes) instead of reloading the team's
+    documents. Full documents are fetched separately, e.g. through
+    POST /documents/batch.
+
+    A cursor is only safe if no change of the team can still commit with a
+    lower id. Ids are handed out when the row is inserted, so recording takes
+    a per-team lock first that is held until commit (see lock_teams): a
+    team's changes are numbered in commit order. Changes older than
+    CHANGE_FEED_RETENTION_DAYS are pruned.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    @staticmethod
+    async def lock_teams(db: AsyncSession, team_ids: Iterable[int]) -> None:
+        """Hold the teams' change locks until the session's transaction ends.
+        ShardService.move_team() takes them too, to wait out in-flight writes.
+
+        On PostgreSQL, transactions that got their ids from the sequence in one
+        order may commit in another, and a reader could move its cursor past
+        an id that only becomes visible later. SQLite needs no lock: a writer
+        holds the database lock from its first write until it commits.
+        """
+        if db.get_bind(mapper=DocumentChange).dialect.name != "postgresql":
+            return
+        # Always in the same order, so two multi-team writes cannot deadlock
+        for team_id in sorted(set(team_ids)):
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_class, :team_id)"),
+                {"lock_class": _TEAM_LOCK_CLASS, "team_id": team_id},
+                bind_arguments={"mapper": DocumentChange},
+            )
+
+    @staticmethod
+    async def record(db: AsyncSession, team_id: int, document_id: int, action: str) -> None:
+        """Add a change to the session; it is committed with the change itself.
+        Call right before committing, since it holds the team's change lock until then."""
+        await ChangeFeedService.lock_teams(db, [team_id])
+        db.add(DocumentChange(team_id=team_id, document_id=document_id, action=action))
+
+    @staticmethod
+    async def record_many(db: AsyncSession, documents: List[Tuple[int, int]], action: str) -> None:
+        """Record a change for every (team_id, document_id) pair in one
+        executemany INSERT. Does not commit."""
+        if not documents:
+            return
+        await ChangeFeedService.lock_teams(db, (team_id for team_id, _ in documents))
+        changed_at = datetime.utcnow()
+        await db.execute(insert(DocumentChange), [
+            {"team_id": team_id, "document_id": document_id, "action": action, "changed_at": changed_at}
+            for team_id, document_id in documents
+        ])
+
+    @staticmethod
+    def notify(team_id: int) -> None:
+        """Wake live streams of the team. Call after the change is committed."""
+        event = _team_events.pop(team_id, None)
+        if event is not None:
+            event.set()
+
+    @staticmethod
+    def _to_dict(change: DocumentChange) -> Dict[str, Any]:
+        return {
+            "cursor": change.id,
+            "document_id": change.document_id,
+            "action": change.action,
+            "changed_at": change.changed_at,
+        }
+
+    @staticmethod
+    async def get_changes(db: AsyncSession, team_id: int, since: int, limit: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """Changes after the cursor, the cursor to continue from and whether more are waiting.
+
+        Raises 410 when changes after the cursor may have been pruned; the
+        client reloads the team's documents and continues from restart_cursor().
+        """
+        if CHANGE_FEED_RETENTION_DAYS > 0:
+            # Ids below the oldest one left were pruned (or never committed)
+            oldest = await db.scalar(select(func.min(DocumentChange.id)))
+            if oldest is not None and since < oldest - 1:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail=f"Changes after cursor {since} are no longer kept; reload the team's documents",
+                )
+        result = await db.execute(
+            select(DocumentChange)
+            .where(DocumentChange.team_id == team_id, DocumentChange.id > since)
+            .order_by(DocumentChange.id)
+            .limit(limit + 1)
+        )
+        changes = result.scalars().all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        cursor = changes[-1].id if changes else since
+        return [ChangeFeedService._to_dict(change) for change in changes], cursor, has_more
+
+    @staticmethod
+    async def latest_cursor(db: AsyncSession, team_id: int) -> int:
+        return await db.scalar(
+            select(func.max(DocumentChange.id)).where(DocumentChange.team_id == team_id)
+        ) or 0
+
+    @staticmethod
+    async def restart_cursor(db: AsyncSession) -> int:
+        """Cursor to continue from after reloading; later than every stored change."""
+        return await db.scalar(select(func.max(DocumentChange.id))) or 0
+
+    @staticmethod
+    async def prune(db: AsyncSession) -> int:
+        """Delete the changes older than the retention period and commit;
+        returns how many. The newest change is always kept, since the oldest
+        id left is what tells clients that their cursor expired."""
+        cutoff = datetime.utcnow() - timedelta(days=CHANGE_FEED_RETENTION_DAYS)
+        # Walks the primary key from the start: changed_at grows with the id
+        keep_from = await db.scalar(
+            select(DocumentChange.id).where(DocumentChange.changed_at >= cutoff).order_by(DocumentChange.id).limit(1)
+        )
+        if keep_from is None:
+            keep_from = await db.scalar(select(func.max(DocumentChange.id)))
+            if keep_from is None:
+                return 0
+        result = await db.execute(delete(DocumentChange).where(DocumentChange.id < keep_from))
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def prune_periodically() -> None:
+        """Prune every CHANGE_FEED_PRUNE_INTERVAL_SECONDS until cancelled. Runs
+        in every worker; concurrent prunes delete the same rows."""
+        while True:
+            await asyncio.sleep(CHANGE_FEED_PRUNE_INTERVAL_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    pruned = await ChangeFeedService.prune(db)
+                if pruned:
+                    logger.info("Pruned %s document changes older than %s days", pruned, CHANGE_FEED_RETENTION_DAYS)
+            except Exception as e:
+                logger.error("Error pruning document changes: %s", e)
+
+    @staticmethod
+    def stream_changes(team_id: int, since: Optional[int]) -> StreamingResponse:
+        return StreamingResponse(
+            ChangeFeedService._iter_events(team_id, since),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    async def _iter_events(team_id: int, since: Optional[int]) -> AsyncIterator[bytes]:
+        """Server-sent events, one per change. The event id is the cursor, so a
+        reconnecting EventSource resumes through Last-Event-ID. An expired
+        cursor gets a ``reset`` event: the client reloads the team's documents
+        while the stream continues after the event's id."""
+        if since is None:
+            async with AsyncSessionLocal(info={"read_only": True}) as db:
+                since = await ChangeFeedService.latest_cursor(db, team_id)
+        yield f"retry: {int(CHANGE_FEED_POLL_SECONDS * 1000)}\n\n".encode()
+
+        loop = asyncio.get_running_loop()
+        last_sent = loop.time()
+        while True:
+            # Taken before querying so a commit during the query is not missed
+            event = _team_events.setdefault(team_id, asyncio.Event())
+
+            # No connection is held between polls
+            expired = False
+            async with AsyncSessionLocal(info={"read_only": True}) as db:
+                try:
+                    changes, since, has_more = await ChangeFeedService.get_changes(
+                        db, team_id, since, CHANGE_FEED_BATCH_SIZE
+                    )
+                except HTTPException as e:
+                    if e.status_code != status.HTTP_410_GONE:
+                        raise
+                    since = await ChangeFeedService.restart_cursor(db)
+                    expired = True
+
+            if expired:
+                yield b"id: %d\nevent: reset\ndata: %s\n\n" % (since, orjson.dumps({"cursor": since}))
+                last_sent = loop.time()
+                continue
+
+            if changes:
+                yield b"".join(
+                    b"id: %d\nevent: change\ndata: %s\n\n" % (change["cursor"], orjson.dumps(change))
+                    for change in changes
+                )
+                last_sent = loop.time()
+                if has_more:
+                    continue
+            elif loop.time() - last_sent >= CHANGE_FEED_KEEPALIVE_SECONDS:
+                yield b": keep-alive\n\n"
+                last_sent = loop.time()
+
+            try:
+                await asyncio.wait_for(event.wait(), timeout=CHANGE_FEED_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
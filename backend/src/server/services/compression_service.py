@@ -0,0 +1,204 @@
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+from typing import Callable, Optional
+from dotenv import load_dotenv
+from src.server.services.cache_service import InMemoryCache
+from src.server.services.metrics_service import record_compression
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies gain little and cost a compressor setup; streamed bodies are always compressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Fast settings: most of the size reduction of the maximum levels at a fraction of the CPU
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Compressed document responses kept, one per document version and encoding
+COMPRESSED_CACHE_MAX_ENTRIES = int(os.getenv("COMPRESSED_CACHE_MAX_ENTRIES", "512"))
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "text/event-stream":
+        # Events must reach the client as they are sent, not when a compressor flushes
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type in _COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The encoding to respond with for an Accept-Encoding header, None for identity."""
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor; every chunk is flushed so the client receives it right away."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 16 + MAX_WBITS writes the gzip header and trailer
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with brotli or gzip.
+
+    Applies to compressible content types (JSON, text, XML; not server-sent
+    events) of at least ``minimum_size`` bytes, or of any size when the body
+    is streamed. Responses that already have a Content-Encoding, such as the
+    cached document bodies of compressed_response, pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+        # None until the first body message decides; then True (compress) or False (pass through)
+        compressing: Optional[bool] = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, compressing
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if "content-encoding" in headers or not is_compressible(headers.get("content-type", "")):
+                    compressing = False
+                    await send(message)
+                else:
+                    # Held back until the first body shows whether compressing pays off
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or compressing is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressing is None:
+                headers = MutableHeaders(scope=start_message)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    compressing = False
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressing = True
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    compressor = StreamCompressor(encoding)
+                    del headers["Content-Length"]
+                else:
+                    compressed = compress(body, encoding)
+                    record_compression(encoding, len(body), len(compressed))
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+
+            chunk = compressor.compress(body) if body else b""
+            if not more_body:
+                chunk += compressor.finish()
+            record_compression(encoding, len(body), len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# Compressed bodies are bytes, so they get their own in-process cache
+# rather than the shared response cache, whose values are JSON structures
+compressed_cache = InMemoryCache(max_entries=COMPRESSED_CACHE_MAX_ENTRIES)
+
+
+def compressed_response(key: str, encoding: Optional[str], render: Callable[[], bytes]) -> Response:
+    """JSON response whose compressed body is cached under ``key`` per encoding.
+
+    ``key`` must change whenever the body would (e.g. include the updated_at
+    of a document), since entries are not invalidated. ``render`` serializes
+    the body; it is only called on a cache miss, or when the client accepts
+    no compression.
+    """
+    if encoding is None:
+        return Response(render(), media_type="application/json", headers={"Vary": "Accept-Encoding"})
+
+    cache_key = f"{key}:{encoding}"
+    body = compressed_cache.get(cache_key)
+    if body is None:
+        raw = render()
+        if len(raw) < COMPRESSION_MIN_BYTES:
+            return Response(raw, media_type="application/json", headers={"Vary": "Accept-Encoding"})
+        body = compress(raw, encoding)
+        record_compression(encoding, len(raw), len(body))
+        compressed_cache.set(cache_key, body)
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+    )
@@ -1,52 +1,102 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from fastapi.concurrency import run_in_threadpool
 import logging
-from typing import Dict, Any, List
-from src.server.models.document import Document, DocumentSection
+from typing import Dict, Any, List, Optional, Tuple
+from src.server.database.routing import use_primary
+from src.server.models.document import Document, DocumentSection, DocumentEditorState
 from src.server.models.team import Team
 from src.server.models.user import User
 from src.server.services.scraping_service import ScrapingService
+from src.server.services.search_service import SearchService
+from src.server.services.document_stream_service import DocumentStreamService
+from src.server.services.change_feed_service import ChangeFeedService
+from src.server.services.editor_service import EditorService
+from src.server.services.shard_service import ShardService
+from src.server.services.cache_service import get_cache, DocumentCacheKeys
+from src.server.schemas.document import DocumentResponse
+from src.utils.logging_config import RateLimitedLogger
 from fastapi import HTTPException, status
 
 logger = logging.getLogger(__name__)
+# Team document listings and searches run on every page of the client
+hot_path_logger = RateLimitedLogger(logger)
+
+# Summary projection: metadata columns and a section count, no JSON content
+_sections_count = (
+    select(func.count())
+    .where(DocumentSection.document_id == Document.id)
+    .correlate(Document)
+    .scalar_subquery()
+)
+_SUMMARY_COLUMNS = (
+    Document.id,
+    Document.team_id,
+    Document.document_name,
+    Document.title,
+    Document.url,
+    Document.created_at,
+    Document.updated_at,
+    _sections_count.label("sections_count"),
+)
 
 class DocumentService:
     @staticmethod
-    def create_document_from_url(db: Session, team_id: int, user_id: int, url: str, document_name: str) -> Document:
-        """Create a new document by scraping the given URL."""
+    async def _verify_team_and_user(db: AsyncSession, team_id: int, user_id: int) -> None:
         # Verify team exists
-        team = db.query(Team).filter(Team.id == team_id).first()
+        team = await db.get(Team, team_id)
         if not team:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Team with id {team_id} not found"
             )
-        
+
         # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"User with id {user_id} not found"
             )
-        
-        # Check if document with this URL already exists for the team
-        existing_doc = db.query(Document).filter(
-            Document.team_id == team_id,
-            Document.url == url
-        ).first()
-        
-        if existing_doc:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Document with URL {url} already exists for this team"
+
+    @staticmethod
+    def _duplicate_url_error(url: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Document with URL {url} already exists for this team"
+        )
+
+    @staticmethod
+    async def _verify_url_is_new(db: AsyncSession, team_id: int, url: str) -> None:
+        # Check if document with this URL already exists for the team. Only worth
+        # doing before an expensive scrape; the unique (team_id, url) index is
+        # what actually guarantees it.
+        existing_doc = (await db.execute(
+            select(Document.id).where(
+                Document.team_id == team_id,
+                Document.url == url
             )
-        
+        )).first()
+
+        if existing_doc:
+            raise DocumentService._duplicate_url_error(url)
+
+    @staticmethod
+    async def create_document_from_url(db: AsyncSession, team_id: int, user_id: int, url: str, document_name: str) -> Document:
+        """Create a new document by scraping the given URL."""
+        await ShardService.use_team(db, team_id, write=True)
+        await DocumentService._verify_team_and_user(db, team_id, user_id)
+        await DocumentService._verify_url_is_new(db, team_id, url)
+
         try:
-            # Scrape the URL
-            structured_content, raw_html = ScrapingService.scrape_url(url)
-            
+            # Scrape the URL (blocking HTTP + parsing) off the event loop
+            structured_content, raw_html = await run_in_threadpool(ScrapingService.scrape_url, url)
+
             # Create document
             document = Document(
+                id=await ShardService.allocate_document_id(db, team_id),
                 team_id=team_id,
                 user_id=user_id,
                 document_name=document_name,
@@ -55,128 +105,312 @@ class DocumentService:
                 content=structured_content["content"],
                 raw_html=raw_html
             )
-            
+
             db.add(document)
-            db.commit()
-            db.refresh(document)
-            
+            await db.flush()
+
             # Create sections
-            DocumentService._create_sections(db, document, structured_content["content"]["sections"])
-            
-            logger.info(f"Successfully created document from URL: {url}")
-            return document
-            
+            await DocumentService._create_sections(db, document, structured_content["content"]["sections"])
+
+            await SearchService.index_document(db, document)
+            db.add(EditorService.create_state(document))
+            await ChangeFeedService.record(db, team_id, document.id, ChangeFeedService.CREATED)
+            await ShardService.confirm_write(db, team_id)
+            await db.commit()
+            get_cache().delete(DocumentCacheKeys.team_documents(team_id))
+            ChangeFeedService.notify(team_id)
+
+            logger.info("Successfully created document from URL: %s", url)
+            return await DocumentService.get_document(db, document.id)
+
+        except HTTPException:
+            # The team started moving (confirm_write)
+            await db.rollback()
+            raise
+        except IntegrityError:
+            # Stored concurrently while this request was scraping
+            await db.rollback()
+            raise DocumentService._duplicate_url_error(url)
         except ValueError as e:
-            logger.error(f"Error creating document: {str(e)}")
+            logger.error("Error creating document: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=str(e)
             )
         except Exception as e:
-            logger.error(f"Unexpected error creating document: {str(e)}")
+            logger.error("Unexpected error creating document: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An unexpected error occurred while creating the document"
             )
-    
-    @staticmethod
-    def _create_sections(db: Session, document: Document, sections: List[Dict[str, Any]], parent_id: int = None, order: int = 0) -> None:
-        """Recursively create document sections."""
-        for section in sections:
-            # Create section
-            doc_section = DocumentSection(
-                document_id=document.id,
-                parent_section_id=parent_id,
-                title=section["title"],
-                content=section["content"],
-                order=order
-            )
-            db.add(doc_section)
-            db.commit()
-            db.refresh(doc_section)
-            
-            # Create subsections recursively
-            if section.get("subsections"):
-                DocumentService._create_sections(
-                    db,
-                    document,
-                    section["subsections"],
-                    doc_section.id,
-                    0
-                )
-            order += 1
-    
+
+    @staticmethod
+    async def _create_sections(db: AsyncSession, document: Document, sections: List[Dict[str, Any]]) -> None:
+        """Create document sections with one bulk INSERT per nesting level; the
+        ids RETURNING gives back become the parents of the next level. The
+        caller commits."""
+        # (parent section id, order among siblings, section) of the level to insert
+        level = [(None, order, section) for order, section in enumerate(sections)]
+        while level:
+            section_ids = (await db.scalars(
+                insert(DocumentSection).returning(DocumentSection.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "document_id": document.id,
+                        "parent_section_id": parent_id,
+                        "title": section["title"],
+                        "content": section["content"],
+                        "order": order,
+                    }
+                    for parent_id, order, section in level
+                ]
+            )).all()
+            level = [
+                (section_id, order, subsection)
+                for section_id, (_, _, section) in zip(section_ids, level)
+                for order, subsection in enumerate(section.get("subsections") or [])
+            ]
+
     @staticmethod
-    def get_team_documents(db: Session, team_id: int) -> List[Document]:
+    async def get_team_documents(db: AsyncSession, team_id: int) -> List[Document]:
         """Get all documents for a team."""
-        logger.info(f"Getting documents for team {team_id}")
-        return db.query(Document).filter(Document.team_id == team_id).all()
-    
+        hot_path_logger.info("Getting documents for team %s", team_id)
+        await ShardService.use_team(db, team_id)
+        result = await db.execute(
+            select(Document)
+            .where(Document.team_id == team_id)
+            .options(selectinload(Document.sections))
+        )
+        return result.scalars().all()
+
     @staticmethod
-    def get_document(db: Session, document_id: int) -> Document:
-        """Get a specific document by ID."""
-        document = db.query(Document).filter(Document.id == document_id).first()
+    async def get_document(db: AsyncSession, document_id: int) -> Document:
+        """Get a specific document by ID, with its sections loaded."""
+        await ShardService.use_document(db, document_id)
+        result = await db.execute(
+            select(Document)
+            .where(Document.id == document_id)
+            .options(selectinload(Document.sections))
+        )
+        document = result.scalars().first()
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Document with id {document_id} not found"
             )
         return document
-    
+
+    @staticmethod
+    async def get_team_document_summaries(db: AsyncSession, team_id: int) -> List[Dict[str, Any]]:
+        """Summaries of a team's documents, without loading content or sections."""
+        await ShardService.use_team(db, team_id)
+        result = await db.execute(
+            select(*_SUMMARY_COLUMNS)
+            .where(Document.team_id == team_id)
+            .order_by(Document.id)
+        )
+        return [row._asdict() for row in result]
+
+    @staticmethod
+    async def get_document_summaries(db: AsyncSession, document_ids: List[int]) -> List[Dict[str, Any]]:
+        """Summaries of the given documents in one query per shard, in no particular order."""
+        summaries = []
+        async for ids in ShardService.each_shard(db, document_ids):
+            result = await db.execute(select(*_SUMMARY_COLUMNS).where(Document.id.in_(ids)))
+            summaries.extend(row._asdict() for row in result)
+        return summaries
+
+    @staticmethod
+    async def get_documents_data(db: AsyncSession, document_ids: List[int]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """Serialized documents by id, served from the cache where possible.
+
+        Cache misses are loaded with one IN query for the documents and one for
+        their sections, per shard. Documents above the streaming threshold are not loaded;
+        their ids are returned separately so the caller can fetch them one by one.
+        """
+        documents = {}
+        missing = []
+        for document_id in document_ids:
+            cached = DocumentService.get_cached_document_data(document_id)
+            if cached is not None:
+                documents[document_id] = cached
+            else:
+                missing.append(document_id)
+
+        oversized = []
+        async for shard_missing in ShardService.each_shard(db, missing):
+            shard_oversized = await DocumentStreamService.oversized_ids(db, shard_missing)
+            oversized.extend(shard_oversized)
+            skipped = set(shard_oversized)
+            to_load = [document_id for document_id in shard_missing if document_id not in skipped]
+            if to_load:
+                use_primary(db)
+                result = await db.execute(
+                    select(Document)
+                    .where(Document.id.in_(to_load))
+                    .options(selectinload(Document.sections))
+                )
+                cache = get_cache()
+                for document in result.scalars():
+                    data = DocumentResponse.model_validate(document).model_dump(mode="json")
+                    cache.set(DocumentCacheKeys.document(document.id), data)
+                    documents[document.id] = data
+
+        return documents, oversized
+
+    @staticmethod
+    async def get_team_documents_data(db: AsyncSession, team_id: int) -> List[Dict[str, Any]]:
+        """Serialized team documents, served from the read-through cache."""
+        cache = get_cache()
+        key = DocumentCacheKeys.team_documents(team_id)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        use_primary(db)
+        data = [
+            DocumentResponse.model_validate(doc).model_dump(mode="json")
+            for doc in await DocumentService.get_team_documents(db, team_id)
+        ]
+        cache.set(key, data)
+        return data
+
+    @staticmethod
+    def get_cached_document_data(document_id: int) -> Optional[Dict[str, Any]]:
+        """Serialized document if it is in the cache, None otherwise."""
+        return get_cache().get(DocumentCacheKeys.document(document_id))
+
+    @staticmethod
+    async def load_document_data(db: AsyncSession, document_id: int) -> Dict[str, Any]:
+        """Serialize a document from the database and populate the cache."""
+        use_primary(db)
+        data = DocumentResponse.model_validate(
+            await DocumentService.get_document(db, document_id)
+        ).model_dump(mode="json")
+        get_cache().set(DocumentCacheKeys.document(document_id), data)
+        return data
+
+    @staticmethod
+    async def get_document_data(db: AsyncSession, document_id: int) -> Dict[str, Any]:
+        """Serialized document, served from the read-through cache."""
+        cached = DocumentService.get_cached_document_data(document_id)
+        if cached is not None:
+            return cached
+        return await DocumentService.load_document_data(db, document_id)
+
     @staticmethod
-    def update_document(db: Session, document_id: int, updates: Dict[str, Any]) -> Document:
+    async def update_document(db: AsyncSession, document_id: int, updates: Dict[str, Any]) -> Document:
         """Update a document's content."""
-        document = DocumentService.get_document(db, document_id)
-        
+        await ShardService.use_document(db, document_id, write=True)
+        document = await DocumentService.get_document(db, document_id)
+
         for key, value in updates.items():
             if hasattr(document, key):
                 setattr(document, key, value)
-        
-        db.commit()
-        db.refresh(document)
+
+        if "title" in updates:
+            await SearchService.update_document_title(db, document)
+
+        await ChangeFeedService.record(db, document.team_id, document_id, ChangeFeedService.UPDATED)
+        await ShardService.confirm_write(db, document.team_id)
+        await db.commit()
+        get_cache().delete(
+            DocumentCacheKeys.document(document_id),
+            DocumentCacheKeys.team_documents(document.team_id)
+        )
+        ChangeFeedService.notify(document.team_id)
+        await db.refresh(document)
         return document
-    
+
     @staticmethod
-    def delete_document(db: Session, document_id: int) -> None:
-        """Delete a document."""
-        document = DocumentService.get_document(db, document_id)
-        db.delete(document)
-        db.commit()
+    async def _delete_documents_where(db: AsyncSession, *criteria) -> List[Tuple[int, int]]:
+        """Delete the matching documents and everything hanging off them with
+        set-based statements, without loading any row into the session.
+        Returns the (id, team_id) of each deleted document. The session must
+        already be routed to the documents' shard. Does not commit.
+
+        Children are deleted explicitly as well as by ON DELETE CASCADE, so
+        databases created before the cascade migration are cleaned up too.
+        """
+        deleted = (await db.execute(select(Document.id, Document.team_id).where(*criteria))).all()
+        if not deleted:
+            return []
+
+        matching = select(Document.id).where(*criteria)
+        await SearchService.remove_documents(db, [document_id for document_id, _ in deleted])
+        await ChangeFeedService.record_many(
+            db, [(team_id, document_id) for document_id, team_id in deleted], ChangeFeedService.DELETED
+        )
+        await db.execute(
+            delete(DocumentEditorState)
+            .where(DocumentEditorState.document_id.in_(matching))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(DocumentSection)
+            .where(DocumentSection.document_id.in_(matching))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Document)
+            .where(*criteria)
+            .execution_options(synchronize_session=False)
+        )
+        return [tuple(row) for row in deleted]
 
     @staticmethod
-    def store_scraped_data(db: Session, team_id: int, user_id: int, document_name: str, scraped_data: Dict[str, Any]) -> Document:
-        """Store already scraped data as a new document."""
-        # Verify team exists
-        team = db.query(Team).filter(Team.id == team_id).first()
-        if not team:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Team with id {team_id} not found"
-            )
-        
-        # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+    def _after_delete(deleted: List[Tuple[int, int]]) -> None:
+        team_ids = {team_id for _, team_id in deleted}
+        get_cache().delete(
+            *(DocumentCacheKeys.document(document_id) for document_id, _ in deleted),
+            *(DocumentCacheKeys.team_documents(team_id) for team_id in team_ids)
+        )
+        for team_id in team_ids:
+            ChangeFeedService.notify(team_id)
+
+    @staticmethod
+    async def delete_document(db: AsyncSession, document_id: int) -> None:
+        """Delete a document."""
+        await ShardService.use_document(db, document_id, write=True)
+        deleted = await DocumentService._delete_documents_where(db, Document.id == document_id)
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with id {user_id} not found"
-            )
-        
-        # Check if document with this URL already exists for the team
-        existing_doc = db.query(Document).filter(
-            Document.team_id == team_id,
-            Document.url == scraped_data["url"]
-        ).first()
-        
-        if existing_doc:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Document with URL {scraped_data['url']} already exists for this team"
+                detail=f"Document with id {document_id} not found"
             )
-        
+        await ShardService.confirm_write(db, deleted[0][1])
+        await db.commit()
+        DocumentService._after_delete(deleted)
+
+    @staticmethod
+    async def delete_documents(db: AsyncSession, team_id: int, document_ids: Optional[List[int]] = None) -> List[int]:
+        """Delete the given documents of a team, or all of them when no ids are
+        given. Returns the ids that were deleted."""
+        criteria = [Document.team_id == team_id]
+        if document_ids is not None:
+            criteria.append(Document.id.in_(document_ids))
+        await ShardService.use_team(db, team_id, write=True)
+        try:
+            deleted = await DocumentService._delete_documents_where(db, *criteria)
+            await ShardService.confirm_write(db, team_id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        DocumentService._after_delete(deleted)
+        logger.info("Deleted %s documents of team %s", len(deleted), team_id)
+        return [document_id for document_id, _ in deleted]
+
+    @staticmethod
+    async def store_scraped_data(db: AsyncSession, team_id: int, user_id: int, document_name: str, scraped_data: Dict[str, Any]) -> Document:
+        """Store already scraped data as a new document."""
+        await ShardService.use_team(db, team_id, write=True)
+        await DocumentService._verify_team_and_user(db, team_id, user_id)
+
         try:
             # Create document
             document = Document(
+                id=await ShardService.allocate_document_id(db, team_id),
                 team_id=team_id,
                 user_id=user_id,
                 document_name=document_name,
@@ -185,21 +419,67 @@ class DocumentService:
                 content=scraped_data["content"],
                 raw_html=scraped_data.get("raw_html", "")  # In case raw HTML is not provided
             )
-            
+
+            # The unique (team_id, url) index rejects URLs the team already stored
             db.add(document)
-            db.commit()
-            db.refresh(document)
-            
+            await db.flush()
+
             # Create sections if they exist in the content
             if "sections" in scraped_data["content"]:
-                DocumentService._create_sections(db, document, scraped_data["content"]["sections"])
-            
-            logger.info(f"Successfully stored document from scraped data: {scraped_data['url']}")
-            return document
-            
+                await DocumentService._create_sections(db, document, scraped_data["content"]["sections"])
+
+            await SearchService.index_document(db, document)
+            db.add(EditorService.create_state(document))
+            await ChangeFeedService.record(db, team_id, document.id, ChangeFeedService.CREATED)
+            await ShardService.confirm_write(db, team_id)
+            await db.commit()
+            get_cache().delete(DocumentCacheKeys.team_documents(team_id))
+            ChangeFeedService.notify(team_id)
+
+            logger.info("Successfully stored document from scraped data: %s", scraped_data['url'])
+            return await DocumentService.get_document(db, document.id)
+
+        except HTTPException:
+            # The team started moving (confirm_write)
+            await db.rollback()
+            raise
+        except IntegrityError:
+            await db.rollback()
+            logger.warning("Document with URL %s already exists for team %s", scraped_data['url'], team_id)
+            raise DocumentService._duplicate_url_error(scraped_data["url"])
         except Exception as e:
-            logger.error(f"Error storing scraped data: {str(e)}")
+            await db.rollback()
+            logger.error("Error storing scraped data: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to store scraped data: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def search_team_documents(db: AsyncSession, team_id: int, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over a team's document titles and sections."""
+        hot_path_logger.info("Searching documents for team %s", team_id)
+        await ShardService.use_team(db, team_id)
+        return await SearchService.search(db, team_id, query, limit)
+
+    @staticmethod
+    async def get_editor_document(db: AsyncSession, document_id: int) -> Dict[str, Any]:
+        """Tiptap/ProseMirror JSON of a document, rebuilt if stale."""
+        await ShardService.use_document(db, document_id)
+        document = (await db.execute(
+            select(Document)
+            .where(Document.id == document_id)
+            .options(selectinload(Document.editor_state))
+        )).scalars().first()
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Document with id {document_id} not found"
+            )
+        state = await EditorService.get_editor_state(db, document)
+        return {
+            "document_id": document_id,
+            "schema_version": state.schema_version,
+            "source_updated_at": state.source_updated_at,
+            "content": state.editor_content
+        }
@@ -0,0 +1,179 @@
+from sqlalchemy import Integer, Text, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional, Dict, Any, List
+from datetime import datetime
+from dotenv import load_dotenv
+from src.server.database.config import AsyncSessionLocal
+from src.server.models.document import Document, DocumentSection
+from src.server.services.shard_service import ShardService
+import asyncio
+import logging
+import orjson
+import os
+
+load_dotenv()
+
+# Documents whose stored content is larger than this (UTF-8 bytes) are streamed
+# instead of being serialized (and cached) in one piece.
+DOCUMENT_STREAM_THRESHOLD_BYTES = int(os.getenv("DOCUMENT_STREAM_THRESHOLD_BYTES", str(1024 * 1024)))
+DOCUMENT_STREAM_CHUNK_BYTES = int(os.getenv("DOCUMENT_STREAM_CHUNK_BYTES", str(256 * 1024)))
+DOCUMENT_STREAM_MAX_CONCURRENCY = int(os.getenv("DOCUMENT_STREAM_MAX_CONCURRENCY", "4"))
+SECTION_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+_stream_slots = asyncio.Semaphore(DOCUMENT_STREAM_MAX_CONCURRENCY)
+
+
+
+class octet_length(FunctionElement):
+    """Size of a text value in bytes; SQLite before 3.43 has no octet_length()."""
+    type = Integer()
+    name = "octet_length"
+    inherit_cache = True
+
+
+@compiles(octet_length)
+def _compile_octet_length(element, compiler, **kw):
+    return "octet_length(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(octet_length, "sqlite")
+def _compile_octet_length_sqlite(element, compiler, **kw):
+    # length() of a blob counts bytes, of text characters
+    return "length(CAST(%s AS BLOB))" % compiler.process(element.clauses, **kw)
+
+
+_content_text = cast(Document.content, Text)
+_content_bytes = octet_length(_content_text)
+
+
+class DocumentStreamService:
+    """Streams very large documents as an APIResponse envelope.
+
+    The stored JSON text of ``Document.content`` is read once and written out
+    verbatim in fixed-size chunks, without being parsed and re-serialized, and
+    sections are fetched in keyset-paginated batches, so a stream holds the
+    content and one batch of sections in memory. The number of concurrent
+    streams is capped, which keeps the memory used by huge reads bounded
+    regardless of how many arrive at once.
+    """
+
+    @staticmethod
+    async def should_stream(db: AsyncSession, document_id: int) -> bool:
+        """Whether the stored content of the document exceeds the streaming threshold."""
+        await ShardService.use_document(db, document_id)
+        size = await db.scalar(select(_content_bytes).where(Document.id == document_id))
+        return size is not None and size > DOCUMENT_STREAM_THRESHOLD_BYTES
+
+    @staticmethod
+    async def oversized_ids(db: AsyncSession, document_ids: List[int]) -> List[int]:
+        """Which of the documents exceed the streaming threshold, in one query.
+        The session must already be routed to their shard."""
+        return list((await db.execute(
+            select(Document.id).where(
+                Document.id.in_(document_ids),
+                _content_bytes > DOCUMENT_STREAM_THRESHOLD_BYTES
+            )
+        )).scalars())
+
+    @staticmethod
+    def stream_document(document_id: int) -> StreamingResponse:
+        return StreamingResponse(
+            DocumentStreamService._iter_response(document_id),
+            media_type="application/json"
+        )
+
+    @staticmethod
+    async def _load_head(db: AsyncSession, document_id: int) -> Optional[Dict[str, Any]]:
+        row = (await db.execute(select(
+            Document.id,
+            Document.team_id,
+            Document.title,
+            Document.url,
+            Document.created_at,
+            Document.updated_at,
+        ).where(Document.id == document_id))).first()
+        return row._asdict() if row else None
+
+    @staticmethod
+    async def _load_content(db: AsyncSession, document_id: int) -> bytes:
+        """The stored JSON text of the content, as UTF-8."""
+        content = await db.scalar(select(_content_text).where(Document.id == document_id))
+        return (content or "null").encode("utf-8")
+
+    @staticmethod
+    async def _load_section_batch(db: AsyncSession, document_id: int, after_id: int) -> List[Dict[str, Any]]:
+        rows = (await db.execute(select(
+            DocumentSection.id,
+            DocumentSection.title,
+            DocumentSection.content,
+            DocumentSection.order,
+            DocumentSection.parent_section_id,
+            DocumentSection.created_at,
+            DocumentSection.updated_at,
+        ).where(
+            DocumentSection.document_id == document_id,
+            DocumentSection.id > after_id
+        ).order_by(DocumentSection.id).limit(SECTION_BATCH_SIZE))).all()
+        return [row._asdict() for row in rows]
+
+    @staticmethod
+    async def _iter_response(document_id: int) -> AsyncIterator[bytes]:
+        async with _stream_slots, AsyncSessionLocal(info={"read_only": True}) as db:
+            try:
+                timestamp = datetime.utcnow()
+                await ShardService.use_document(db, document_id)
+                head = await DocumentStreamService._load_head(db, document_id)
+                if head is None:
+                    yield orjson.dumps({
+                        "success": False,
+                        "message": f"Document with id {document_id} not found",
+                        "data": None,
+                        "metadata": {},
+                        "timestamp": timestamp,
+                        "error": {"type": "not_found", "detail": f"Document with id {document_id} not found"},
+                    })
+                    return
+
+                fields = orjson.dumps(head)
+                yield (
+                    b'{"success":true,"message":"Document retrieved successfully","data":'
+                    + fields[:-1] + b',"content":'
+                )
+
+                content = await DocumentStreamService._load_content(db, document_id)
+                for start in range(0, len(content), DOCUMENT_STREAM_CHUNK_BYTES):
+                    yield content[start:start + DOCUMENT_STREAM_CHUNK_BYTES]
+                # Not kept while the sections are streamed
+                del content
+
+                yield b',"sections":['
+                sections_count = 0
+                last_id = 0
+                while True:
+                    batch = await DocumentStreamService._load_section_batch(db, document_id, last_id)
+                    if not batch:
+                        break
+                    last_id = batch[-1]["id"]
+                    prefix = b"," if sections_count else b""
+                    sections_count += len(batch)
+                    yield prefix + b",".join(orjson.dumps(section) for section in batch)
+
+                yield b"]}," + orjson.dumps({
+                    "metadata": {
+                        "document_id": document_id,
+                        "team_id": head["team_id"],
+                        "sections_count": sections_count,
+                        "streamed": True,
+                    },
+                    "timestamp": timestamp,
+                    "error": None,
+                })[1:]
+            except Exception as e:
+                # Headers are already sent, so the body can only be cut short
+                logger.error("Error streaming document %s: %s", document_id, e)
+                raise
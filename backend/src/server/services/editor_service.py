@@ -0,0 +1,112 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List
+from src.server.models.document import Document, DocumentEditorState
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the generated node structure changes so stored states are rebuilt
+EDITOR_SCHEMA_VERSION = 1
+
+# Tiptap's Heading extension accepts levels 1-6
+MAX_HEADING_LEVEL = 6
+
+
+class EditorService:
+    """Builds and stores the Tiptap/ProseMirror JSON form of scraped documents.
+
+    The editor document is generated once from ``Document.content`` (pages of
+    ``ScrapingService.extract_content`` sections, or bare sections) and kept in
+    ``document_editor_states``. It is rebuilt lazily when the document has been
+    updated since, or when ``EDITOR_SCHEMA_VERSION`` changes.
+    """
+
+    @staticmethod
+    def _text(value: str) -> List[Dict[str, Any]]:
+        # ProseMirror rejects empty text nodes
+        return [{"type": "text", "text": value}] if value else []
+
+    @staticmethod
+    def _heading(title: str, level: int) -> Dict[str, Any]:
+        node = {
+            "type": "heading",
+            "attrs": {"level": max(1, min(level, MAX_HEADING_LEVEL))},
+        }
+        content = EditorService._text(title)
+        if content:
+            node["content"] = content
+        return node
+
+    @staticmethod
+    def _section_nodes(sections: List[Dict[str, Any]], depth: int) -> List[Dict[str, Any]]:
+        nodes = []
+        for section in sections:
+            level = section.get("level") or depth
+            nodes.append(EditorService._heading(section.get("title", ""), level))
+            if section.get("content"):
+                nodes.append({
+                    "type": "paragraph",
+                    "content": EditorService._text(section["content"]),
+                })
+            if section.get("subsections"):
+                nodes.extend(EditorService._section_nodes(section["subsections"], level + 1))
+        return nodes
+
+    @staticmethod
+    def to_editor_document(content: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert stored document content into a ProseMirror ``doc`` node."""
+        nodes = []
+        if content.get("pages"):
+            for page in content["pages"]:
+                nodes.append(EditorService._heading(page.get("title", ""), 1))
+                page_sections = (page.get("content") or {}).get("sections", [])
+                nodes.extend(EditorService._section_nodes(page_sections, 2))
+        elif content.get("sections"):
+            nodes.extend(EditorService._section_nodes(content["sections"], 1))
+
+        # A doc needs at least one block node
+        return {"type": "doc", "content": nodes or [{"type": "paragraph"}]}
+
+    @staticmethod
+    def _is_current(state: DocumentEditorState, document: Document) -> bool:
+        return (
+            state.schema_version == EDITOR_SCHEMA_VERSION
+            and state.source_updated_at == document.updated_at
+        )
+
+    @staticmethod
+    def _apply(state: DocumentEditorState, document: Document) -> DocumentEditorState:
+        state.schema_version = EDITOR_SCHEMA_VERSION
+        state.source_updated_at = document.updated_at
+        state.editor_content = EditorService.to_editor_document(document.content or {})
+        return state
+
+    @staticmethod
+    def create_state(document: Document) -> DocumentEditorState:
+        """Editor state for a newly stored document; the caller adds and commits it."""
+        return EditorService._apply(DocumentEditorState(document_id=document.id), document)
+
+    @staticmethod
+    async def get_editor_state(db: AsyncSession, document: Document) -> DocumentEditorState:
+        """Stored editor document, rebuilt first if it is missing or stale.
+
+        ``document.editor_state`` must already be loaded.
+        """
+        state = document.editor_state
+        if state is not None and EditorService._is_current(state, document):
+            return state
+
+        logger.info("Rebuilding editor document for document %s", document.id)
+        if state is None:
+            state = DocumentEditorState()
+            document.editor_state = state
+        EditorService._apply(state, document)
+        document_id = document.id
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request stored the document's first state meanwhile; use that one
+            await db.rollback()
+            state = await db.get(DocumentEditorState, document_id, populate_existing=True)
+        return state
@@ -0,0 +1,236 @@
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+import os
+import time
+
+# Under a multi-process server set PROMETHEUS_MULTIPROC_DIR so /metrics
+# aggregates every worker; pool and cache gauges stay per process.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# Requests that matched no route share one label so 404 scans cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "http_requests_total", "Requests by route template and status code",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled", ["method"], multiprocess_mode="livesum",
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per request",
+    ["route"], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per request",
+    ["route"], buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter("db_queries_total", "Database queries executed", ["engine"])
+DB_QUERY_SECONDS = Counter("db_query_duration_seconds_total", "Time spent executing database queries", ["engine"])
+
+SCRAPE_PAGES = Counter("scrape_pages_total", "Pages fetched by the scraper", ["outcome"])
+SCRAPE_BYTES = Counter("scrape_bytes_total", "Response bytes fetched by the scraper")
+SCRAPE_FETCH_SECONDS = Histogram(
+    "scrape_fetch_duration_seconds", "Time to fetch one page", buckets=LATENCY_BUCKETS,
+)
+
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total", "Response bytes before (in) and after (out) compression",
+    ["encoding", "stage"],
+)
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Mutable per-request counters; SQLAlchemy runs async queries in greenlets that
+# share the request's context, so engine events can update them in place
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_db_stats() -> Optional[RequestDbStats]:
+    return _request_db_stats.get()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Count and time every query of the engine, globally and for the current request."""
+    queries = DB_QUERIES.labels(name)
+    seconds = DB_QUERY_SECONDS.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        queries.inc()
+        seconds.inc(elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+def record_scrape(outcome: str, size: int = 0, seconds: Optional[float] = None) -> None:
+    SCRAPE_PAGES.labels(outcome).inc()
+    if size:
+        SCRAPE_BYTES.inc(size)
+    if seconds is not None:
+        SCRAPE_FETCH_SECONDS.observe(seconds)
+
+
+def record_compression(encoding: str, size: int, compressed_size: int) -> None:
+    COMPRESSION_BYTES.labels(encoding, "in").inc(size)
+    COMPRESSION_BYTES.labels(encoding, "out").inc(compressed_size)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB usage per route template.
+
+    The route template (e.g. ``/documents/{document_id}``) is read from
+    ``scope["route"]`` once routing has happened, so label cardinality is
+    bounded by the number of routes rather than by URLs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_db_stats.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            REQUEST_LATENCY.labels(method, template).observe(elapsed)
+            REQUESTS.labels(method, template, str(status["code"])).inc()
+            REQUEST_DB_QUERIES.labels(template).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(template).observe(stats.seconds)
+
+
+class StatsCollector:
+    """Exposes the pool and cache statistics the app already keeps as metrics."""
+
+    def describe(self) -> Iterable:
+        # Without describe() the registry would call collect() on registration
+        return []
+
+    def collect(self) -> Iterable:
+        # Imported here: these modules pull in most of the app
+        from src.server.database.pool import pool_stats
+        from src.server.services.admission_service import admission_stats
+        from src.server.services.auth_service import principal_cache
+        from src.server.services.cache_service import get_cache
+        from src.server.services.compression_service import compressed_cache
+        from src.server.services.single_flight_service import single_flight_stats
+
+        pool_gauges = {
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["pool"]),
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["pool"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections opened beyond the pool size", labels=["pool"]),
+            "utilization": GaugeMetricFamily("db_pool_utilization", "Checked out share of size plus overflow", labels=["pool"]),
+        }
+        pool_checkouts = CounterMetricFamily("db_pool_checkouts", "Connection checkouts", labels=["pool"])
+        pool_timeouts = CounterMetricFamily("db_pool_timeouts", "Checkouts that timed out waiting", labels=["pool"])
+        pool_max_wait = GaugeMetricFamily("db_pool_max_wait_seconds", "Longest checkout wait", labels=["pool"])
+        for name, stats in pool_stats().items():
+            for key, gauge in pool_gauges.items():
+                gauge.add_metric([name], stats[key])
+            pool_checkouts.add_metric([name], stats["checkouts"])
+            pool_timeouts.add_metric([name], stats["timeouts"])
+            pool_max_wait.add_metric([name], stats["max_wait_ms"] / 1000)
+        yield from pool_gauges.values()
+        yield pool_checkouts
+        yield pool_timeouts
+        yield pool_max_wait
+
+        caches: Tuple[Tuple[str, dict], ...] = (
+            ("documents", get_cache().stats()),
+            ("auth", principal_cache.stats()),
+            ("compressed_documents", compressed_cache.stats()),
+        )
+        entries = GaugeMetricFamily("cache_entries", "Entries held", labels=["cache"])
+        lookups = CounterMetricFamily("cache_lookups", "Cache lookups", labels=["cache", "result"])
+        evictions = CounterMetricFamily("cache_evictions", "Entries evicted to stay within size", labels=["cache"])
+        for name, stats in caches:
+            entries.add_metric([name], stats.get("entries", 0))
+            lookups.add_metric([name, "hit"], stats.get("hits", 0))
+            lookups.add_metric([name, "miss"], stats.get("misses", 0))
+            evictions.add_metric([name], stats.get("evictions", 0))
+        yield entries
+        yield lookups
+        yield evictions
+
+        admission_active = GaugeMetricFamily("admission_active", "Requests holding a slot", labels=["class"])
+        admission_queued = GaugeMetricFamily("admission_queued", "Requests waiting for a slot", labels=["class"])
+        admission_shed = CounterMetricFamily(
+            "admission_shed", "Requests rejected with 503", labels=["class", "reason"],
+        )
+        for name, stats in admission_stats().items():
+            admission_active.add_metric([name], stats["active"])
+            admission_queued.add_metric([name], stats["queued"])
+            admission_shed.add_metric([name, "queue_full"], stats["rejected"])
+            admission_shed.add_metric([name, "timeout"], stats["timed_out"])
+        yield admission_active
+        yield admission_queued
+        yield admission_shed
+
+        flight_calls = CounterMetricFamily(
+            "single_flight_calls", "Calls that ran the work (leader) or shared its result (follower)",
+            labels=["flight", "role"],
+        )
+        for name, stats in single_flight_stats().items():
+            flight_calls.add_metric([name, "leader"], stats["leaders"])
+            flight_calls.add_metric([name, "follower"], stats["followers"])
+        yield flight_calls
+
+
+REGISTRY.register(StatsCollector())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of every metric, and its content type."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(StatsCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
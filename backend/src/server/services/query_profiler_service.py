@@ -0,0 +1,203 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+import logging
+import os
+import re
+import threading
+import time
+
+load_dotenv()
+
+# Off by default: profiling keeps every statement shape of every request
+SQL_PROFILING = os.getenv("SQL_PROFILING", "false").lower() == "true"
+# A statement shape run this many times in one request is reported as a likely N+1
+SQL_PROFILE_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_PROFILE_N_PLUS_ONE_THRESHOLD", "5"))
+# Reports kept for GET /system/queries
+SQL_PROFILE_HISTORY = int(os.getenv("SQL_PROFILE_HISTORY", "100"))
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# A parenthesised list of bind markers, as rendered for IN (...) and multi-row VALUES
+_PARAM = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with literals and bind lists collapsed, so the same query
+    issued for different rows groups together."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERAL.sub("?", shape)
+    return _PARAM_LIST.sub("(?)", shape)
+
+
+class QueryProfile:
+    """Statements run during one request (or one assert_max_queries block), grouped by shape."""
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.queries = 0
+        self.seconds = 0.0
+        # shape -> {"count": int, "seconds": float}
+        self.shapes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+            stats = self.shapes.setdefault(shape, {"count": 0, "seconds": 0.0})
+            stats["count"] += 1
+            stats["seconds"] += seconds
+
+    def n_plus_one(self, threshold: int = SQL_PROFILE_N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """Shapes repeated at least ``threshold`` times, most frequent first."""
+        return [
+            statement for statement in self.statements()
+            if statement["count"] >= threshold
+        ]
+
+    def statements(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            shapes = list(self.shapes.items())
+        return sorted(
+            (
+                {"sql": shape, "count": stats["count"], "total_ms": round(stats["seconds"] * 1000, 3)}
+                for shape, stats in shapes
+            ),
+            key=lambda statement: (-statement["count"], -statement["total_ms"]),
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "queries": self.queries,
+            "total_ms": round(self.seconds * 1000, 3),
+            "n_plus_one": self.n_plus_one(),
+            "statements": self.statements(),
+        }
+
+    def format(self) -> str:
+        lines = [f"{self.queries} queries in {self.seconds * 1000:.1f} ms"]
+        lines.extend(
+            f"  {statement['count']:>4} x {statement['sql']}" for statement in self.statements()
+        )
+        return "\n".join(lines)
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+# Open assert_max_queries blocks; they see queries from every thread
+_captures: List[QueryProfile] = []
+_captures_lock = threading.Lock()
+
+_history: Deque[Dict[str, Any]] = deque(maxlen=SQL_PROFILE_HISTORY)
+
+
+def profile_engine(engine: Engine) -> None:
+    """Feed every statement of the engine to the active request profile and captures."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._profile_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is None and not _captures:
+            return
+        elapsed = time.perf_counter() - context._profile_start
+        if profile is not None:
+            profile.record(statement, elapsed)
+        with _captures_lock:
+            captures = list(_captures)
+        for capture in captures:
+            capture.record(statement, elapsed)
+
+
+def recent_profiles(n_plus_one_only: bool = False) -> List[Dict[str, Any]]:
+    """Reports of the latest profiled requests, newest first."""
+    reports = list(reversed(_history))
+    if n_plus_one_only:
+        reports = [report for report in reports if report["n_plus_one"]]
+    return reports
+
+
+class QueryProfilerMiddleware:
+    """Pure ASGI middleware profiling the SQL of each request.
+
+    Adds ``X-Query-Count``, ``X-Query-Time-Ms`` and ``X-Query-N-Plus-One``
+    (the number of likely N+1 statement shapes) to the response, keeps the
+    full report for GET /system/queries and logs a warning for requests
+    with likely N+1 patterns. Headers reflect the queries run before the
+    response started; a streamed body's later queries only reach the report.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(profile.queries).encode()))
+                headers.append((b"x-query-time-ms", f"{profile.seconds * 1000:.3f}".encode()))
+                headers.append((b"x-query-n-plus-one", str(len(profile.n_plus_one())).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            profile.route = getattr(scope.get("route"), "path", None)
+            report = profile.report()
+            _history.append(report)
+            if report["n_plus_one"]:
+                logger.warning(
+                    "Likely N+1 queries in %s %s:\n%s", profile.method, profile.path, profile.format()
+                )
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryProfile]:
+    """Fail with AssertionError if the block runs more than ``limit`` queries.
+
+        with assert_max_queries(4):
+            client.get("/teams/1/members", headers=auth)
+
+    Queries are counted on every profiled engine and from any thread, so
+    requests made through TestClient are included. Works whether or not
+    SQL_PROFILING is enabled.
+    """
+    capture = QueryProfile()
+    with _captures_lock:
+        _captures.append(capture)
+    try:
+        yield capture
+    finally:
+        with _captures_lock:
+            _captures.remove(capture)
+    if capture.queries > limit:
+        raise AssertionError(f"Expected at most {limit} queries, got {capture.format()}")
@@ -1,12 +1,23 @@
 
-from typing import List, Dict, Any
-import requests
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
 from urllib.parse import urljoin, urlparse
+from src.server.services.metrics_service import record_scrape
+from src.utils.logging_config import RateLimitedLogger
 import re
 import logging
+import time
+
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
+# A record per crawled page, which large sites produce by the thousand
+hot_path_logger = RateLimitedLogger(logger)
+
+# requests and bs4 are imported where they are used: together they add about a
+# third to the app's import time, which every worker boot would pay for even
+# though only scrape requests need them.
 
 class ScrapingService:
     @staticmethod
@@ -16,7 +27,7 @@ class ScrapingService:
         return text.strip()
 
     @staticmethod
-    def extract_title(soup: BeautifulSoup, url: str) -> str:
+    def extract_title(soup: "BeautifulSoup", url: str) -> str:
         """Extract the title of the page."""
         title = soup.find('h1')
         if title:
@@ -32,7 +43,7 @@ class ScrapingService:
         return path_parts[-1].replace('-', ' ').replace('_', ' ').title() or parsed_url.netloc
 
     @staticmethod
-    def extract_content(soup: BeautifulSoup) -> Dict[str, Any]:
+    def extract_content(soup: "BeautifulSoup") -> Dict[str, Any]:
         """Extract content in a hierarchical structure."""
         content = {
             "sections": [],
@@ -76,19 +87,43 @@ class ScrapingService:
         return content
 
     @staticmethod
-    def scrape_url(url: str) -> Dict[str, Any]:
+    def fetch(url: str, **kwargs) -> "requests.Response":
+        """GET a page, recording fetch time, size and outcome in the scrape metrics."""
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException:
+            record_scrape("error", seconds=time.perf_counter() - start)
+            raise
+        record_scrape("ok", len(response.content), time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def scrape_url(url: str) -> Tuple[Dict[str, Any], str]:
         """
         Scrape content from the given URL.
-        Returns a dict with keys: title, url, and content.
+        Returns a dict with keys: title, url, and content, and the page's raw HTML.
         """
-        logger.info(f"Starting to scrape URL: {url}")
+        page, raw_html, _ = ScrapingService._scrape_page(url)
+        return page, raw_html
+
+    @staticmethod
+    def _scrape_page(url: str) -> Tuple[Dict[str, Any], str, "BeautifulSoup"]:
+        """scrape_url(), also returning the parsed page so the crawler can
+        follow its links without fetching it again."""
+        import requests
+        from bs4 import BeautifulSoup
+
+        hot_path_logger.info("Starting to scrape URL: %s", url)
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
                               '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+            response = ScrapingService.fetch(url, headers=headers, timeout=30)
             
             raw_html = response.text
             soup = BeautifulSoup(raw_html, 'html.parser')
@@ -100,12 +135,12 @@ class ScrapingService:
                 "title": title,
                 "url": url,
                 "content": content
-            }
+            }, raw_html, soup
         except requests.RequestException as e:
-            logger.error(f"Error scraping URL {url}: {str(e)}")
+            logger.error("Error scraping URL %s: %s", url, e)
             raise ValueError(f"Failed to scrape URL: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error while scraping {url}: {str(e)}")
+            logger.error("Unexpected error while scraping %s: %s", url, e)
             raise ValueError(f"Failed to process content: {str(e)}")
 
     @staticmethod
@@ -114,6 +149,8 @@ class ScrapingService:
         Crawl from the start_url, scraping each page and following internal links.
         Returns a list of all scraped pages (dicts) up to max_pages.
         """
+        import requests
+
         visited = set()
         to_visit = [start_url]
         all_scraped = []
@@ -127,14 +164,13 @@ class ScrapingService:
                 continue
 
             visited.add(current_url)
-            logger.info(f"Crawling: {current_url}")
+            hot_path_logger.info("Crawling: %s", current_url)
             
             try:
-                page_data = ScrapingService.scrape_url(current_url)
+                page_data, _, soup = ScrapingService._scrape_page(current_url)
                 all_scraped.append(page_data)
                 
-                # Parse the HTML again to find new links
-                soup = BeautifulSoup(requests.get(current_url).text, 'html.parser')
+                # Follow the links of the page just scraped
                 for link_tag in soup.find_all('a', href=True):
                     absolute_link = urljoin(current_url, link_tag['href'])
                     
@@ -146,8 +182,8 @@ class ScrapingService:
                         if normalized_link not in visited:
                             to_visit.append(normalized_link)
             
-            except ValueError as e:
-                logger.error(f"Skipping {current_url}: {e}")
+            except (ValueError, requests.RequestException) as e:
+                logger.error("Skipping %s: %s", current_url, e)
                 continue
 
         return all_scraped
@@ -0,0 +1,315 @@
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, Any, List, Optional
+from src.server.models.document import Document, DocumentSection
+from src.utils.logging_config import RateLimitedLogger
+from fastapi import HTTPException, status
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+# Reported on every write that skips the index, so a missing index cannot go unnoticed
+missing_index_logger = RateLimitedLogger(logger)
+
+# Title matches weigh more than body matches when ranking results
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+DELETE_BATCH_SIZE = 1000
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+# SQLite keeps the entries in a regular table (cheap per-document deletes via
+# the document_id index) and mirrors them into an external-content FTS5 table.
+_SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS document_search (
+        id INTEGER PRIMARY KEY,
+        team_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL,
+        section_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_search_team_id ON document_search (team_id)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_document_id ON document_search (document_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts USING fts5(
+        title,
+        content,
+        content = 'document_search',
+        content_rowid = 'id',
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON document_search BEGIN
+        INSERT INTO document_search_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON document_search BEGIN
+        INSERT INTO document_search_fts (document_search_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS document_search (
+        id BIGSERIAL PRIMARY KEY,
+        team_id INTEGER NOT NULL,
+        document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+        section_id INTEGER,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_search_vector ON document_search USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_team_id ON document_search (team_id)",
+    "CREATE INDEX IF NOT EXISTS ix_document_search_document_id ON document_search (document_id)",
+]
+
+_SQLITE_SEARCH = text(f"""
+    SELECT entry.document_id,
+           entry.section_id,
+           entry.title,
+           snippet(document_search_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '...', 24) AS snippet,
+           -bm25(document_search_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}) AS score
+    FROM document_search_fts
+    JOIN document_search AS entry ON entry.id = document_search_fts.rowid
+    WHERE document_search_fts MATCH :query AND entry.team_id = :team_id
+    ORDER BY bm25(document_search_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT})
+    LIMIT :limit
+""")
+
+# Headlines are only generated for the rows that survive the LIMIT
+_POSTGRES_SEARCH = text(f"""
+    SELECT hits.document_id,
+           hits.section_id,
+           hits.title,
+           ts_headline('english', hits.title || ' ' || hits.content, hits.query,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=35, MinWords=15, MaxFragments=1') AS snippet,
+           hits.score
+    FROM (
+        SELECT document_id, section_id, title, content, query,
+               ts_rank_cd(search_vector, query) AS score
+        FROM document_search, websearch_to_tsquery('english', :query) AS query
+        WHERE team_id = :team_id AND search_vector @@ query
+        ORDER BY score DESC
+        LIMIT :limit
+    ) AS hits
+    ORDER BY hits.score DESC
+""")
+
+_DDL = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}
+
+_INSERT_ENTRY = text("""
+    INSERT INTO document_search (title, content, team_id, document_id, section_id)
+    VALUES (:title, :content, :team_id, :document_id, :section_id)
+""")
+
+_DELETE_DOCUMENTS = text(
+    "DELETE FROM document_search WHERE document_id IN :document_ids"
+).bindparams(bindparam("document_ids", expanding=True))
+
+_DELETE_DOCUMENT_TITLE = text(
+    "DELETE FROM document_search WHERE document_id = :document_id AND section_id IS NULL"
+)
+
+_DELETE_TEAM = text("DELETE FROM document_search WHERE team_id = :team_id")
+
+# The raw statements have no mapper; this sends them to the session's shard like the documents
+_ON_SHARD = {"mapper": Document}
+
+
+class SearchService:
+    """Team-scoped full-text search over document and section titles/content.
+
+    Entries live in the ``document_search`` table, one per document title and
+    one per section. SQLite indexes them with an FTS5 table kept in sync by
+    triggers, PostgreSQL with a generated tsvector column and a GIN index.
+    ``DocumentService`` maintains the entries incrementally on store, update
+    and delete.
+
+    Whether search is available is looked up on the database the first time
+    it is used in a process, so it does not depend on ``ensure_index`` having
+    run there (STARTUP_SCHEMA_CHECK=false, gunicorn workers).
+    """
+
+    # Set once the index is known to exist
+    _dialect: Optional[str] = None
+
+    @staticmethod
+    def ensure_index(engine: Engine) -> None:
+        """Create the search index for the engine's dialect and backfill it when new."""
+        dialect = engine.dialect.name
+        statements = _DDL.get(dialect)
+        if statements is None:
+            logger.warning("Full-text search is not supported on %s, search is disabled", dialect)
+            SearchService._dialect = None
+            return
+
+        with engine.begin() as conn:
+            existed = SearchService._table_exists(conn, dialect)
+            for statement in statements:
+                conn.execute(text(statement))
+
+        SearchService._dialect = dialect
+        if not existed:
+            with Session(bind=engine) as db:
+                SearchService.rebuild_index(db)
+
+    @staticmethod
+    def _table_exists(conn, dialect: str) -> bool:
+        if dialect == "sqlite":
+            return conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_search'")
+            ).first() is not None
+        return conn.execute(text("SELECT to_regclass('document_search')")).scalar() is not None
+
+    @staticmethod
+    async def is_available(db: AsyncSession) -> bool:
+        """Whether the search index exists on the session's database; checked
+        there until it is found, then remembered for the process."""
+        if SearchService._dialect is not None:
+            return True
+        conn = await db.connection(bind_arguments=_ON_SHARD)
+        dialect = conn.dialect.name
+        if dialect not in _DDL:
+            return False
+        if not await conn.run_sync(SearchService._table_exists, dialect):
+            missing_index_logger.error(
+                "The search index (document_search) is missing, documents are not indexed; "
+                "run alembic upgrade head or start with STARTUP_SCHEMA_CHECK=true"
+            )
+            return False
+        SearchService._dialect = dialect
+        return True
+
+    @staticmethod
+    def reset() -> None:
+        """Forget whether the index exists; it is looked up again on next use."""
+        SearchService._dialect = None
+
+    @staticmethod
+    def _document_entries(document: Document, sections: List[DocumentSection]) -> List[Dict[str, Any]]:
+        entries = [{
+            "title": document.title,
+            "content": "",
+            "team_id": document.team_id,
+            "document_id": document.id,
+            "section_id": None,
+        }]
+        entries.extend({
+            "title": section.title,
+            "content": section.content,
+            "team_id": document.team_id,
+            "document_id": document.id,
+            "section_id": section.id,
+        } for section in sections)
+        return entries
+
+    @staticmethod
+    async def index_document(db: AsyncSession, document: Document) -> None:
+        """(Re)index a document and all of its sections. Does not commit."""
+        await SearchService.index_documents(db, [document])
+
+    @staticmethod
+    async def index_documents(db: AsyncSession, documents: List[Document]) -> None:
+        """(Re)index documents and all of their sections with one statement
+        each to load, delete and insert. Does not commit."""
+        if not documents or not await SearchService.is_available(db):
+            return
+        sections: Dict[int, List[DocumentSection]] = {document.id: [] for document in documents}
+        for section in (await db.execute(
+            select(DocumentSection).where(DocumentSection.document_id.in_(list(sections)))
+        )).scalars():
+            sections[section.document_id].append(section)
+        await SearchService.remove_documents(db, list(sections))
+        await db.execute(_INSERT_ENTRY, [
+            entry
+            for document in documents
+            for entry in SearchService._document_entries(document, sections[document.id])
+        ], bind_arguments=_ON_SHARD)
+
+    @staticmethod
+    async def update_document_title(db: AsyncSession, document: Document) -> None:
+        """Refresh only the document-level entry after a title change. Does not commit."""
+        if not await SearchService.is_available(db):
+            return
+        await db.execute(_DELETE_DOCUMENT_TITLE, {"document_id": document.id}, bind_arguments=_ON_SHARD)
+        await db.execute(_INSERT_ENTRY, SearchService._document_entries(document, [])[0], bind_arguments=_ON_SHARD)
+
+    @staticmethod
+    async def remove_documents(db: AsyncSession, document_ids: List[int]) -> None:
+        """Drop every index entry of the documents in one statement. Does not commit."""
+        if not await SearchService.is_available(db):
+            return
+        # Chunked to stay under the bind parameter limits of SQLite and asyncpg
+        for start in range(0, len(document_ids), DELETE_BATCH_SIZE):
+            await db.execute(
+                _DELETE_DOCUMENTS,
+                {"document_ids": document_ids[start:start + DELETE_BATCH_SIZE]},
+                bind_arguments=_ON_SHARD
+            )
+
+    @staticmethod
+    async def remove_team(db: AsyncSession, team_id: int) -> None:
+        """Drop every index entry of a team. Does not commit."""
+        if not await SearchService.is_available(db):
+            return
+        await db.execute(_DELETE_TEAM, {"team_id": team_id}, bind_arguments=_ON_SHARD)
+
+    @staticmethod
+    def rebuild_index(db: Session) -> None:
+        """Reindex every stored document from scratch (sync, used at startup)."""
+        db.execute(text("DELETE FROM document_search"))
+        documents = db.query(Document).options(selectinload(Document.sections)).all()
+        for document in documents:
+            db.execute(_INSERT_ENTRY, SearchService._document_entries(document, document.sections))
+        db.commit()
+        logger.info("Rebuilt search index for %s documents", len(documents))
+
+    @staticmethod
+    def _to_fts_query(query: str) -> str:
+        """Turn free text into an FTS5 query: every term must match, last one as a prefix."""
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return ""
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    @staticmethod
+    async def search(db: AsyncSession, team_id: int, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return ranked matches with highlighted snippets for a team."""
+        if not await SearchService.is_available(db):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search is not available on this database backend"
+            )
+
+        if SearchService._dialect == "sqlite":
+            statement = _SQLITE_SEARCH
+            query = SearchService._to_fts_query(query)
+        else:
+            statement = _POSTGRES_SEARCH
+            query = query.strip()
+
+        if not query:
+            return []
+
+        rows = (await db.execute(
+            statement, {"query": query, "team_id": team_id, "limit": limit}, bind_arguments=_ON_SHARD
+        )).mappings().all()
+        return [dict(row) for row in rows]
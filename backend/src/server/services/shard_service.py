@@ -0,0 +1,451 @@
+from sqlalchemy import MetaData, delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from fastapi import HTTPException, status
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from dotenv import load_dotenv
+from src.server.database.config import (
+    DATABASE_SHARDS, AsyncSessionLocal, get_engine, get_sync_shard_engines
+)
+from src.server.models.document import Document, DocumentSection, DocumentEditorState
+from src.server.models.shard import TeamShard, DocumentDirectory
+from src.server.services.cache_service import InMemoryCache, get_cache, DocumentCacheKeys
+from src.server.services.change_feed_service import ChangeFeedService
+from src.server.services.editor_service import EditorService
+from src.server.services.search_service import SearchService
+import asyncio
+import logging
+import math
+import os
+
+load_dotenv()
+
+# Name of the primary database in the shard map; teams without an entry are on it
+PRIMARY_SHARD = "primary"
+SHARDING_ENABLED = bool(DATABASE_SHARDS)
+# How long a process may route with an outdated team -> shard entry. Moves
+# wait this long between their steps, so every process has caught up.
+SHARD_MAP_TTL_SECONDS = float(os.getenv("SHARD_MAP_TTL_SECONDS", "5"))
+# Shards new teams are spread over, by team id; empty keeps new teams on the primary
+SHARD_NEW_TEAMS = [name.strip() for name in os.getenv("SHARD_NEW_TEAMS", "").split(",") if name.strip()]
+SHARD_MOVE_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+# team_id -> [shard, moving_to]
+_team_shards = InMemoryCache(max_entries=10000, ttl=SHARD_MAP_TTL_SECONDS)
+# document_id -> team_id; a document never changes team, so entries only leave by LRU
+_document_teams = InMemoryCache(max_entries=100000, ttl=365 * 24 * 3600)
+
+
+def _shard_metadata() -> MetaData:
+    """The tables of a shard, without the foreign keys to tables that stay on the primary."""
+    metadata = MetaData()
+    tables = [table.to_metadata(metadata) for table in (
+        Document.__table__, DocumentSection.__table__, DocumentEditorState.__table__
+    )]
+    for table in tables:
+        for constraint in list(table.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split(".")[0] not in metadata.tables:
+                for element in constraint.elements:
+                    element.parent.foreign_keys.discard(element)
+                    table.foreign_keys.discard(element)
+                table.constraints.discard(constraint)
+    return metadata
+
+
+class ShardService:
+    """Places each team's documents on one of several databases (shards).
+
+    The documents, sections, editor states and search entries of a team live
+    on its shard; users, teams, memberships and the change feed stay on the
+    primary. ``team_shards`` on the primary maps teams to shards (no row: the
+    primary), and ``document_directory`` hands out document ids, so ids are
+    unique across shards and a document is found by id alone. Sharding is
+    off unless DATABASE_SHARDS names at least one shard.
+
+    Services call use_team() or use_document() before touching documents;
+    RoutingSession then sends the statements on those tables to the shard.
+    A write spans the primary and the shard without a two-phase commit, so a
+    failure between the two commits can leave a directory entry or a change
+    feed event for a document that was not stored.
+
+    move_team() moves a team while the API keeps serving: reads continue
+    throughout, writes of that team get 503 until the copy is done.
+    """
+
+    @staticmethod
+    def shard_names() -> List[str]:
+        return [PRIMARY_SHARD, *DATABASE_SHARDS]
+
+    @staticmethod
+    async def _load_team_shard(db: AsyncSession, team_id: int) -> Tuple[str, Optional[str]]:
+        row = (await db.execute(
+            select(TeamShard.shard, TeamShard.moving_to).where(TeamShard.team_id == team_id)
+        )).first()
+        return (row.shard, row.moving_to) if row else (PRIMARY_SHARD, None)
+
+    @staticmethod
+    async def team_shard(db: AsyncSession, team_id: int) -> Tuple[str, Optional[str]]:
+        """The team's shard and the shard it is being moved to, if any (cached)."""
+        key = str(team_id)
+        cached = _team_shards.get(key)
+        if cached is None:
+            cached = list(await ShardService._load_team_shard(db, team_id))
+            _team_shards.set(key, cached)
+        return cached[0], cached[1]
+
+    @staticmethod
+    async def use_team(db: AsyncSession, team_id: int, write: bool = False) -> str:
+        """Route the session's document statements to the team's shard; returns its name.
+
+        With ``write``, raises 503 while the team is being moved.
+        """
+        if not SHARDING_ENABLED:
+            return PRIMARY_SHARD
+        shard, moving_to = await ShardService.team_shard(db, team_id)
+        if write and moving_to is not None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Team {team_id} is being moved, try again shortly",
+                headers={"Retry-After": str(math.ceil(SHARD_MAP_TTL_SECONDS))},
+            )
+        db.info["shard"] = shard
+        return shard
+
+    @staticmethod
+    async def confirm_write(db: AsyncSession, team_id: int) -> None:
+        """Raise 503 if the team started moving after use_team() let a write
+        through by the cached map. Call after recording the write's change:
+        move_team() takes the same team lock to mark the team, so either the
+        mark waits for this write to commit, or this check sees the mark.
+        """
+        if not SHARDING_ENABLED:
+            return
+        shard, moving_to = await ShardService._load_team_shard(db, team_id)
+        _team_shards.set(str(team_id), [shard, moving_to])
+        if moving_to is not None or shard != db.info.get("shard", PRIMARY_SHARD):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Team {team_id} is being moved, try again shortly",
+                headers={"Retry-After": str(math.ceil(SHARD_MAP_TTL_SECONDS))},
+            )
+
+    @staticmethod
+    async def document_team(db: AsyncSession, document_id: int) -> Optional[int]:
+        """Team of a document from the directory; None if it has no entry."""
+        key = str(document_id)
+        team_id = _document_teams.get(key)
+        if team_id is None:
+            team_id = await db.scalar(select(DocumentDirectory.team_id).where(DocumentDirectory.id == document_id))
+            if team_id is not None:
+                _document_teams.set(key, team_id)
+        return team_id
+
+    @staticmethod
+    async def use_document(db: AsyncSession, document_id: int, write: bool = False) -> str:
+        """Route the session to the shard of the document's team; see use_team()."""
+        if not SHARDING_ENABLED:
+            return PRIMARY_SHARD
+        team_id = await ShardService.document_team(db, document_id)
+        if team_id is None:
+            # Stored before sharding was turned on (or does not exist): on the primary
+            db.info["shard"] = PRIMARY_SHARD
+            return PRIMARY_SHARD
+        return await ShardService.use_team(db, team_id, write)
+
+    @staticmethod
+    async def each_shard(db: AsyncSession, document_ids: List[int]) -> AsyncIterator[List[int]]:
+        """Split document ids by shard, routing the session to each shard
+        before yielding its ids. Reads only; yields nothing for no ids."""
+        if not document_ids:
+            return
+        if not SHARDING_ENABLED:
+            yield document_ids
+            return
+
+        teams: Dict[int, int] = {}
+        missing = []
+        for document_id in document_ids:
+            team_id = _document_teams.get(str(document_id))
+            if team_id is None:
+                missing.append(document_id)
+            else:
+                teams[document_id] = team_id
+        if missing:
+            rows = await db.execute(
+                select(DocumentDirectory.id, DocumentDirectory.team_id).where(DocumentDirectory.id.in_(missing))
+            )
+            for document_id, team_id in rows:
+                teams[document_id] = team_id
+                _document_teams.set(str(document_id), team_id)
+
+        groups: Dict[str, List[int]] = {}
+        for document_id in document_ids:
+            team_id = teams.get(document_id)
+            shard = (await ShardService.team_shard(db, team_id))[0] if team_id is not None else PRIMARY_SHARD
+            groups.setdefault(shard, []).append(document_id)
+        for shard, ids in groups.items():
+            db.info["shard"] = shard
+            yield ids
+
+    @staticmethod
+    async def allocate_document_id(db: AsyncSession, team_id: int) -> Optional[int]:
+        """Id for a new document of the team, or None (autoincrement) with sharding off.
+        Committed with the document."""
+        if not SHARDING_ENABLED:
+            return None
+        result = await db.execute(insert(DocumentDirectory).values(team_id=team_id))
+        return result.inserted_primary_key[0]
+
+    @staticmethod
+    def place_new_team(db: AsyncSession, team_id: int) -> None:
+        """Assign a new team to one of SHARD_NEW_TEAMS; committed with the team."""
+        if SHARDING_ENABLED and SHARD_NEW_TEAMS:
+            db.add(TeamShard(team_id=team_id, shard=SHARD_NEW_TEAMS[team_id % len(SHARD_NEW_TEAMS)]))
+
+    @staticmethod
+    def ensure_schema() -> None:
+        """Create the tables and search index of every shard and add directory
+        entries for documents stored before sharding was on. Blocking."""
+        unknown = set(SHARD_NEW_TEAMS) - set(ShardService.shard_names())
+        if unknown:
+            raise ValueError(f"SHARD_NEW_TEAMS names unknown shards: {', '.join(sorted(unknown))}")
+
+        metadata = _shard_metadata()
+        for name, engine in get_sync_shard_engines().items():
+            metadata.create_all(bind=engine)
+            SearchService.ensure_index(engine)
+            logger.info("Shard %s is ready", name)
+        ShardService.sync_directory()
+
+    @staticmethod
+    def sync_directory() -> None:
+        """Add directory entries for the primary's documents that have none, so
+        newly allocated ids start above them. Blocking."""
+        engine = get_engine()
+        with engine.begin() as conn:
+            conn.execute(
+                insert(DocumentDirectory.__table__).from_select(
+                    ["id", "team_id"],
+                    select(Document.id, Document.team_id).where(
+                        Document.id.not_in(select(DocumentDirectory.id))
+                    )
+                )
+            )
+            if engine.dialect.name == "postgresql":
+                # Explicit ids do not advance the sequence
+                conn.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('document_directory', 'id'), "
+                    "GREATEST((SELECT max(id) FROM document_directory), 1))"
+                ))
+
+    @staticmethod
+    async def _set_team_shard(db: AsyncSession, team_id: int, shard: str, moving_to: Optional[str]) -> None:
+        entry = await db.get(TeamShard, team_id)
+        if entry is None:
+            db.add(TeamShard(team_id=team_id, shard=shard, moving_to=moving_to))
+        else:
+            entry.shard = shard
+            entry.moving_to = moving_to
+
+    @staticmethod
+    async def _purge_team(db: AsyncSession, team_id: int) -> None:
+        """Delete the team's documents from the session's shard without
+        recording changes. Does not commit."""
+        team_documents = select(Document.id).where(Document.team_id == team_id)
+        await SearchService.remove_team(db, team_id)
+        await db.execute(
+            delete(DocumentEditorState)
+            .where(DocumentEditorState.document_id.in_(team_documents))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(DocumentSection)
+            .where(DocumentSection.document_id.in_(team_documents))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Document)
+            .where(Document.team_id == team_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def _copy_documents(db: AsyncSession, documents: List[Document], moved_at: datetime) -> None:
+        """Add copies of the documents to the session's shard, with one bulk
+        INSERT per section nesting level like DocumentService._create_sections.
+        Sections get new ids there; updated_at is bumped so version-keyed
+        caches miss."""
+        copies = []
+        for document in documents:
+            copy = Document(**{column.key: getattr(document, column.key) for column in Document.__table__.columns})
+            copy.updated_at = moved_at
+            copies.append(copy)
+        db.add_all(copies)
+        await db.flush()
+
+        children: Dict[Optional[int], List[DocumentSection]] = {}
+        for document in documents:
+            for section in document.sections:
+                children.setdefault(section.parent_section_id, []).append(section)
+        # Old section id -> id of its copy, for the parents of the next level
+        section_ids: Dict[int, int] = {}
+        level = children.get(None, [])
+        while level:
+            copy_ids = (await db.scalars(
+                insert(DocumentSection).returning(DocumentSection.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "document_id": section.document_id,
+                        "parent_section_id": section_ids.get(section.parent_section_id),
+                        "title": section.title,
+                        "content": section.content,
+                        "order": section.order,
+                        "created_at": section.created_at,
+                        "updated_at": section.updated_at,
+                    }
+                    for section in level
+                ]
+            )).all()
+            section_ids.update(zip((section.id for section in level), copy_ids))
+            level = [child for section in level for child in children.get(section.id, [])]
+
+        await SearchService.index_documents(db, copies)
+        db.add_all(EditorService.create_state(copy) for copy in copies)
+
+    @staticmethod
+    async def move_team(team_id: int, target: str, wait: float = SHARD_MAP_TTL_SECONDS) -> int:
+        """Move a team's documents to ``target``; returns how many were moved.
+
+        1. Mark the team as moving and wait ``wait`` seconds, after which
+           every process rejects the team's writes up front. Writes that
+           passed by an older map are rejected at commit (confirm_write).
+        2. Copy its documents to the target, replacing leftovers of an
+           interrupted move. Reads are still served from the source.
+        3. Point the team at the target, record an "updated" change per
+           document (section ids changed) and wait again for every process
+           to route to the target.
+        4. Delete the documents from the source.
+
+        Run again after a failure. A team stuck as moving is released by
+        moving it back to its current shard, which also deletes what an
+        interrupted step 4 left of the team on other shards.
+        """
+        if target not in ShardService.shard_names():
+            raise ValueError(f"Unknown shard {target!r}, expected one of {', '.join(ShardService.shard_names())}")
+
+        async with AsyncSessionLocal() as db:
+            source, moving_to = await ShardService._load_team_shard(db, team_id)
+            if source == target:
+                if moving_to is not None:
+                    await ShardService._set_team_shard(db, team_id, source, None)
+                    await db.commit()
+                    _team_shards.delete(str(team_id))
+                    logger.info("Released team %s, which stays on shard %s", team_id, source)
+                await ShardService._purge_leftovers(team_id, target, wait)
+                return 0
+            # Waits for the team's in-flight writes; later ones see the mark (confirm_write)
+            await ChangeFeedService.lock_teams(db, [team_id])
+            await ShardService._set_team_shard(db, team_id, source, target)
+            await db.commit()
+        _team_shards.delete(str(team_id))
+        logger.info("Moving team %s from shard %s to %s", team_id, source, target)
+        await asyncio.sleep(wait)
+
+        moved_at = datetime.utcnow()
+        moved: List[int] = []
+        async with AsyncSessionLocal() as source_db, AsyncSessionLocal() as target_db:
+            source_db.info["shard"] = source
+            target_db.info["shard"] = target
+            await ShardService._purge_team(target_db, team_id)
+            await target_db.commit()
+
+            while True:
+                documents = (await source_db.execute(
+                    select(Document)
+                    .where(Document.team_id == team_id, Document.id > (moved[-1] if moved else 0))
+                    .order_by(Document.id)
+                    .limit(SHARD_MOVE_BATCH_SIZE)
+                    .options(selectinload(Document.sections))
+                )).scalars().all()
+                if not documents:
+                    break
+                await ShardService._copy_documents(target_db, documents, moved_at)
+                # Documents stored before sharding was on have no directory entry yet
+                known = set((await target_db.execute(
+                    select(DocumentDirectory.id).where(DocumentDirectory.id.in_([document.id for document in documents]))
+                )).scalars())
+                new_entries = [
+                    {"id": document.id, "team_id": team_id} for document in documents if document.id not in known
+                ]
+                if new_entries:
+                    await target_db.execute(insert(DocumentDirectory), new_entries)
+                await target_db.commit()
+                moved.extend(document.id for document in documents)
+                source_db.expunge_all()
+                target_db.expunge_all()
+                logger.info("Copied %s documents of team %s", len(moved), team_id)
+
+        async with AsyncSessionLocal() as db:
+            await ShardService._set_team_shard(db, team_id, target, None)
+            await ChangeFeedService.record_many(db, [(team_id, document_id) for document_id in moved], ChangeFeedService.UPDATED)
+            await db.commit()
+        _team_shards.delete(str(team_id))
+        get_cache().delete(
+            DocumentCacheKeys.team_documents(team_id),
+            *(DocumentCacheKeys.document(document_id) for document_id in moved)
+        )
+        ChangeFeedService.notify(team_id)
+        await asyncio.sleep(wait)
+
+        async with AsyncSessionLocal() as db:
+            db.info["shard"] = source
+            await ShardService._purge_team(db, team_id)
+            await db.commit()
+        logger.info("Moved %s documents of team %s from shard %s to %s", len(moved), team_id, source, target)
+        return len(moved)
+
+    @staticmethod
+    async def _purge_leftovers(team_id: int, current: str, wait: float) -> None:
+        """Delete the team's documents from the shards other than its current
+        one, left there by a move that failed before its last step."""
+        stale = []
+        async with AsyncSessionLocal() as db:
+            for shard in ShardService.shard_names():
+                if shard == current:
+                    continue
+                db.info["shard"] = shard
+                if await db.scalar(select(Document.id).where(Document.team_id == team_id).limit(1)) is not None:
+                    stale.append(shard)
+        if not stale:
+            return
+        # Processes that routed by the map from before the failed move's repoint are done by now
+        await asyncio.sleep(wait)
+        for shard in stale:
+            async with AsyncSessionLocal() as db:
+                db.info["shard"] = shard
+                await ShardService._purge_team(db, team_id)
+                await db.commit()
+            logger.info("Deleted the leftovers of team %s from shard %s", team_id, shard)
+
+    @staticmethod
+    async def stats() -> Dict[str, Any]:
+        """Configured shards and the teams mapped to each."""
+        if not SHARDING_ENABLED:
+            return {"enabled": False, "shards": [PRIMARY_SHARD]}
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(TeamShard.shard, TeamShard.moving_to))).all()
+        teams = {name: 0 for name in ShardService.shard_names()}
+        moving = 0
+        for shard, moving_to in rows:
+            teams[shard] = teams.get(shard, 0) + 1
+            moving += moving_to is not None
+        return {
+            "enabled": True,
+            "shards": ShardService.shard_names(),
+            "new_teams": SHARD_NEW_TEAMS or [PRIMARY_SHARD],
+            "mapped_teams": teams,
+            "teams_moving": moving,
+        }
@@ -0,0 +1,85 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from dotenv import load_dotenv
+import asyncio
+import os
+
+load_dotenv()
+
+# Share the result of identical concurrent reads and scrapes instead of repeating the work
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+
+T = TypeVar("T")
+
+_flights: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key (the leader) runs the work; callers arriving
+    while it is in flight wait for and share its result or exception. Once
+    the call completes the key is free again, so nothing is cached: later
+    callers run the work anew.
+
+    Results are shared objects and must not be mutated by callers. The work
+    runs with the leader's arguments (its database session, for instance).
+    If the leader is cancelled, a waiting caller takes over and runs the work
+    itself. Coalescing is per process and per event loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+        _flights[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if not SINGLE_FLIGHT:
+            return await fn()
+
+        while key in self._calls:
+            call = self._calls[key]
+            self.followers += 1
+            try:
+                # Shielded: a follower going away must not cancel the leader's work
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+                # The leader was cancelled; try again, possibly as the new leader
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.leaders += 1
+        try:
+            result = await fn()
+        except Exception as e:
+            call.set_exception(e)
+            # Followers re-raise it; without them it would be reported as never retrieved
+            call.exception()
+            raise
+        except BaseException:
+            call.cancel()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.stats() for name, flight in _flights.items()}
+
+
+document_flight = SingleFlight("documents")
+team_listing_flight = SingleFlight("team_listings")
+scrape_flight = SingleFlight("scrapes")
@@ -1,28 +1,36 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.server.models.team import Team, TeamMember
 from src.server.models.user import User
-from src.server.schemas.team import TeamCreate, TeamInvite, JoinTeamRequest
+from src.server.services.shard_service import ShardService
+from src.server.schemas.team import TeamCreate, TeamInvite, TeamBulkInvite, JoinTeamRequest
 from fastapi import HTTPException
-from typing import List, Dict
-from sqlalchemy.orm import joinedload
+from typing import Any, List, Dict, Tuple
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from datetime import datetime
+from src.utils.logging_config import RateLimitedLogger
 import logging
 
 logger = logging.getLogger(__name__)
+# Existence checks and member listings run on most team requests
+hot_path_logger = RateLimitedLogger(logger)
 
 class TeamService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def check_team_exists(self, team_id: int) -> Dict:
+    async def check_team_exists(self, team_id: int) -> Dict:
         """Check if a team exists and return basic info"""
         try:
-            team = self.db.query(Team).filter(Team.id == team_id).first()
-            
+            team = await self.db.get(Team, team_id)
+
             if not team:
-                logger.warning(f"Team with ID {team_id} not found")
+                logger.warning("Team with ID %s not found", team_id)
                 return {"exists": False, "message": "Team not found"}
-            
-            logger.info(f"Team with ID {team_id} exists")
+
+            hot_path_logger.info("Team with ID %s exists", team_id)
             return {
                 "exists": True,
                 "team_id": team.id,
@@ -30,165 +38,264 @@ class TeamService:
                 "created_at": team.created_at
             }
         except Exception as e:
-            logger.error(f"Error checking team existence: {str(e)}")
+            logger.error("Error checking team existence: %s", e)
             raise HTTPException(status_code=500, detail=f"Error checking team: {str(e)}")
 
-    def create_team(self, team_data: TeamCreate, user_id: int) -> Team:
+    async def create_team(self, team_data: TeamCreate, user_id: int) -> Team:
         try:
             team = Team(
                 name=team_data.name,
                 created_by=user_id
             )
-            
+
             self.db.add(team)
-            self.db.flush()  # This will populate team.id
-            
+            await self.db.flush()  # This will populate team.id
+            ShardService.place_new_team(self.db, team.id)
+
             # Add creator as the first team member
             team_member = TeamMember(
                 team_id=team.id,
                 user_id=user_id
             )
-            
+
             self.db.add(team_member)
-            self.db.commit()
-            self.db.refresh(team)
-            logger.info(f"Successfully created team '{team.name}' with ID {team.id}")
+            await self.db.commit()
+
+            # Reload with members and their users for the response
+            result = await self.db.execute(
+                select(Team)
+                .where(Team.id == team.id)
+                .options(selectinload(Team.members).selectinload(TeamMember.user))
+                .execution_options(populate_existing=True)
+            )
+            team = result.scalars().one()
+            logger.info("Successfully created team '%s' with ID %s", team.name, team.id)
             return team
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to create team: {str(e)}")
+            await self.db.rollback()
+            logger.error("Failed to create team: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to create team: {str(e)}")
 
-    def invite_member(self, invite_data: TeamInvite) -> TeamMember:
+    async def invite_member(self, invite_data: TeamInvite) -> TeamMember:
         try:
             # Check if team exists
-            team = self.db.query(Team).filter(Team.id == invite_data.team_id).first()
+            team = await self.db.get(Team, invite_data.team_id)
             if not team:
-                logger.warning(f"Team with ID {invite_data.team_id} not found")
+                logger.warning("Team with ID %s not found", invite_data.team_id)
                 raise HTTPException(status_code=404, detail="Team not found")
 
             # Check if user exists
-            user = self.db.query(User).filter(User.email == invite_data.email).first()
+            user = (await self.db.execute(
+                select(User).where(User.email == invite_data.email)
+            )).scalars().first()
             if not user:
-                logger.warning(f"User with email {invite_data.email} not found")
+                logger.warning("User with email %s not found", invite_data.email)
                 raise HTTPException(status_code=404, detail="User not found")
 
-            # Check if user is already a member
-            existing_member = self.db.query(TeamMember).filter(
-                TeamMember.team_id == invite_data.team_id,
-                TeamMember.user_id == user.id
-            ).first()
-            
-            if existing_member:
-                logger.warning(f"User {user.email} is already a member of team {team.id}")
-                raise HTTPException(status_code=400, detail="User is already a team member")
-
             team_member = TeamMember(
                 team_id=invite_data.team_id,
-                user_id=user.id
+                user=user
             )
-            
+
+            # The unique (team_id, user_id) index rejects existing members
             self.db.add(team_member)
-            self.db.commit()
-            self.db.refresh(team_member)
-            logger.info(f"Successfully added user {user.email} to team {team.id}")
+            await self.db.commit()
+            logger.info("Successfully added user %s to team %s", user.email, team.id)
             return team_member
         except HTTPException:
             raise
+        except IntegrityError:
+            await self.db.rollback()
+            logger.warning("User %s is already a member of team %s", invite_data.email, invite_data.team_id)
+            raise HTTPException(status_code=400, detail="User is already a team member")
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to invite member: {str(e)}")
+            await self.db.rollback()
+            logger.error("Failed to invite member: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to invite member: {str(e)}")
 
-    def get_team_members(self, team_id: int) -> List[TeamMember]:
+    async def bulk_invite_members(self, invite_data: TeamBulkInvite) -> List[Dict[str, Any]]:
+        """Add many users to a team by email, with one result per distinct email.
+
+        Takes four round trips whatever the number of emails: load the team,
+        resolve all users with one IN query, find existing memberships with
+        another, and insert the rest in a single statement that skips rows a
+        concurrent request inserted first.
+        """
         try:
-            team = self.db.query(Team).filter(Team.id == team_id).first()
+            team = await self.db.get(Team, invite_data.team_id)
             if not team:
-                logger.warning(f"Team with ID {team_id} not found")
+                logger.warning("Team with ID %s not found", invite_data.team_id)
                 raise HTTPException(status_code=404, detail="Team not found")
 
-            members = (
-                self.db.query(TeamMember)
-                .filter(TeamMember.team_id == team_id)
-                .join(User)
+            emails = list(dict.fromkeys(invite_data.emails))
+            users = dict((await self.db.execute(
+                select(User.email, User.id).where(User.email.in_(emails))
+            )).all())
+
+            existing = set((await self.db.execute(
+                select(TeamMember.user_id).where(
+                    TeamMember.team_id == team.id,
+                    TeamMember.user_id.in_(list(users.values()))
+                )
+            )).scalars())
+
+            joined_at = datetime.utcnow()
+            new_user_ids = [user_id for user_id in users.values() if user_id not in existing]
+            inserted = set()
+            if new_user_ids:
+                dialect = self.db.get_bind().dialect.name
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                inserted = set((await self.db.execute(
+                    insert(TeamMember)
+                    .values([
+                        {"team_id": team.id, "user_id": user_id, "joined_at": joined_at}
+                        for user_id in new_user_ids
+                    ])
+                    .on_conflict_do_nothing(index_elements=["team_id", "user_id"])
+                    .returning(TeamMember.user_id)
+                )).scalars())
+                await self.db.commit()
+
+            results = []
+            for email in emails:
+                user_id = users.get(email)
+                if user_id is None:
+                    results.append({"email": email, "status": "user_not_found"})
+                elif user_id in inserted:
+                    results.append({"email": email, "status": "added", "joined_at": joined_at})
+                else:
+                    results.append({"email": email, "status": "already_member"})
+
+            logger.info("Added %s of %s invited users to team %s", len(inserted), len(emails), team.id)
+            return results
+        except HTTPException:
+            raise
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to invite members: %s", e)
+            raise HTTPException(status_code=500, detail=f"Failed to invite members: {str(e)}")
+
+    async def get_team_members(self, team_id: int, limit: int, offset: int = 0) -> Tuple[List[TeamMember], int]:
+        """One page of a team's members in join order, with the total member count"""
+        try:
+            team = await self.db.get(Team, team_id)
+            if not team:
+                logger.warning("Team with ID %s not found", team_id)
+                raise HTTPException(status_code=404, detail="Team not found")
+
+            total = await self.db.scalar(
+                select(func.count()).select_from(TeamMember).where(TeamMember.team_id == team_id)
+            )
+            result = await self.db.execute(
+                select(TeamMember)
+                .where(TeamMember.team_id == team_id)
                 .options(joinedload(TeamMember.user))
-                .all()
+                .order_by(TeamMember.joined_at, TeamMember.id)
+                .limit(limit)
+                .offset(offset)
             )
-            
-            logger.info(f"Successfully retrieved {len(members)} members for team {team_id}")
-            return members
+            members = result.scalars().all()
+
+            hot_path_logger.info("Successfully retrieved %s of %s members for team %s", len(members), total, team_id)
+            return members, total
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Failed to get team members: {str(e)}")
+            logger.error("Failed to get team members: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to get team members: {str(e)}")
 
-    def get_user_teams(self, user_id: int) -> List[Team]:
-        """Get all teams that the user is a member of"""
+    async def get_user_teams(self, user_id: int, member_limit: int) -> List[Dict[str, Any]]:
+        """Get all teams that the user is a member of, with member counts and the
+        first ``member_limit`` members of each.
+
+        Runs two flat queries however large the teams are: the teams with a
+        counted member total, then the leading members of every team ranked
+        with row_number(). The full member list is served page by page by
+        get_team_members.
+        """
         try:
-            teams = (
-                self.db.query(Team)
-                .join(TeamMember, Team.id == TeamMember.team_id)
-                .filter(TeamMember.user_id == user_id)
-                .options(
-                    joinedload(Team.members).joinedload(TeamMember.user)
-                )
-                .all()
+            membership = aliased(TeamMember)
+            member_count = (
+                select(func.count())
+                .where(TeamMember.team_id == Team.id)
+                .correlate(Team)
+                .scalar_subquery()
             )
-            
-            # Ensure members are loaded
-            for team in teams:
-                _ = team.members
-            
-            logger.info(f"Successfully retrieved {len(teams)} teams for user {user_id}")
-            return teams
+            rows = (await self.db.execute(
+                select(Team, member_count.label("member_count"))
+                .join(membership, membership.team_id == Team.id)
+                .where(membership.user_id == user_id)
+                .order_by(Team.id)
+            )).all()
+
+            teams = {
+                team.id: {"team": team, "member_count": count, "members": []}
+                for team, count in rows
+            }
+
+            if teams and member_limit > 0:
+                ranked = (
+                    select(
+                        TeamMember.team_id,
+                        TeamMember.user_id,
+                        TeamMember.joined_at,
+                        func.row_number().over(
+                            partition_by=TeamMember.team_id,
+                            order_by=(TeamMember.joined_at, TeamMember.id)
+                        ).label("position")
+                    )
+                    .where(TeamMember.team_id.in_(list(teams)))
+                    .subquery()
+                )
+                preview = await self.db.execute(
+                    select(ranked.c.team_id, User.email, ranked.c.joined_at)
+                    .join(User, User.id == ranked.c.user_id)
+                    .where(ranked.c.position <= member_limit)
+                    .order_by(ranked.c.team_id, ranked.c.position)
+                )
+                for team_id, email, joined_at in preview:
+                    teams[team_id]["members"].append({"email": email, "joined_at": joined_at})
+
+            hot_path_logger.info("Successfully retrieved %s teams for user %s", len(teams), user_id)
+            return list(teams.values())
         except Exception as e:
-            logger.error(f"Failed to get user teams: {str(e)}")
+            logger.error("Failed to get user teams: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to get user teams: {str(e)}")
 
-    def join_team(self, join_data: JoinTeamRequest) -> TeamMember:
+    async def join_team(self, join_data: JoinTeamRequest) -> TeamMember:
         """Join a team with the given team_id and user_id"""
         try:
             # Check if team exists
-            team = self.db.query(Team).filter(Team.id == join_data.team_id).first()
+            team = await self.db.get(Team, join_data.team_id)
             if not team:
-                logger.warning(f"Team with ID {join_data.team_id} not found")
+                logger.warning("Team with ID %s not found", join_data.team_id)
                 raise HTTPException(status_code=404, detail="Team not found")
 
             # Check if user exists
-            user = self.db.query(User).filter(User.id == join_data.user_id).first()
+            user = await self.db.get(User, join_data.user_id)
             if not user:
-                logger.warning(f"User with ID {join_data.user_id} not found")
+                logger.warning("User with ID %s not found", join_data.user_id)
                 raise HTTPException(status_code=404, detail="User not found")
 
-            # Check if user is already a member
-            existing_member = self.db.query(TeamMember).filter(
-                TeamMember.team_id == join_data.team_id,
-                TeamMember.user_id == join_data.user_id
-            ).first()
-            
-            if existing_member:
-                logger.warning(f"User {user.email} is already a member of team {team.id}")
-                raise HTTPException(status_code=400, detail="User is already a team member")
-
-            # Create new team member
+            # Create new team member; the user relationship is set for the response.
+            # The unique (team_id, user_id) index rejects existing members.
             team_member = TeamMember(
                 team_id=join_data.team_id,
-                user_id=join_data.user_id
+                user=user
             )
-            
+
             self.db.add(team_member)
-            self.db.commit()
-            self.db.refresh(team_member)
-            
-            # Load the user relationship for the response
-            self.db.refresh(team_member, ['user'])
-            
-            logger.info(f"Successfully added user {user.email} to team {team.id}")
+            await self.db.commit()
+
+            logger.info("Successfully added user %s to team %s", user.email, team.id)
             return team_member
         except HTTPException:
             raise
+        except IntegrityError:
+            await self.db.rollback()
+            logger.warning("User %s is already a member of team %s", join_data.user_id, join_data.team_id)
+            raise HTTPException(status_code=400, detail="User is already a team member")
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Failed to join team: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to join team: {str(e)}") 
\ No newline at end of file
+            await self.db.rollback()
+            logger.error("Failed to join team: %s", e)
+            raise HTTPException(status_code=500, detail=f"Failed to join team: {str(e)}")
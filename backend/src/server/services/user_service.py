@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from src.server.models.user import User
 from src.server.schemas.user import UserCreate
@@ -9,57 +10,66 @@ logger = logging.getLogger(__name__)
 
 class UserService:
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user: UserCreate) -> User:
         try:
             # Check if user already exists
-            if db.query(User).filter(User.email == user.email).first():
-                logger.warning(f"Attempted to create user with existing email: {user.email}")
+            if (await db.execute(select(User.id).where(User.email == user.email))).first():
+                logger.warning("Attempted to create user with existing email: %s", user.email)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Email already registered"
                 )
 
             # Create new user
-            hashed_password = AuthService.get_password_hash(user.password)
+            hashed_password = await AuthService.hash_password(user.password)
             db_user = User(
                 email=user.email,
                 hashed_password=hashed_password
             )
             
             db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
+            await db.commit()
+            await db.refresh(db_user)
             
-            logger.info(f"Successfully created new user with email: {user.email}")
+            logger.info("Successfully created new user with email: %s", user.email)
             return db_user
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error creating user: {str(e)}")
-            db.rollback()
+            logger.error("Error creating user: %s", e)
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Internal server error while creating user"
             )
 
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> User:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
         try:
-            user = db.query(User).filter(User.email == email).first()
+            user = (await db.execute(select(User).where(User.email == email))).scalars().first()
             if not user:
-                logger.warning(f"Login attempt with non-existent email: {email}")
+                logger.warning("Login attempt with non-existent email: %s", email)
                 return False
                 
-            if not AuthService.verify_password(password, user.hashed_password):
-                logger.warning(f"Failed login attempt for user: {email}")
+            valid, new_hash = await AuthService.verify_and_update_password(password, user.hashed_password)
+            if not valid:
+                logger.warning("Failed login attempt for user: %s", email)
                 return False
-                
-            logger.info(f"Successful login for user: {email}")
+
+            if new_hash:
+                # Stored with an outdated bcrypt cost; upgrade it while we have the password
+                user.hashed_password = new_hash
+                await db.commit()
+                logger.info("Rehashed password for user: %s", email)
+
+            logger.info("Successful login for user: %s", email)
             return user
             
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Error during authentication: {str(e)}")
+            logger.error("Error during authentication: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Internal server error during authentication"
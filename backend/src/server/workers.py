@@ -0,0 +1,67 @@
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn_worker import UvicornWorker
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import resource
+import sys
+
+load_dotenv()
+
+# Restart a worker once its resident memory passes this many MB; 0 disables the check
+WORKER_MAX_MEMORY_MB = int(os.getenv("WORKER_MAX_MEMORY_MB", "0"))
+WORKER_MEMORY_CHECK_SECONDS = float(os.getenv("WORKER_MEMORY_CHECK_SECONDS", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+def resident_memory_bytes() -> int:
+    """Current RSS of this process; peak RSS where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RecyclingUvicornWorker(UvicornWorker):
+    """Uvicorn worker for gunicorn that drains before exiting and recycles on memory.
+
+    In-flight requests get up to gunicorn's ``graceful_timeout`` to finish on
+    shutdown and reload, and on the restarts triggered by ``max_requests`` or
+    by passing WORKER_MAX_MEMORY_MB. Either restart stops the worker from
+    accepting connections, lets it drain, and gunicorn forks a replacement.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
+
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = Server(config=self.config)
+        self._install_sigquit_handler()
+        watcher = asyncio.create_task(self._watch_memory(server)) if WORKER_MAX_MEMORY_MB else None
+        try:
+            await server.serve(sockets=self.sockets)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+    async def _watch_memory(self, server: Server) -> None:
+        limit = WORKER_MAX_MEMORY_MB * 1024 * 1024
+        while not server.should_exit:
+            await asyncio.sleep(WORKER_MEMORY_CHECK_SECONDS)
+            used = resident_memory_bytes()
+            if used > limit:
+                logger.warning(
+                    "Worker %s uses %d MB, over WORKER_MAX_MEMORY_MB=%d; restarting",
+                    os.getpid(), used // (1024 * 1024), WORKER_MAX_MEMORY_MB,
+                )
+                server.should_exit = True
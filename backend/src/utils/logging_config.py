@@ -1,9 +1,78 @@
+"""
+Logging for the API: one configuration, applied by setup_logging().
+
+Every record goes through a QueueHandler on the root logger. The calling
+thread only renders the message and puts the record on a bounded queue; a
+QueueListener thread formats it and writes it to stdout, so a slow terminal
+or log shipper never blocks the event loop or a request thread. When the
+queue is full, records are dropped and counted instead of waiting.
+
+    LOG_LEVEL=INFO          root level
+    LOG_FORMAT=json         one JSON object per line; "text" for colored lines
+    LOG_QUEUE_SIZE=10000    records buffered before dropping
+    LOG_HOT_PATH_PER_SECOND=10
+                            records per second let through by each
+                            RateLimitedLogger (per-page and per-request
+                            logs); 0 lets everything through
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+import atexit
+import copy
 import logging
-from colorlog import ColoredFormatter
+import os
+import queue
+import sys
+import threading
+import time
+
+import orjson
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_HOT_PATH_PER_SECOND = float(os.getenv("LOG_HOT_PATH_PER_SECOND", "10"))
+
+# Attributes every LogRecord has; anything else was passed with extra=.
+# color_message is uvicorn's ANSI-colored copy of the message.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "color_message",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the ``extra=`` fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
 
-def setup_logging():
-    # Create a colored formatter
-    formatter = ColoredFormatter(
+def _text_formatter() -> logging.Formatter:
+    from colorlog import ColoredFormatter
+
+    return ColoredFormatter(
         "%(log_color)s%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
         log_colors={
@@ -15,10 +84,165 @@ def setup_logging():
         },
     )
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[console_handler]
-    )
\ No newline at end of file
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full rather than block."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now, while the arguments are still
+        # current, but keep them apart so the JSON formatter sees both
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_pid: Optional[int] = None
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Route all logging through the queue to stdout. Safe to call repeatedly.
+
+    Called again in a forked child (gunicorn workers), it starts a new
+    listener there, since the parent's thread does not survive the fork.
+    """
+    global _handler, _listener, _pid
+    with _lock:
+        if _pid == os.getpid():
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else _text_formatter())
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+        root = logging.getLogger()
+        if _handler is not None:
+            root.removeHandler(_handler)
+        # Handlers set up elsewhere (logging.basicConfig, colorlog) would
+        # write synchronously and duplicate every line
+        for existing in list(root.handlers):
+            if isinstance(existing, logging.StreamHandler) and existing.stream in (sys.stdout, sys.stderr):
+                root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or LOG_LEVEL)
+
+        # Uvicorn and gunicorn attach their own stream handlers; send their
+        # records through the queue like everything else
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error", "gunicorn.access"):
+            server_logger = logging.getLogger(name)
+            server_logger.handlers.clear()
+            server_logger.propagate = True
+
+        listener.start()
+        if _listener is None:
+            atexit.register(_stop_listener)
+        _handler, _listener, _pid = handler, listener, os.getpid()
+
+
+def _stop_listener() -> None:
+    # Flushes what is still queued; only the process that started the thread can join it
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+
+
+def dropped_records() -> int:
+    """Records dropped in this process because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+class RateLimitedLogger:
+    """Logger wrapper for hot paths that lets at most ``per_second`` records through.
+
+    Records logged per request or per crawled page would otherwise flood the
+    log under load and crowd out the ones that matter.
+
+        crawl_logger = RateLimitedLogger(logger)
+        crawl_logger.info("Crawling: %s", url)
+
+    Each message template and level has its own token bucket, holding up to
+    one second of records to absorb bursts, so a flood of one message does
+    not silence the others. The records of a template suppressed since the
+    last one let through are reported on the next, as ``suppressed`` (an
+    extra field in JSON output). The level is checked first, so disabled
+    records cost no more than on a plain logger.
+    """
+
+    # Templates are a fixed set in practice; the bound guards against messages
+    # formatted before logging, each of which would get a bucket
+    MAX_BUCKETS = 256
+
+    def __init__(self, logger: logging.Logger, per_second: float = LOG_HOT_PATH_PER_SECOND):
+        self.logger = logger
+        self.per_second = per_second
+        # At least one record's worth, so rates below one per second still let records through
+        self._capacity = max(per_second, 1.0)
+        # (msg, level) -> [tokens, updated, suppressed], least recently used first
+        self._buckets: "OrderedDict[Tuple[str, int], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _allow(self, msg: str, level: int) -> Optional[int]:
+        """Suppressed count to report if a record may be logged now, else None."""
+        with self._lock:
+            now = time.monotonic()
+            key = (msg, level)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self._capacity, now, 0]
+                if len(self._buckets) > self.MAX_BUCKETS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            bucket[0] = min(self._capacity, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return None
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+            return int(suppressed)
+
+    def log(self, level: int, msg: str, *args, **kwargs) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.per_second <= 0:
+            self.logger.log(level, msg, *args, **kwargs)
+            return
+        suppressed = self._allow(msg, level)
+        if suppressed is None:
+            return
+        if suppressed:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "suppressed": suppressed}
+            msg = f"{msg} (%d similar suppressed)"
+            args = (*args, suppressed)
+        kwargs.setdefault("stacklevel", 2)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.DEBUG, msg, *args, stacklevel=3, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.INFO, msg, *args, stacklevel=3, **kwargs)
+
+    def warning(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.WARNING, msg, *args, stacklevel=3, **kwargs)
+
+    def error(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.ERROR, msg, *args, stacklevel=3, **kwargs)
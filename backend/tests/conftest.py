@@ -0,0 +1,60 @@
+"""
+Shared test setup: the app runs against a throwaway SQLite database.
+
+The environment is set before anything from src is imported, since its
+modules read their settings on import.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix="backend-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DATA_DIR}/app.db",
+    "ASYNC_DATABASE_URL": "",
+    "DATABASE_REPLICA_URLS": "",
+    "DATABASE_SHARDS": "",
+    "CACHE_INVALIDATION_FILE": "",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    # Fast hashing; the cost factor is not under test
+    "BCRYPT_ROUNDS": "4",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FORMAT": "text",
+})
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from src.server.app import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def user(client):
+    """A new user, with the Authorization header of its token."""
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    body = client.post("/auth/signup", json={"email": email, "password": "password"}).json()
+    return {**body, "email": email, "headers": {"Authorization": f"Bearer {body['access_token']}"}}
+
+
+@pytest.fixture
+def team(client, user):
+    """A new team created by ``user``."""
+    return client.post("/teams/create", json={"name": f"Team {uuid.uuid4().hex[:8]}", "created_by": user["id"]}).json()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Context manager failing the test when its block runs more than the
+    given number of SQL queries; see query_profiler_service.assert_max_queries."""
+    from src.server.services.query_profiler_service import assert_max_queries
+
+    return assert_max_queries
@@ -0,0 +1,51 @@
+import asyncio
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from src.server.services.admission_service import AdmissionController
+
+
+def controller(**kwargs) -> AdmissionController:
+    return AdmissionController("test", **{"limit": 1, "queue_limit": 10, "queue_timeout": 10, **kwargs})
+
+
+def test_release_skips_a_waiter_whose_wait_just_timed_out():
+    async def scenario():
+        admission = controller()
+        await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+
+        # What wait_for does when the timeout fires; the slot is released
+        # before the waiting task gets to run its cleanup
+        admission._queues[None][0].cancel()
+        admission._release(None)
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert (admission.active, admission.queued, admission._queues) == (0, 0, {})
+        # The slot is free for the next request
+        await asyncio.wait_for(admission.acquire(), 0.1)
+
+    asyncio.run(scenario())
+
+
+def test_timeouts_racing_releases_leak_no_slots():
+    async def request(admission, team):
+        try:
+            async with admission.slot(team):
+                await asyncio.sleep(random.uniform(0, 0.004))
+        except HTTPException as e:
+            assert e.status_code == 503
+
+    async def scenario():
+        random.seed(0)
+        admission = controller(limit=2, queue_limit=50, queue_timeout=0.002)
+        for _ in range(20):
+            await asyncio.gather(*(request(admission, random.choice(["a", "b", None])) for _ in range(30)))
+        assert admission.timed_out > 0
+        assert (admission.active, admission.queued, admission._queues, admission._active_by_team) == (0, 0, {}, {})
+
+    asyncio.run(scenario())
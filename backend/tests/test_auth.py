@@ -0,0 +1,46 @@
+import time
+
+from src.server.database.config import SessionLocal
+from src.server.models.user import User
+from src.server.services.auth_service import PrincipalCache, UserPrincipal
+from src.server.services.cache_service import InvalidationTable
+
+PRINCIPAL = UserPrincipal(id=1, email="someone@example.com", created_at=None)
+
+
+def worker_caches(tmp_path):
+    """Two principal caches sharing one invalidation file, as two gunicorn workers do."""
+    path = str(tmp_path / "invalidations")
+    return PrincipalCache(invalidations=InvalidationTable(path)), PrincipalCache(invalidations=InvalidationTable(path))
+
+
+def test_user_change_reaches_other_workers(tmp_path):
+    first, second = worker_caches(tmp_path)
+    first.set("token", PRINCIPAL, time.time() + 60, first.generation(PRINCIPAL.email))
+    assert first.get("token") == PRINCIPAL
+
+    second.invalidate_user(PRINCIPAL.email)
+
+    assert first.get("token") is None
+
+
+def test_principal_loaded_before_a_change_is_not_cached(tmp_path):
+    first, second = worker_caches(tmp_path)
+    generation = first.generation(PRINCIPAL.email)
+    # The user changes while first is still loading it
+    second.invalidate_user(PRINCIPAL.email)
+    first.set("token", PRINCIPAL, time.time() + 60, generation)
+
+    assert first.get("token") is None
+
+
+def test_renamed_user_loses_cached_tokens(client, user, team):
+    members = f"/teams/{team['id']}/members"
+    assert client.get(members, headers=user["headers"]).status_code == 200
+
+    with SessionLocal() as db:
+        db.get(User, user["id"]).email = f"renamed-{user['email']}"
+        db.commit()
+
+    # The token names the old email, which no longer exists
+    assert client.get(members, headers=user["headers"]).status_code == 401
@@ -0,0 +1,64 @@
+import os
+
+from src.server.services.cache_service import InMemoryCache, InvalidationTable
+
+
+def worker_caches(tmp_path):
+    """Two caches mapping the same invalidation file, as two gunicorn workers do."""
+    path = str(tmp_path / "invalidations")
+    return InMemoryCache(invalidations=InvalidationTable(path)), InMemoryCache(invalidations=InvalidationTable(path))
+
+
+def test_delete_reaches_other_workers(tmp_path):
+    first, second = worker_caches(tmp_path)
+    first.set("document:1", "old")
+    second.set("document:1", "old")
+
+    second.delete("document:1")
+
+    assert first.get("document:1") is None
+    assert second.get("document:1") is None
+    first.set("document:1", "new")
+    assert first.get("document:1") == "new"
+
+
+def test_delete_leaves_other_keys(tmp_path):
+    first, second = worker_caches(tmp_path)
+    first.set("document:1", "one")
+    first.set("document:2", "two")
+
+    second.delete("document:1")
+
+    assert first.get("document:2") == "two"
+
+
+def test_fill_racing_an_invalidation_is_not_served(tmp_path):
+    first, second = worker_caches(tmp_path)
+    # first misses and starts loading; second's write invalidates meanwhile
+    assert first.get("document:1") is None
+    second.delete("document:1")
+    first.set("document:1", "loaded before the write")
+
+    assert first.get("document:1") is None
+
+
+def test_invalidation_crosses_a_fork(tmp_path):
+    cache = InMemoryCache(invalidations=InvalidationTable(str(tmp_path / "invalidations")))
+    cache.set("document:1", "old")
+
+    pid = os.fork()
+    if pid == 0:
+        InMemoryCache(invalidations=cache.invalidations).delete("document:1")
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert cache.get("document:1") is None
+
+
+def test_without_shared_table_deletes_stay_local():
+    first, second = InMemoryCache(), InMemoryCache()
+    first.set("document:1", "old")
+
+    second.delete("document:1")
+
+    assert first.get("document:1") == "old"
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from src.server.database.config import AsyncSessionLocal, SessionLocal
+from src.server.models.document import DocumentChange
+from src.server.services.change_feed_service import CHANGE_FEED_RETENTION_DAYS, ChangeFeedService
+
+EXPIRED = datetime.utcnow() - timedelta(days=CHANGE_FEED_RETENTION_DAYS + 1)
+
+
+def add_change(team_id: int, document_id: int) -> int:
+    with SessionLocal() as db:
+        change = DocumentChange(team_id=team_id, document_id=document_id, action=ChangeFeedService.UPDATED)
+        db.add(change)
+        db.commit()
+        return change.id
+
+
+def expire_all_changes() -> None:
+    with SessionLocal() as db:
+        db.execute(update(DocumentChange).values(changed_at=EXPIRED))
+        db.commit()
+
+
+def remaining_ids():
+    with SessionLocal() as db:
+        return db.scalars(select(DocumentChange.id).order_by(DocumentChange.id)).all()
+
+
+async def prune() -> int:
+    async with AsyncSessionLocal() as db:
+        return await ChangeFeedService.prune(db)
+
+
+def test_prune_expires_old_cursors(client, team):
+    changes = f"/documents/team/{team['id']}/changes"
+    old = add_change(team["id"], 1)
+    expire_all_changes()
+    recent = add_change(team["id"], 2)
+
+    assert client.portal.call(prune) >= 1
+    assert remaining_ids() == [recent]
+
+    # The change after the old cursor is gone: the client must reload
+    body = client.get(changes, params={"since": old - 1}).json()
+    assert body["success"] is False
+    assert body["error"]["type"] == "cursor_expired"
+    assert body["metadata"]["cursor"] == recent
+
+    body = client.get(changes, params={"since": body["metadata"]["cursor"]}).json()
+    assert body["success"] is True and body["data"] == []
+
+    # Nothing after the cursor was pruned
+    body = client.get(changes, params={"since": old}).json()
+    assert [change["cursor"] for change in body["data"]] == [recent]
+
+
+def test_prune_keeps_the_newest_change(client, team):
+    add_change(team["id"], 1)
+    newest = add_change(team["id"], 2)
+    expire_all_changes()
+
+    client.portal.call(prune)
+
+    assert remaining_ids() == [newest]
@@ -0,0 +1,50 @@
+import json
+
+from sqlalchemy import literal, select
+
+from src.server.database.config import get_engine
+from src.server.services import document_stream_service
+from src.server.services.document_stream_service import octet_length
+
+CONTENT = {
+    "sections": [
+        {"title": "Größe", "level": 1, "content": "naïve café " * 50, "subsections": [
+            {"title": "Unter", "level": 2, "content": "€ and ✓", "subsections": []},
+        ]},
+    ],
+    "metadata": {"language": "de"},
+}
+
+
+def store_document(client, user, team):
+    response = client.post("/documents/store-scraped", json={
+        "team_id": team["id"],
+        "user_id": user["id"],
+        "document_name": "Streamed",
+        "scraped_data": {"title": "Streamed", "url": f"https://example.com/{team['id']}", "content": CONTENT},
+    })
+    return response.json()["data"]["id"]
+
+
+def test_octet_length_counts_utf8_bytes():
+    with get_engine().connect() as connection:
+        assert connection.scalar(select(octet_length(literal("é€✓")))) == 2 + 3 + 3
+        assert connection.scalar(select(octet_length(literal("abc")))) == 3
+
+
+def test_streamed_document_matches_the_buffered_one(client, user, team, monkeypatch):
+    document_id = store_document(client, user, team)
+    buffered = client.get(f"/documents/{document_id}").json()
+    assert "streamed" not in buffered["metadata"]
+
+    monkeypatch.setattr(document_stream_service, "DOCUMENT_STREAM_THRESHOLD_BYTES", 1)
+    # Several chunks, cutting through multi-byte characters
+    monkeypatch.setattr(document_stream_service, "DOCUMENT_STREAM_CHUNK_BYTES", 7)
+    client.put(f"/documents/{document_id}", json={"title": "Streamed again"})
+    streamed = client.get(f"/documents/{document_id}")
+
+    body = json.loads(streamed.content)
+    assert body["metadata"]["streamed"] is True
+    assert body["data"]["title"] == "Streamed again"
+    assert body["data"]["content"] == buffered["data"]["content"]
+    assert len(body["data"]["sections"]) == len(buffered["data"]["sections"]) == 2
@@ -0,0 +1,43 @@
+import sqlite3
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from src.server.database.config import DATABASE_URL, AsyncSessionLocal
+from src.server.models.document import Document
+from src.server.services.editor_service import EditorService
+
+CONTENT = {"sections": [{"title": "Intro", "level": 1, "content": "text", "subsections": []}], "metadata": {}}
+
+
+async def build_in_two_sessions(document_id: int):
+    """Both sessions load the document before either stores its editor state,
+    like two first requests for it at the same time."""
+    async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+        documents = [
+            (await db.execute(
+                select(Document).where(Document.id == document_id).options(selectinload(Document.editor_state))
+            )).scalars().one()
+            for db in (first, second)
+        ]
+        states = [
+            await EditorService.get_editor_state(db, document)
+            for db, document in zip((first, second), documents)
+        ]
+        return [state.editor_content for state in states]
+
+
+def test_concurrent_first_builds_of_an_editor_state(client, user, team):
+    document_id = client.post("/documents/store-scraped", json={
+        "team_id": team["id"],
+        "user_id": user["id"],
+        "document_name": "Manual",
+        "scraped_data": {"title": "Manual", "url": f"https://example.com/editor/{team['id']}", "content": CONTENT},
+    }).json()["data"]["id"]
+    # As for documents stored before editor states existed
+    with sqlite3.connect(DATABASE_URL.removeprefix("sqlite:///")) as connection:
+        connection.execute("DELETE FROM document_editor_states WHERE document_id = ?", (document_id,))
+
+    first, second = client.portal.call(build_in_two_sessions, document_id)
+    assert first == second == EditorService.to_editor_document(CONTENT)
+    assert client.get(f"/documents/{document_id}/editor").json()["data"]["content"] == first
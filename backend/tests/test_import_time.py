@@ -0,0 +1,39 @@
+"""
+Importing the app must stay cheap and free of side effects: every worker
+boot pays for it before serving a request. Runs ``python -X importtime -c
+"import src.server.app"`` in fresh interpreters (see benchmarks.import_time).
+"""
+import os
+import statistics
+
+import pytest
+
+from benchmarks.import_time import import_once
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1800"))
+
+# Only needed by scraping and password hashing; imported where they are used
+LAZY_MODULES = ["requests", "bs4", "passlib"]
+
+
+@pytest.fixture(scope="module")
+def database_path(tmp_path_factory) -> str:
+    return str(tmp_path_factory.mktemp("import-time") / "must-not-exist.db")
+
+
+def test_import_time_is_within_budget(database_path):
+    median_ms = statistics.median(import_once(database_path)[0] for _ in range(3)) * 1000
+    assert median_ms <= IMPORT_TIME_BUDGET_MS
+
+
+def test_heavy_modules_are_not_imported_eagerly(database_path):
+    _, modules = import_once(database_path, importtime=True)
+    imported = {name for _, name in modules}
+
+    assert "src.server.app" in imported
+    assert [module for module in LAZY_MODULES if module in imported] == []
+
+
+def test_import_does_not_touch_the_database(database_path):
+    import_once(database_path)
+    assert not os.path.exists(database_path)
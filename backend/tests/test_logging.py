@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+
+from src.utils.logging_config import RateLimitedLogger
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.utils.logging_config.time.monotonic", lambda: now[0])
+    return now
+
+
+def rate_limited(per_second: float):
+    logger = logging.getLogger(f"tests.rate_limited.{per_second}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = Records()
+    logger.handlers = [handler]
+    return RateLimitedLogger(logger, per_second=per_second), handler.records
+
+
+def test_a_flood_of_one_message_does_not_silence_others(clock):
+    logger, records = rate_limited(2)
+    for page in range(100):
+        logger.info("Crawling: %s", page)
+    logger.info("Fetching members for team %s", 1)
+    logger.warning("Crawling: %s", "slow")
+
+    messages = [record.getMessage() for record in records]
+    assert messages == ["Crawling: 0", "Crawling: 1", "Fetching members for team 1", "Crawling: slow"]
+
+
+def test_suppressed_records_are_reported_per_message(clock):
+    logger, records = rate_limited(1)
+    for page in range(5):
+        logger.info("Crawling: %s", page)
+    logger.info("Storing %s", "document")
+
+    clock[0] += 1
+    logger.info("Crawling: %s", "next")
+
+    assert [record.getMessage() for record in records] == [
+        "Crawling: 0", "Storing document", "Crawling: next (4 similar suppressed)",
+    ]
+    assert records[-1].suppressed == 4
+
+
+def test_buckets_are_bounded(clock):
+    logger, records = rate_limited(1)
+    for page in range(RateLimitedLogger.MAX_BUCKETS * 2):
+        logger.info(f"Crawling: {page}")
+
+    assert len(records) == RateLimitedLogger.MAX_BUCKETS * 2
+    assert len(logger._buckets) == RateLimitedLogger.MAX_BUCKETS
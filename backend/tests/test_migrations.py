@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import sqlalchemy as sa
+
+from src.server.models import user, team, document, shard  # noqa: F401  (register tables)
+from src.server.models.base import Base
+from tests.conftest import DATA_DIR
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Tables added after the app started creating its schema with create_all
+LATER_TABLES = {"document_changes", "document_editor_states", "team_shards", "document_directory"}
+
+
+def test_upgrade_head_from_an_early_create_all_database():
+    url = f"sqlite:///{DATA_DIR}/migrations.db"
+    engine = sa.create_engine(url)
+    Base.metadata.create_all(engine, tables=[
+        table for name, table in Base.metadata.tables.items() if name not in LATER_TABLES
+    ])
+    with engine.begin() as conn:
+        conn.execute(sa.text("INSERT INTO users (id, email, hashed_password) VALUES (1, 'a@example.com', 'x')"))
+        conn.execute(sa.text("INSERT INTO teams (id, name, created_by) VALUES (1, 'Team', 1)"))
+        conn.execute(sa.text(
+            "INSERT INTO documents (id, team_id, user_id, document_name, title, url, content, raw_html) "
+            "VALUES (1, 1, 1, 'Manual', 'Manual', 'https://example.com', '{}', '')"
+        ))
+        conn.execute(sa.text(
+            "INSERT INTO document_sections (id, document_id, title, content, \"order\") "
+            "VALUES (1, 1, 'Setup', 'Configure the flux capacitor', 0)"
+        ))
+
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    with engine.connect() as conn:
+        assert LATER_TABLES <= set(sa.inspect(conn).get_table_names())
+        assert conn.execute(sa.text(
+            "SELECT document_search.document_id, document_search.section_id FROM document_search_fts "
+            "JOIN document_search ON document_search.id = document_search_fts.rowid "
+            "WHERE document_search_fts MATCH 'capacitor'"
+        )).all() == [(1, 1)]
+    engine.dispose()
@@ -0,0 +1,89 @@
+"""
+Query budgets of the list endpoints. Each budget is independent of how many
+teams, members or documents there are, so an N+1 pattern fails the test.
+"""
+import uuid
+
+import pytest
+
+CONTENT = {
+    "sections": [
+        {"title": "Intro", "level": 1, "content": "text", "subsections": [
+            {"title": "Detail", "level": 2, "content": "more text", "subsections": []},
+        ]},
+        {"title": "Usage", "level": 1, "content": "text", "subsections": []},
+    ],
+    "metadata": {},
+}
+
+
+def signup(client) -> dict:
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    body = client.post("/auth/signup", json={"email": email, "password": "password"}).json()
+    return {**body, "email": email, "headers": {"Authorization": f"Bearer {body['access_token']}"}}
+
+
+@pytest.fixture
+def teams(client, user):
+    """Three teams of ``user`` with four more members each."""
+    teams = []
+    for _ in range(3):
+        team = client.post("/teams/create", json={"name": f"Team {uuid.uuid4().hex[:8]}", "created_by": user["id"]}).json()
+        emails = [signup(client)["email"] for _ in range(4)]
+        response = client.post("/teams/invite/bulk", json={"team_id": team["id"], "emails": emails}, headers=user["headers"])
+        assert response.json()["added"] == 4
+        teams.append(team)
+    return teams
+
+
+@pytest.fixture
+def documents(client, user, team):
+    """Ids of five documents with three sections each, none of them cached."""
+    return [
+        client.post("/documents/store-scraped", json={
+            "team_id": team["id"],
+            "user_id": user["id"],
+            "document_name": f"Doc {i}",
+            "scraped_data": {"title": f"Doc {i}", "url": f"https://example.com/counts/{team['id']}/{i}", "content": CONTENT},
+        }).json()["data"]["id"]
+        for i in range(5)
+    ]
+
+
+def test_my_teams(client, user, teams, assert_max_queries):
+    # The teams with their member counts, then the leading members of all of them
+    with assert_max_queries(2):
+        response = client.post("/teams/my-teams", json={"user_id": user["id"], "member_limit": 3})
+
+    listed = response.json()["teams"]
+    assert len(listed) == 3
+    assert all(team["member_count"] == 5 and len(team["members"]) == 3 for team in listed)
+
+
+def test_team_members(client, user, teams, assert_max_queries):
+    members = f"/teams/{teams[0]['id']}/members"
+    # Verifies the token; later requests find it in the principal cache
+    client.get(members, headers=user["headers"], params={"limit": 1})
+
+    # The team, the member count and one page of members with their users
+    with assert_max_queries(3):
+        response = client.get(members, headers=user["headers"])
+
+    body = response.json()
+    assert body["total"] == 5 and len(body["members"]) == 5
+
+
+def test_batch_documents(client, documents, assert_max_queries):
+    # Which documents are too large to send, then the documents and all their sections
+    with assert_max_queries(3):
+        response = client.post("/documents/batch", json={"ids": documents})
+    assert [document["id"] for document in response.json()["data"]] == documents
+    assert all(len(document["sections"]) == 3 for document in response.json()["data"])
+
+    # Served from the document cache
+    with assert_max_queries(0):
+        client.post("/documents/batch", json={"ids": documents})
+
+    with assert_max_queries(1):
+        response = client.post("/documents/batch", json={"ids": documents, "summary": True})
+    assert all(document["sections_count"] == 3 for document in response.json()["data"])
@@ -0,0 +1,159 @@
+"""
+The queries behind the hot endpoints must be answered through indexes.
+
+Seeds teams, members and documents, runs the service methods while recording
+every SELECT they issue, and asks SQLite for the plan of each one (EXPLAIN
+QUERY PLAN, after ANALYZE). A test fails when a plan scans one of the watched
+tables without an index, or when a lookup in EXPECTED_INDEXES stops using
+its index.
+"""
+import re
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from src.server.database.config import AsyncSessionLocal, get_async_engine, get_engine
+from src.server.models.document import Document, DocumentSection
+from src.server.models.team import Team, TeamMember
+from src.server.models.user import User
+from src.server.schemas.team import JoinTeamRequest
+from src.server.services.document_service import DocumentService
+from src.server.services.team_service import TeamService
+
+TEAMS = 50
+DOCUMENTS_PER_TEAM = 20
+SECTIONS_PER_DOCUMENT = 5
+
+WATCHED_TABLES = {"users", "teams", "team_members", "documents", "document_sections", "document_editor_states"}
+
+# "SCAN documents" is a full table scan; "SCAN documents USING INDEX ..." is not
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+# Indexes some query of the call must use
+EXPECTED_INDEXES = {
+    "DocumentService.get_team_documents": {"ix_documents_team_id_url", "ix_document_sections_document_id"},
+    "DocumentService.get_document": {"ix_document_sections_document_id"},
+    "DocumentService._verify_url_is_new": {"ix_documents_team_id_url"},
+    "TeamService.get_team_members": {"ix_team_members_team_id_user_id"},
+    "TeamService.get_user_teams": {"ix_team_members_user_id", "ix_team_members_team_id_user_id"},
+}
+
+
+def seed() -> Dict[str, List[int]]:
+    """Adds the rows the calls run against; returns the new ids in order."""
+    prefix = "plans"
+    with get_engine().begin() as conn:
+        users = conn.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), [
+            {"email": f"{prefix}-user{i}@example.com", "hashed_password": "x"} for i in range(TEAMS)
+        ]).all()
+        teams = conn.scalars(insert(Team).returning(Team.id, sort_by_parameter_order=True), [
+            {"name": f"{prefix} team {i}", "created_by": users[i]} for i in range(TEAMS)
+        ]).all()
+        conn.execute(insert(TeamMember), [
+            {"team_id": teams[t], "user_id": users[u]}
+            for t in range(TEAMS) for u in range(TEAMS) if (t + u) % 3 == 0 or t == u
+        ])
+        documents = conn.scalars(insert(Document).returning(Document.id, sort_by_parameter_order=True), [
+            {
+                "team_id": teams[t], "user_id": users[t], "document_name": f"Doc {d}", "title": f"Doc {d}",
+                "url": f"https://example.com/{prefix}/{t}/{d}", "content": {"sections": []}, "raw_html": "",
+            }
+            for t in range(TEAMS) for d in range(DOCUMENTS_PER_TEAM)
+        ]).all()
+        conn.execute(insert(DocumentSection), [
+            {"document_id": document_id, "title": f"Section {s}", "content": "lorem ipsum", "order": s}
+            for document_id in documents for s in range(SECTIONS_PER_DOCUMENT)
+        ])
+    with get_engine().begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return {"users": users, "teams": teams, "documents": documents}
+
+
+async def capture_statements(ids: Dict[str, List[int]]) -> List[Tuple[str, str, Any]]:
+    """Run the hot service paths and return (label, sql, params) for every SELECT."""
+    captured: List[Tuple[str, str, Any]] = []
+    current = {"label": ""}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((current["label"], statement, parameters))
+
+    team_id, user_id, document_id = ids["teams"][1], ids["users"][1], ids["documents"][2]
+    async_engine = get_async_engine()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with AsyncSessionLocal() as db:
+            team_service = TeamService(db)
+            calls = [
+                ("DocumentService.get_team_documents", DocumentService.get_team_documents(db, team_id)),
+                ("DocumentService.get_document", DocumentService.get_document(db, document_id)),
+                ("DocumentService.get_editor_document", DocumentService.get_editor_document(db, document_id)),
+                ("DocumentService.search_team_documents", DocumentService.search_team_documents(db, team_id, "lorem")),
+                ("DocumentService._verify_url_is_new", DocumentService._verify_url_is_new(db, team_id, "https://example.com/new")),
+                ("TeamService.check_team_exists", team_service.check_team_exists(team_id)),
+                ("TeamService.get_team_members", team_service.get_team_members(team_id, 50)),
+                ("TeamService.get_user_teams", team_service.get_user_teams(user_id, 5)),
+                ("TeamService.join_team", team_service.join_team(JoinTeamRequest(team_id=team_id, user_id=user_id))),
+            ]
+            for label, call in calls:
+                current["label"] = label
+                try:
+                    await call
+                except Exception:
+                    # Expected for e.g. joining a team twice; the queries still ran
+                    pass
+                db.expunge_all()
+            # Nothing here is meant to change the seeded data
+            await db.rollback()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return captured
+
+
+def explain(statement: str, parameters: Any) -> List[str]:
+    with get_engine().connect() as conn:
+        cursor = conn.connection.driver_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[3] for row in cursor.fetchall()]
+
+
+@pytest.fixture(scope="module")
+def plans(client) -> Dict[str, List[Tuple[str, List[str]]]]:
+    """Call label -> (sql, plan) of each SELECT the call issued."""
+    ids = seed()
+    # On the app's event loop, which owns the pooled connections
+    statements = client.portal.call(capture_statements, ids)
+    plans: Dict[str, List[Tuple[str, List[str]]]] = {}
+    for label, statement, parameters in statements:
+        plans.setdefault(label, []).append((" ".join(statement.split()), explain(statement, parameters)))
+    return plans
+
+
+CALLS = [
+    "DocumentService.get_team_documents",
+    "DocumentService.get_document",
+    "DocumentService.get_editor_document",
+    "DocumentService.search_team_documents",
+    "DocumentService._verify_url_is_new",
+    "TeamService.check_team_exists",
+    "TeamService.get_team_members",
+    "TeamService.get_user_teams",
+    "TeamService.join_team",
+]
+
+
+@pytest.mark.parametrize("call", CALLS)
+def test_no_full_table_scans(plans, call):
+    assert plans.get(call), f"{call} issued no queries"
+    scans = [
+        (sql[:120], step)
+        for sql, plan in plans[call] for step in plan
+        if (match := _FULL_SCAN.match(step)) and match.group(1) in WATCHED_TABLES
+    ]
+    assert not scans, f"{call} scans whole tables: {scans}"
+
+
+@pytest.mark.parametrize("call", sorted(EXPECTED_INDEXES))
+def test_lookups_use_their_indexes(plans, call):
+    used = {index for _, plan in plans[call] for step in plan for index in re.findall(r"INDEX (\w+)", step)}
+    assert EXPECTED_INDEXES[call] <= used, f"{call} no longer uses {EXPECTED_INDEXES[call] - used}: {plans[call]}"
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from src.server.database.config import DATABASE_URL, create_request_engine, to_async_url
+from src.server.database.routing import STICKY_COOKIE, configure_replicas
+from tests.conftest import DATA_DIR
+
+CONTENT = {"sections": [{"title": "Intro", "level": 1, "content": "text", "subsections": []}], "metadata": {}}
+
+
+@pytest.fixture
+def lagging_replica(client):
+    """Configures a replica frozen at the primary's current state, and returns
+    a function that turns on routing to it."""
+    path = f"{DATA_DIR}/replica.db"
+    engines = []
+
+    def start():
+        source, target = sqlite3.connect(DATABASE_URL.removeprefix("sqlite:///")), sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+        engines.append(create_request_engine(to_async_url(f"sqlite:///{path}"), "replica-test"))
+        configure_replicas([engines[0].sync_engine])
+
+    yield start
+    configure_replicas([])
+    client.cookies.clear()
+    for engine in engines:
+        # Its aiosqlite connections close on the app's event loop
+        client.portal.call(engine.dispose)
+
+
+def test_reads_and_cache_fills_after_a_write(client, user, team, lagging_replica):
+    document_id = client.post("/documents/store-scraped", json={
+        "team_id": team["id"],
+        "user_id": user["id"],
+        "document_name": "Before",
+        "scraped_data": {"title": "Before", "url": f"https://example.com/routing/{team['id']}", "content": CONTENT},
+    }).json()["data"]["id"]
+    # Cached while the write is still ahead
+    assert client.get(f"/documents/{document_id}").json()["data"]["title"] == "Before"
+    lagging_replica()
+
+    response = client.put(f"/documents/{document_id}", json={"title": "After"})
+    assert response.json()["success"] is True
+    assert STICKY_COOKIE in response.cookies
+
+    def summary_title():
+        response = client.get(f"/documents/team/{team['id']}", params={"summary": True})
+        return response.json()["data"][0]["title"]
+
+    # The writer reads its write, from the primary
+    assert summary_title() == "After"
+
+    # Other clients read plain queries from the replica, which has not caught up
+    client.cookies.clear()
+    assert summary_title() == "Before"
+
+    # but never refill the shared cache from it
+    assert client.get(f"/documents/{document_id}").json()["data"]["title"] == "After"
+    assert client.get(f"/documents/team/{team['id']}").json()["data"][0]["title"] == "After"
+    batch = client.post("/documents/batch", json={"ids": [document_id]}).json()
+    assert batch["data"][0]["title"] == "After"
@@ -0,0 +1,28 @@
+from benchmarks.corpus import build_site
+from benchmarks.site_server import serve
+from src.server.services.scraping_service import ScrapingService
+
+
+def test_scrape_url_returns_the_page_and_its_html():
+    with serve({"index.html": "<html><body><main><h1>Title</h1><p>Text</p></main></body></html>"}) as base_url:
+        page, raw_html = ScrapingService.scrape_url(base_url)
+
+    assert page["title"] == "Title"
+    assert page["content"]["sections"][0]["content"] == "Text"
+    assert "<h1>Title</h1>" in raw_html
+
+
+def test_crawl_fetches_each_page_once(monkeypatch):
+    fetched = []
+    fetch = ScrapingService.fetch
+
+    def counting_fetch(url, **kwargs):
+        fetched.append(url)
+        return fetch(url, **kwargs)
+
+    monkeypatch.setattr(ScrapingService, "fetch", staticmethod(counting_fetch))
+    with serve(build_site(3, sections=2, blocks=1)) as base_url:
+        pages = ScrapingService.scrape_site(base_url, max_pages=10)
+
+    assert len(pages) >= 4
+    assert len(fetched) == len(set(fetched)) == len(pages)
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.server.services.search_service import SearchService
+from tests.conftest import DATA_DIR
+
+CONTENT = {"sections": [{"title": "Setup", "level": 1, "content": "Configure the flux capacitor", "subsections": []}], "metadata": {}}
+
+
+def test_search_works_where_the_index_was_not_created(client, user, team, monkeypatch):
+    # As in a gunicorn worker, or with STARTUP_SCHEMA_CHECK=false
+    monkeypatch.setattr(SearchService, "_dialect", None)
+    document_id = client.post("/documents/store-scraped", json={
+        "team_id": team["id"],
+        "user_id": user["id"],
+        "document_name": "Manual",
+        "scraped_data": {"title": "Manual", "url": f"https://example.com/search/{team['id']}", "content": CONTENT},
+    }).json()["data"]["id"]
+
+    body = client.get(f"/documents/team/{team['id']}/search", params={"q": "capacitor"}).json()
+    assert body["success"] is True, body
+    assert [result["document_id"] for result in body["data"]] == [document_id]
+
+
+def test_missing_index_is_not_available(monkeypatch):
+    monkeypatch.setattr(SearchService, "_dialect", None)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{DATA_DIR}/no-search.db")
+
+    async def check():
+        async with AsyncSession(engine) as db:
+            assert await SearchService.is_available(db) is False
+            with pytest.raises(HTTPException) as error:
+                await SearchService.search(db, 1, "anything")
+            assert error.value.status_code == 503
+        await engine.dispose()
+
+    asyncio.run(check())
+    assert SearchService._dialect is None
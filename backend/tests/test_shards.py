@@ -0,0 +1,179 @@
+"""
+Team moves and cross-database writes with two SQLite shards, "a" and "b".
+"""
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import event
+
+from src.server.database.config import DATABASE_SHARDS, DATABASE_URL, dispose_engines, get_shard_engines
+from src.server.services import shard_service
+from src.server.services.shard_service import PRIMARY_SHARD, ShardService
+from tests.conftest import DATA_DIR
+
+CONTENT = {"sections": [{"title": "Intro", "level": 1, "content": "text", "subsections": []}], "metadata": {}}
+# Three levels, eight sections per document
+NESTED_CONTENT = {
+    "sections": [
+        {"title": f"Part {part}", "level": 1, "content": "text", "subsections": [
+            {"title": f"Part {part}.{chapter}", "level": 2, "content": "text", "subsections": [
+                {"title": f"Part {part}.{chapter}.1", "level": 3, "content": "text", "subsections": []},
+            ]} for chapter in (1, 2)
+        ]} for part in (1, 2)
+    ],
+    "metadata": {},
+}
+
+DATABASE_FILES = {
+    PRIMARY_SHARD: DATABASE_URL.removeprefix("sqlite:///"),
+    "a": f"{DATA_DIR}/shard-a.db",
+    "b": f"{DATA_DIR}/shard-b.db",
+}
+
+
+@pytest.fixture
+def shards(client, monkeypatch):
+    """Turns sharding on for the test, with every team on the primary to start with."""
+    DATABASE_SHARDS.update({name: f"sqlite:///{DATABASE_FILES[name]}" for name in ("a", "b")})
+    monkeypatch.setattr(shard_service, "SHARDING_ENABLED", True)
+    # Engines are recreated with the shards on next use
+    client.portal.call(dispose_engines)
+    ShardService.ensure_schema()
+    yield
+    DATABASE_SHARDS.clear()
+    client.portal.call(dispose_engines)
+    shard_service._team_shards.clear()
+    shard_service._document_teams.clear()
+
+
+def team_documents(shard: str, team_id: int) -> int:
+    with sqlite3.connect(DATABASE_FILES[shard]) as connection:
+        return connection.execute("SELECT count(*) FROM documents WHERE team_id = ?", (team_id,)).fetchone()[0]
+
+
+def section_tree(client, document_id: int) -> set:
+    """(title, parent title) of every section of the document."""
+    sections = client.get(f"/documents/{document_id}").json()["data"]["sections"]
+    titles = {section["id"]: section["title"] for section in sections}
+    return {(section["title"], titles.get(section["parent_section_id"])) for section in sections}
+
+
+def store(client, user, team, name: str, content: dict = CONTENT) -> dict:
+    return client.post("/documents/store-scraped", json={
+        "team_id": team["id"],
+        "user_id": user["id"],
+        "document_name": name,
+        "scraped_data": {"title": name, "url": f"https://example.com/shards/{team['id']}/{name}", "content": content},
+    }).json()
+
+
+def store_documents(client, user, team, count: int = 3):
+    return [store(client, user, team, f"doc-{i}")["data"]["id"] for i in range(count)]
+
+
+def test_move_serves_reads_and_rejects_writes_until_done(client, user, team, shards):
+    document_ids = store_documents(client, user, team)
+    summaries = f"/documents/team/{team['id']}"
+
+    move = client.portal.start_task_soon(ShardService.move_team, team["id"], "a", 0.2)
+    rounds = rejected = 0
+    while not move.done():
+        rounds += 1
+        for document_id in document_ids:
+            assert client.get(f"/documents/{document_id}").json()["success"] is True
+        assert len(client.get(summaries, params={"summary": True}).json()["data"]) == 3
+        body = client.put(f"/documents/{document_ids[0]}", json={"title": f"Edit {rounds}"}).json()
+        if not body["success"]:
+            assert "being moved" in body["message"]
+            rejected += 1
+
+    assert move.result() == 3
+    assert rejected > 0
+    assert (team_documents(PRIMARY_SHARD, team["id"]), team_documents("a", team["id"])) == (0, 3)
+
+    # Writes go through again, to the new shard
+    assert client.put(f"/documents/{document_ids[0]}", json={"title": "Moved"}).json()["success"] is True
+    assert client.get(f"/documents/{document_ids[0]}").json()["data"]["title"] == "Moved"
+
+
+def test_move_copies_sections_with_a_query_budget(client, user, team, shards, assert_max_queries):
+    document_ids = [store(client, user, team, f"doc-{i}", NESTED_CONTENT)["data"]["id"] for i in range(3)]
+    trees = {document_id: section_tree(client, document_id) for document_id in document_ids}
+    assert len(trees[document_ids[0]]) == 10
+
+    with assert_max_queries(100) as profile:
+        assert client.portal.call(ShardService.move_team, team["id"], "a", 0) == 3
+    # Independent of the number of documents and sections. SQLite has no ordered
+    # multi-row RETURNING, so SQLAlchemy inserts sections one by one there;
+    # PostgreSQL takes one statement per nesting level.
+    others = [
+        statement["count"] for statement in profile.statements()
+        if not statement["sql"].startswith("INSERT INTO document_sections")
+    ]
+    assert sum(others) <= 25, profile.format()
+
+    assert {document_id: section_tree(client, document_id) for document_id in document_ids} == trees
+    body = client.get(f"/documents/team/{team['id']}/search", params={"q": "text"}).json()
+    assert {result["document_id"] for result in body["data"]} == set(document_ids)
+
+
+def test_write_by_an_outdated_map_is_rejected_at_commit(client, user, team, shards):
+    document_id = store_documents(client, user, team, 1)[0]
+    shard_service._team_shards.set(str(team["id"]), [PRIMARY_SHARD, None])
+
+    move = client.portal.start_task_soon(ShardService.move_team, team["id"], "a", 0.5)
+    # The move drops the entry once it has marked the team
+    while shard_service._team_shards.get(str(team["id"])) is not None:
+        time.sleep(0.01)
+    # As a process that has not reloaded the map since the team was marked
+    shard_service._team_shards.set(str(team["id"]), [PRIMARY_SHARD, None])
+    body = client.put(f"/documents/{document_id}", json={"title": "Lost"}).json()
+    assert body["success"] is False and "being moved" in body["message"]
+
+    assert move.result() == 1
+    assert client.get(f"/documents/{document_id}").json()["data"]["title"] == "doc-0"
+
+
+def test_rerun_deletes_what_a_failed_move_left_behind(client, user, team, shards, monkeypatch):
+    document_ids = store_documents(client, user, team)
+    purge_team = ShardService._purge_team
+
+    async def purge_fails_on_the_source(db, team_id):
+        if db.info.get("shard") == PRIMARY_SHARD:
+            raise RuntimeError("connection lost")
+        await purge_team(db, team_id)
+
+    # Fails after the team was pointed at the target, before the source was cleaned
+    monkeypatch.setattr(ShardService, "_purge_team", staticmethod(purge_fails_on_the_source))
+    with pytest.raises(RuntimeError):
+        client.portal.call(ShardService.move_team, team["id"], "a", 0)
+    monkeypatch.setattr(ShardService, "_purge_team", staticmethod(purge_team))
+
+    assert (team_documents(PRIMARY_SHARD, team["id"]), team_documents("a", team["id"])) == (3, 3)
+    assert client.put(f"/documents/{document_ids[0]}", json={"title": "On a"}).json()["success"] is True
+
+    assert client.portal.call(ShardService.move_team, team["id"], "a", 0) == 0
+    assert (team_documents(PRIMARY_SHARD, team["id"]), team_documents("a", team["id"])) == (0, 3)
+    assert client.get(f"/documents/{document_ids[0]}").json()["data"]["title"] == "On a"
+
+
+def test_store_failing_on_the_shard_can_be_retried(client, user, team, shards):
+    client.portal.call(ShardService.move_team, team["id"], "a", 0)
+
+    def fail(connection):
+        raise RuntimeError("shard commit failed")
+
+    shard_engine = get_shard_engines()["a"].sync_engine
+    event.listen(shard_engine, "commit", fail)
+    try:
+        assert store(client, user, team, "doc")["success"] is False
+    finally:
+        event.remove(shard_engine, "commit", fail)
+
+    assert team_documents("a", team["id"]) == 0
+    assert client.get(f"/documents/team/{team['id']}", params={"summary": True}).json()["data"] == []
+
+    retried = store(client, user, team, "doc")
+    assert retried["success"] is True
+    assert client.get(f"/documents/{retried['data']['id']}").json()["data"]["title"] == "doc"